@@ -23,6 +23,8 @@ uniswap_v2_router_abi = load_abi('uniswap_v2_router_abi.json')
 uniswap_v2_pair_abi = load_abi('uniswap_v2_pair_abi.json')
 uniswap_v3_router_abi = load_abi('uniswap_v3_router_abi.json')
 uniswap_v3_quoter_abi = load_abi('uniswap_v3_quoter_abi.json')
+uniswap_v3_router02_abi = load_abi('uniswap_v3_router02_abi.json')
+uniswap_universal_router_abi = load_abi('uniswap_universal_router_abi.json')
 
 # Экспорт всех ABI для использования в других модулях
 __all__ = [
@@ -37,5 +39,7 @@ __all__ = [
     'uniswap_v2_router_abi',
     'uniswap_v2_pair_abi',
     'uniswap_v3_router_abi',
-    'uniswap_v3_quoter_abi'
+    'uniswap_v3_quoter_abi',
+    'uniswap_v3_router02_abi',
+    'uniswap_universal_router_abi'
 ]
\ No newline at end of file
@@ -1,23 +1,46 @@
 import json
 import sys
 import os
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from typing import List, Dict, Any, Optional, AsyncGenerator, Union, Tuple, Sequence, Callable, Awaitable, AsyncIterator
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import asyncio
+from contextlib import asynccontextmanager
 from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
 from web3.types import HexBytes
-from eth_abi import decode
+from web3.datastructures import AttributeDict
+from web3._utils.method_formatters import block_result_formatter, transaction_result_formatter
 from eth_utils import decode_hex
-from abis import uniswap_v3_router_abi, uniswap_v2_router_abi
+from abis import uniswap_v3_router_abi, uniswap_v2_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
 from redis.asyncio import Redis
 import redis.asyncio as aioredis
 from analyzer_transactions import logger
 from analyzer_transactions.node_limiter import NodeRateLimiter
+from analyzer_transactions.decoder import SelectorIndex, SELECTOR_SIZE
+from analyzer_transactions.decode_executor import DecodeExecutor
+from analyzer_transactions.rpc_client import RpcClient, ScheduledRpcClient
+from analyzer_transactions.router_registry import RouterRegistry
+from analyzer_transactions.block_fetcher import AdaptiveWindow, BlockFetcher
+from analyzer_transactions.block_cache import BlockCache
+from analyzer_transactions.receipts import ReceiptFetcher
+from analyzer_transactions.swap_record import SwapRecord
+from analyzer_transactions import codec
 from dotenv import load_dotenv
 
 load_dotenv()
 
+ZERO_ADDRESS: str = "0x0000000000000000000000000000000000000000"
+# Marks a swap seen in the mempool that is not mined yet, see analyzer_transactions.mempool
+PENDING_KEY_PREFIX: str = "pending:"
+
+
+class FailedBlocksError(Exception):
+    """Some blocks of a range could not be fetched; ``failed`` maps their numbers to the errors."""
+
+    def __init__(self, failed: Dict[int, str]) -> None:
+        super().__init__(f"{len(failed)} blocks failed: {sorted(failed)[:10]}")
+        self.failed: Dict[int, str] = failed
+
 
 class AnalyzerTransactions:
     # List of methods considered swap operations or related to liquidity
@@ -35,8 +58,13 @@ class AnalyzerTransactions:
         "exactInput",
         "exactOutputSingle",
         "exactOutput",
-        # "multicall"
+        # Wrappers, inner calls are decoded recursively (see SelectorIndex)
+        "multicall",
+        # Uniswap Universal Router
+        "execute",
     ]
+    # Former per-tx cost: PING on a fresh client, SETEX and EXISTS
+    LEGACY_REDIS_ROUND_TRIPS_PER_TX: int = 3
 
     def __init__(self, rpc_url: str) -> None:
         logger.warning(rpc_url)
@@ -44,15 +72,58 @@ class AnalyzerTransactions:
         self.w3_async: AsyncWeb3 = AsyncWeb3(AsyncHTTPProvider(rpc_url, request_kwargs={"timeout": 30}))
         self.w3: Web3 = Web3()  # Synchronous Web3 for Keccak computation
         self.logger: Any = logger  # Logger instance (type not specified due to external module)
-        self.ABI_SWAP: List[List[Dict[str, Any]]] = [uniswap_v2_router_abi, uniswap_v3_router_abi]
+        self.ABI_SWAP: List[List[Dict[str, Any]]] = [
+            uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi,
+        ]
         if not any(self.ABI_SWAP):
             self.logger.error("ABI_SWAP is empty, cannot generate signatures")
             raise ValueError("ABI_SWAP is empty")
+        self.SELECTOR_INDEX: SelectorIndex = SelectorIndex(self.ABI_SWAP, self.SWAP_METHODS)
+        # DECODE_EXECUTOR=inline|thread|process: where the swaps of a block are decoded
+        self.decoder: DecodeExecutor = DecodeExecutor.from_env(self.SELECTOR_INDEX, self.ABI_SWAP, self.SWAP_METHODS)
+        # Known router addresses, checked before the selector lookup
+        self.routers: RouterRegistry = RouterRegistry.from_config()
         self.SIGNATURES_SWAP: List[Dict[str, Any]] = self._generate_swap_signatures()
         self.REDIS_URL = os.getenv('REDIS_URL')
         if self.REDIS_URL is None:
             raise ValueError("REDIS_URL is not set")
-        self.TRANSACTION_TTL = os.getenv('TRANSACTION_TTL', 3600)
+        self.TRANSACTION_TTL: int = int(os.getenv('TRANSACTION_TTL', 3600))
+        # Format of the tx:{hash} values: "json" (strings only) or "swapbin" (analyzer_transactions.codec)
+        self.REDIS_CODEC: str = os.getenv('REDIS_CODEC', 'json').lower()
+        if self.REDIS_CODEC not in ('json', codec.SERIALIZER_NAME):
+            raise ValueError(f"Unknown REDIS_CODEC: {self.REDIS_CODEC}")
+        # Blocks per JSON-RPC batch POST, 1 disables batching
+        self.RPC_BATCH_SIZE: int = int(os.getenv('RPC_BATCH_SIZE', 20))
+        # RPC_SCHEDULER=1: every request goes to a node granted by NodeRateLimiter.acquire
+        self.limiter: Optional[NodeRateLimiter] = None
+        if os.getenv('RPC_SCHEDULER', '0').lower() in ('1', 'true', 'yes'):
+            self.limiter = NodeRateLimiter(self.REDIS_URL)
+            self.rpc: RpcClient = ScheduledRpcClient(
+                self.limiter,
+                batch_size=self.RPC_BATCH_SIZE,
+                timeout=30,
+                # RPC_HEDGE=1: requests slower than the node's p95 are repeated on a second node
+                hedge=os.getenv('RPC_HEDGE', '0').lower() in ('1', 'true', 'yes'),
+            )
+        else:
+            self.rpc = RpcClient(rpc_url, batch_size=self.RPC_BATCH_SIZE, timeout=30)
+        # Concurrent block requests adapt to the node between these bounds
+        self.window: AdaptiveWindow = AdaptiveWindow(
+            initial=int(os.getenv('RPC_INITIAL_CONCURRENCY', 4)),
+            maximum=int(os.getenv('RPC_MAX_CONCURRENCY', 32)),
+        )
+        # Raw blocks cached in-process (BLOCK_CACHE_LOCAL_MB) and in a dedicated Redis (BLOCK_CACHE_REDIS_URL,
+        # connected in initialize); None if BLOCK_CACHE=0 or neither tier is configured
+        self.block_cache: Optional[BlockCache] = BlockCache.from_env()
+        self.fetcher: BlockFetcher = BlockFetcher(self.rpc, self.window, cache=self.block_cache)
+        # Blocks that failed in the last _get_blocks/process_blocks call (the analyzer may live for the whole worker)
+        self.failed_blocks: Dict[int, str] = {}
+        # RECEIPTS=1: every stored batch gets status, gas used and Swap events from the receipts
+        self.receipts: Optional[ReceiptFetcher] = ReceiptFetcher.from_env(self.rpc)
+        # Decoded swaps handed to storage at once by process_blocks
+        self.STORAGE_BATCH_SIZE: int = int(os.getenv('STORAGE_BATCH_SIZE', 500))
+        self.redis: Optional[Redis] = None  # Pooled client, lives for the async-context lifetime
+        self.redis_stats: Dict[str, int] = {"batches": 0, "saved": 0, "round_trips": 0, "round_trips_saved": 0}
 
     def _generate_swap_signatures(self) -> List[Dict[str, Any]]:
         """Generate method signatures for swap and liquidity operations from ABI.
@@ -60,83 +131,90 @@ class AnalyzerTransactions:
         Returns:
             List of dictionaries containing signature and corresponding ABI item.
         """
-        signatures: List[Dict[str, Any]] = []
-        for abi in self.ABI_SWAP:  # Iterate over each ABI (V2 and V3)
-            for item in abi:  # Iterate over ABI items
-                if not isinstance(item, dict):  # Skip non-dictionary items
-                    continue
-                if item.get("type") == "function" and item.get("name") in self.SWAP_METHODS:
-                    # Form the signature string: method_name(type1,type2,...)
-                    inputs: List[Dict[str, str]] = item.get("inputs", [])
-                    param_types: str = ",".join([param["type"] for param in inputs])
-                    signature: str = f"{item['name']}({param_types})"
-                    
-                    # Compute Keccak-256 hash and take the first 4 bytes
-                    keccak_hash: bytes = self.w3.keccak(text=signature)
-                    signature_hex: str = "0x" + keccak_hash.hex()[:8]
-                    signatures.append({
-                        "signature": signature_hex,
-                        "abi_item": item
-                    })
-                    # self.logger.debug(f"Signature for {signature}: {signature_hex}")
-        
+        signatures: List[Dict[str, Any]] = [
+            {"signature": "0x" + selector.hex(), "abi_item": entry.abi_item}
+            for selector, entry in self.SELECTOR_INDEX.entries.items()
+        ]
         if not signatures:
             self.logger.warning("Failed to generate signatures: SIGNATURES_SWAP is empty")
         return signatures
 
-    def _find_and_decode_method(self, input_tx: str) -> Optional[Dict[str, Any]]:
-        """Find method by input_tx signature and decode its data.
+    def _find_and_decode_method(self, input_tx: Union[bytes, str]) -> Optional[Dict[str, Any]]:
+        """Find method by input_tx selector and decode its data.
 
         Args:
-            input_tx: Transaction input data (hex string).
+            input_tx: Transaction input data (raw bytes or hex string).
 
         Returns:
             Dictionary with method name and decoded parameters, or None if not found.
         """
-        if input_tx == "0x" or len(input_tx) < 10:
+        if isinstance(input_tx, str):
+            input_tx = decode_hex(input_tx)
+        if len(input_tx) < SELECTOR_SIZE:
             self.logger.debug("Empty or too short input_tx")
             return None
 
-        signature: str = input_tx[:10]
-        data: str = input_tx[10:]
-
-        for item in self.SIGNATURES_SWAP:
-            if item["signature"] == signature:
-                abi_item: Dict[str, Any] = item["abi_item"]
-                try:
-                    decoded_params: tuple = decode(
-                        [param["type"] for param in abi_item["inputs"]],
-                        decode_hex(data)
-                    )
-                    decoded_dict: Dict[str, Any] = {
-                        param["name"]: value for param, value in zip(abi_item["inputs"], decoded_params)
-                    }
-                    return {
-                        "method": abi_item["name"],
-                        "params": decoded_dict
-                    }
-                except Exception as e:
-                    self.logger.error(f"Error decoding input for method {abi_item['name']}: {e}")
-                    return None
-        
-        self.logger.debug(f"Method with signature {signature} not found")
-        return None
+        entry = self.SELECTOR_INDEX.get(input_tx)
+        if entry is None:
+            self.logger.debug(f"Method with signature 0x{input_tx[:SELECTOR_SIZE].hex()} not found")
+            return None
+        try:
+            return self.SELECTOR_INDEX.decode(input_tx)
+        except Exception as e:
+            self.logger.error(f"Error decoding input for method {entry.name}: {e}")
+            return None
 
     async def initialize(self) -> None:
-        """Initialize connection to Ethereum node."""
+        """Initialize connection to Ethereum node and the Redis connection pool."""
         if await self.w3_async.is_connected():
             chain_id: int = await self.w3_async.eth.chain_id
             self.logger.info(f"Connected to Ethereum node, chain ID: {chain_id}")
         else:
             self.logger.error("Failed to connect to Ethereum node")
             sys.exit(1)
-    
+
+        try:
+            self.redis = aioredis.from_url(self.REDIS_URL)
+            await self.redis.ping()
+            self.logger.debug(f"Успешное подключение к Redis по адресу {self.REDIS_URL}")
+        except Exception as e:
+            self.logger.error(f"Ошибка подключения к Redis: {e}")
+            raise
+        await self.routers.refresh(self.redis)
+        if self.block_cache is not None and self.block_cache.redis_url:
+            # Не в базе брокера Celery: блоков много, их Redis должен вытеснять по maxmemory
+            self.block_cache.redis = aioredis.from_url(self.block_cache.redis_url)
+
     async def close(self) -> None:
-        """Close the HTTP session."""
-        session: Optional[Any] = getattr(self.w3_async.provider, "_session", None)
-        if session and not session.closed:
-            await session.close()
-            self.logger.info("HTTP session closed successfully")
+        """Close the HTTP session and the Redis connection pool."""
+        # web3 caches aiohttp sessions per event loop; disconnect() closes all of them
+        await self.w3_async.provider.disconnect()
+        self.logger.info("HTTP session closed successfully")
+        await self.rpc.close()
+        self.decoder.close()
+        if self.receipts is not None:
+            self.logger.info(f"Receipts: {self.receipts.stats}")
+        if self.limiter is not None:
+            self.logger.info(f"RPC requests per node: {self.limiter.stats}")
+            await self.limiter.close()
+        if self.block_cache is not None:
+            stats = self.block_cache.stats
+            self.logger.info(
+                f"Block cache: {stats['hits']} hits ({stats['local_hits']} local), "
+                f"{stats['misses']} misses, {self.block_cache.rpc_saved} block requests saved"
+            )
+            await self.block_cache.flush_stats(self.redis)
+            if self.block_cache.redis is not None:
+                await self.block_cache.redis.aclose()
+                self.block_cache.redis = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+            self.logger.info(
+                f"Redis pool closed: {self.redis_stats['saved']} transactions in "
+                f"{self.redis_stats['round_trips']} round-trips, "
+                f"{self.redis_stats['round_trips_saved']} round-trips saved"
+            )
 
     async def __aenter__(self) -> 'AnalyzerTransactions':
         """Enter the async context manager."""
@@ -169,6 +247,73 @@ class AnalyzerTransactions:
         """
         return await self.w3_async.eth.get_block(block_number, full_transactions=True)
 
+    def _format_block(self, raw_block: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply web3 result formatters to a raw JSON-RPC block.
+
+        Args:
+            raw_block: Block as returned by eth_getBlockByNumber.
+
+        Returns:
+            Block in the same form as returned by ``w3.eth.get_block``.
+        """
+        return AttributeDict.recursive(block_result_formatter(raw_block))
+
+    def select_raw_swaps(self, raw_block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pick swap transactions from a raw JSON-RPC block before any web3 formatting.
+
+        ``to`` (against the router registry) and the ``input`` selector are
+        checked on the raw hex strings; only
+        the surviving transactions are converted into web3 objects.
+
+        Args:
+            raw_block: Block as returned by eth_getBlockByNumber with full transactions.
+
+        Returns:
+            Formatted swap transactions.
+        """
+        swaps: List[Dict[str, Any]] = []
+        for raw_tx in raw_block.get("transactions") or []:
+            if not isinstance(raw_tx, dict):
+                continue
+            to: Optional[str] = raw_tx.get("to")
+            if not to or to == ZERO_ADDRESS:
+                continue
+            if not self.routers.allows(to):
+                continue
+            if not self.SELECTOR_INDEX.matches_hex(raw_tx.get("input")):
+                continue
+            swaps.append(AttributeDict.recursive(transaction_result_formatter(raw_tx)))
+        return swaps
+
+    async def _get_blocks(self, block_numbers: List[int]) -> List[Dict[str, Any]]:
+        """Fetch blocks through the adaptive-window fetcher.
+
+        Requests are packed into JSON-RPC batches of RPC_BATCH_SIZE blocks and
+        their concurrency follows the node's sustainable throughput. Blocks that
+        failed are logged by number, recorded in ``failed_blocks`` (reset on
+        every call) and left out.
+
+        Args:
+            block_numbers: Block numbers to fetch.
+
+        Returns:
+            List of block data dictionaries in the order of ``block_numbers``.
+        """
+        self.failed_blocks.clear()
+        raw_blocks: Dict[int, Any] = {}
+        async for number, raw_block in self.fetcher.fetch(block_numbers):
+            raw_blocks[number] = raw_block
+
+        data_blocks: List[Dict[str, Any]] = []
+        for number in block_numbers:
+            raw_block = raw_blocks.get(number)
+            if raw_block is None or isinstance(raw_block, BaseException):
+                self.logger.error(f"Error fetching block {number}: {raw_block}")
+                self.failed_blocks[number] = str(raw_block)
+                continue
+            data_blocks.append(self._format_block(raw_block))
+        return data_blocks
+
     async def get_last_n_blocks(self, depth_blocks: int) -> List[Dict[str, Any]]:
         """Fetch the last N blocks.
 
@@ -183,19 +328,13 @@ class AnalyzerTransactions:
                 self.logger.error("depth_blocks must be a positive integer")
                 raise ValueError("depth_blocks must be a positive integer")
 
-            MAX_BLOCKS_PER_REQUEST: int = 100
-            if depth_blocks > MAX_BLOCKS_PER_REQUEST:
-                self.logger.warning(f"depth_blocks exceeds {MAX_BLOCKS_PER_REQUEST}, limiting to {MAX_BLOCKS_PER_REQUEST}")
-                depth_blocks = MAX_BLOCKS_PER_REQUEST
-
             latest_block: int = await self.w3_async.eth.block_number
             start_block: int = latest_block - depth_blocks + 1
             block_numbers: List[int] = list(range(start_block, latest_block + 1))
 
             self.logger.info(f"Fetching blocks: {block_numbers[0]} — {block_numbers[-1]}")
 
-            tasks: List[Any] = [self._get_block_limited(num) for num in block_numbers]
-            data_blocks: List[Dict[str, Any]] = await asyncio.gather(*tasks)
+            data_blocks: List[Dict[str, Any]] = await self._get_blocks(block_numbers)
 
             return data_blocks
 
@@ -224,19 +363,11 @@ class AnalyzerTransactions:
                 self.logger.error("start_block must be less than or equal to latest_block")
                 raise ValueError("start_block must be less than or equal to latest_block")
 
-            len_blocks: int = latest_block - start_block
-
-            MAX_BLOCKS_PER_REQUEST: int = 100
-            if len_blocks > MAX_BLOCKS_PER_REQUEST:
-                self.logger.warning(f"len_blocks exceeds {MAX_BLOCKS_PER_REQUEST}, limiting to {MAX_BLOCKS_PER_REQUEST}")
-                len_blocks = MAX_BLOCKS_PER_REQUEST
-
             block_numbers: List[int] = list(range(start_block, latest_block + 1))
 
             self.logger.info(f"Fetching blocks: {block_numbers[0]} — {block_numbers[-1]}")
 
-            tasks: List[Any] = [self._get_block_limited(num) for num in block_numbers]
-            data_blocks: List[Dict[str, Any]] = await asyncio.gather(*tasks)
+            data_blocks: List[Dict[str, Any]] = await self._get_blocks(block_numbers)
 
             return data_blocks
 
@@ -259,34 +390,32 @@ class AnalyzerTransactions:
             self.logger.debug(f"Extracted {len(block['transactions'])} transactions from block {block['number']}")
         return transactions
 
-    async def _extract_inputs(self, tx: Dict[str, Any]) -> str:
+    async def _extract_inputs(self, tx: Dict[str, Any]) -> bytes:
         """Extract the input field from a transaction.
 
         Args:
             tx: Transaction dictionary.
 
         Returns:
-            Input data as a hex string.
+            Raw input data.
         """
-        if "input" not in tx or not tx["input"]:
-            return "0x"
-        return "0x" + tx["input"].hex()
+        return tx.get("input") or b""
 
-    async def detect_swap_tx(self, input_tx: str) -> bool:
+    async def detect_swap_tx(self, input_tx: Union[bytes, str]) -> bool:
         """Check if a transaction is a swap operation.
 
         Args:
-            input_tx: Transaction input data (hex string).
+            input_tx: Transaction input data (raw bytes or hex string).
 
         Returns:
             True if the transaction is a swap operation, False otherwise.
         """
-        if input_tx == "0x" or len(input_tx) < 10:
-            return False
-        return any(item["signature"] == input_tx[:10] for item in self.SIGNATURES_SWAP)
+        if isinstance(input_tx, str):
+            input_tx = decode_hex(input_tx)
+        return input_tx[:SELECTOR_SIZE] in self.SELECTOR_INDEX
 
     async def filter_transactions(self, txs: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
-        """Filter transactions, keeping only swap operations.
+        """Filter transactions, keeping only swap operations sent to known routers.
 
         Args:
             txs: List of transaction dictionaries.
@@ -295,127 +424,252 @@ class AnalyzerTransactions:
             Transaction dictionaries that are swap operations.
         """
         for tx in txs:
-            tx_hash = "0x" + tx["hash"].hex()
-            if tx.get("to") == "0x0000000000000000000000000000000000000000":
-                self.logger.debug(f"Skipped transaction {tx_hash}: to=0x0")
+            if tx.get("to") == ZERO_ADDRESS:
+                self.logger.debug(f"Skipped transaction 0x{tx['hash'].hex()}: to=0x0")
+                continue
+            if not self.routers.allows(tx.get("to")):
                 continue
-            
-            input_tx: str = await self._extract_inputs(tx)
+
+            input_tx: bytes = await self._extract_inputs(tx)
             if not await self.detect_swap_tx(input_tx):
-                # self.logger.debug(f"Skipped transaction {tx_hash}: not a swap operation")
                 continue
 
-            self.logger.debug(f"Transaction {tx_hash} passed filtering (swap)")
+            self.logger.debug(f"Transaction 0x{tx['hash'].hex()} passed filtering (swap)")
             yield tx
 
-    async def decode_input_data(self, input_tx: str) -> Optional[Dict[str, Any]]:
+    async def decode_input_data(self, input_tx: Union[bytes, str]) -> Optional[Dict[str, Any]]:
         """Decode transaction input data.
 
         Args:
-            input_tx: Transaction input data (hex string).
+            input_tx: Transaction input data (raw bytes or hex string).
 
         Returns:
             Decoded input data as a dictionary, or None if decoding fails.
         """
         return self._find_and_decode_method(input_tx)
 
-    async def save_to_redis(self, tx_data: Dict[str, Any]) -> None:
-        try:
-            redis = aioredis.from_url(self.REDIS_URL)
-            
-            def serialize_value(value):
-                if isinstance(value, bytes):
-                    return value.hex()
-                elif hasattr(value, 'hex'):  
-                    return value.hex()
-                return str(value)
-            
-            def deep_serialize(obj):
-                if isinstance(obj, dict):
-                    return {k: deep_serialize(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [deep_serialize(item) for item in obj]
-                return serialize_value(obj)
-            
-            serializable_tx = deep_serialize(tx_data)
-            
-            # Улучшенное извлечение хеша с приоритетом
-            hash_candidates = [
-                serializable_tx.get('hash'),
-                serializable_tx.get('transactionHash'),
-                serializable_tx.get('tx_hash')
-            ]
-            
-            tx_hash = next((h for h in hash_candidates if h), 'unknown_hash')
-            
-            # Гарантированное добавление '0x'
-            tx_hash = tx_hash if tx_hash.startswith('0x') else f'0x{tx_hash}'
-            
-            redis_key = f"tx:{tx_hash}"
-            
-            serialized_data = json.dumps(
-                serializable_tx, 
-                ensure_ascii=False, 
-            )
-            serializable_tx
-            # Сохранение с возможностью настройки TTL
-            await redis.setex(
-                redis_key, 
-                self.TRANSACTION_TTL,  # Вынести TTL в константу класса
-                serialized_data
-            )
-            
-            # Расширенное логирование
-            logger.info(
-                f"Транзакция сохранена: {redis_key}, "
-                f"Размер: {len(serialized_data)} байт"
-            )
-            
-            # Опциональная проверка сохранения
-            if not await redis.exists(redis_key):
-                logger.warning(f"Возможная проблема сохранения: {redis_key}")
+    @staticmethod
+    def _serialize_tx(tx_data: Union[SwapRecord, Dict[str, Any]]) -> Tuple[str, str]:
+        """Build the Redis key and JSON payload for a decoded transaction.
 
-        except Exception as e:
-            logger.error(
-                f"Ошибка сохранения транзакции: {e}", 
-                extra={
-                    'tx_hash': tx_hash,
-                    'data_size': len(serialized_data) if 'serialized_data' in locals() else 0
-                }
-            )
-            # Вывод трассировки только в DEBUG режиме
-            if logger.getEffectiveLevel() == logger.DEBUG:
-                import traceback
-                traceback.print_exc()
+        Args:
+            tx_data: Swap record or transaction dictionary with decoded input data.
+
+        Returns:
+            Tuple of (redis_key, serialized_data).
+        """
+        def serialize_value(value):
+            if isinstance(value, bytes):
+                return value.hex()
+            elif hasattr(value, 'hex'):
+                return value.hex()
+            return str(value)
+
+        def deep_serialize(obj):
+            if isinstance(obj, dict):
+                return {k: deep_serialize(v) for k, v in obj.items()}
+            elif isinstance(obj, (list, tuple)):
+                return [deep_serialize(item) for item in obj]
+            return serialize_value(obj)
+
+        if isinstance(tx_data, SwapRecord):
+            tx_data = tx_data.to_dict()
+        serializable_tx = deep_serialize(tx_data)
+
+        # Извлечение хеша с приоритетом
+        hash_candidates = [
+            serializable_tx.get('hash'),
+            serializable_tx.get('transactionHash'),
+            serializable_tx.get('tx_hash')
+        ]
+        tx_hash = next((h for h in hash_candidates if h), 'unknown_hash')
+        tx_hash = tx_hash if tx_hash.startswith('0x') else f'0x{tx_hash}'
+
+        return f"tx:{tx_hash}", json.dumps(serializable_tx, ensure_ascii=False)
+
+    @staticmethod
+    def _encode_tx(tx_data: Union[SwapRecord, Dict[str, Any]]) -> Tuple[str, bytes]:
+        """Build the Redis key and swapbin payload for a decoded transaction.
 
+        Args:
+            tx_data: Swap record or transaction dictionary with decoded input data.
 
-    async def get_transaction_data(self, tx: Dict[str, Any]) -> Dict[str, Any]:
-        """Add decoded input data to a transaction.
+        Returns:
+            Tuple of (redis_key, encoded_data).
+        """
+        if isinstance(tx_data, SwapRecord):
+            return f"tx:{tx_data.hash_hex}", codec.encode(tx_data)
+        tx_hash = next((h for h in (tx_data.get('hash'), tx_data.get('transactionHash'), tx_data.get('tx_hash')) if h),
+                       'unknown_hash')
+        if isinstance(tx_hash, bytes):
+            tx_hash = tx_hash.hex()
+        tx_hash = tx_hash if tx_hash.startswith('0x') else f'0x{tx_hash}'
+        return f"tx:{tx_hash}", codec.encode(tx_data)
+
+    async def save_batch_to_redis(self, tx_data_list: Sequence[Union[SwapRecord, Dict[str, Any]]]) -> int:
+        """Write a batch of decoded transactions with one pipelined SETEX round-trip.
 
         Args:
-            tx: Transaction dictionary.
+            tx_data_list: Swap records (or transaction dictionaries) with decoded input data.
 
         Returns:
-            Transaction dictionary with decoded input data.
+            Number of transactions written.
         """
-        tx_data: Dict[str, Any] = dict(tx)  # Create a copy to avoid modifying the original
-        input_tx: str = await self._extract_inputs(tx)
-        tx_data["decoded_input"] = await self.decode_input_data(input_tx)
-        logger.debug(tx_data)
+        if not tx_data_list:
+            return 0
+        if self.redis is None:
+            raise RuntimeError("Redis client is not initialized, use 'async with AnalyzerTransactions(...)'")
+
+        total_size: int = 0
+        pending_keys: List[str] = []
+        pipe = self.redis.pipeline(transaction=False)
+        for tx_data in tx_data_list:
+            if self.REDIS_CODEC == codec.SERIALIZER_NAME:
+                redis_key, serialized_data = self._encode_tx(tx_data)
+            else:
+                redis_key, serialized_data = self._serialize_tx(tx_data)
+            total_size += len(serialized_data)
+            pipe.setex(redis_key, self.TRANSACTION_TTL, serialized_data)
+            pending_keys.append(PENDING_KEY_PREFIX + redis_key)
+        # Mined now: drop the mempool markers in the same round-trip
+        pipe.delete(*pending_keys)
 
-        # Сохранение в Redis для db_worker
         try:
-            redis = aioredis.from_url(self.REDIS_URL)
-            await redis.ping()
-            logger.debug(f"Успешное подключение к Redis по адресу {self.REDIS_URL}")
+            await pipe.execute()
         except Exception as e:
-            logger.error(f"Ошибка подключения к Redis: {e}")
+            self.logger.error(f"Ошибка сохранения пакета транзакций ({len(tx_data_list)} шт.): {e}")
             raise
 
-        await self.save_to_redis(tx_data)
+        count: int = len(tx_data_list)
+        self.redis_stats["batches"] += 1
+        self.redis_stats["saved"] += count
+        self.redis_stats["round_trips"] += 1
+        self.redis_stats["round_trips_saved"] += self.LEGACY_REDIS_ROUND_TRIPS_PER_TX * count - 1
+        self.logger.info(f"Сохранено {count} транзакций в Redis, размер: {total_size} байт, 1 round-trip")
+        return count
+
+    async def save_to_redis(self, tx_data: Union[SwapRecord, Dict[str, Any]]) -> None:
+        """Save a single decoded transaction to Redis.
+
+        Args:
+            tx_data: Swap record or transaction dictionary with decoded input data.
+        """
+        await self.save_batch_to_redis([tx_data])
+
+    async def get_transaction_data(self, tx: Dict[str, Any]) -> SwapRecord:
+        """Decode the input of a transaction into a swap record.
+
+        Args:
+            tx: Transaction dictionary.
+
+        Returns:
+            SwapRecord with the kept transaction fields and the decoded input data.
+        """
+        input_tx: bytes = await self._extract_inputs(tx)
+        return SwapRecord.from_tx(tx, await self.decode_input_data(input_tx))
+
+    async def get_transactions_data(self, txs: List[Dict[str, Any]]) -> List[SwapRecord]:
+        """Decode the inputs of transactions together with the decode executor.
+
+        Args:
+            txs: Transaction dictionaries.
+
+        Returns:
+            SwapRecords with the kept transaction fields and the decoded input data.
+        """
+        inputs: List[bytes] = []
+        for tx in txs:
+            input_tx = await self._extract_inputs(tx)
+            inputs.append(decode_hex(input_tx) if isinstance(input_tx, str) else bytes(input_tx))
+        decoded_inputs = await self.decoder.decode_many(inputs)
+        return [SwapRecord.from_tx(tx, decoded) for tx, decoded in zip(txs, decoded_inputs)]
+
+    async def stream_swaps(self, block_numbers: Sequence[int]) -> AsyncGenerator[SwapRecord, None]:
+        """Fetch blocks and yield decoded swaps as soon as each block arrives.
+
+        Non-swap transactions are dropped with their block, so memory does not
+        grow with the size of the range.
+
+        Args:
+            block_numbers: Block numbers to process.
+
+        Yields:
+            Swap records with decoded input data.
+        """
+        async for number, raw_block in self.fetcher.fetch(block_numbers):
+            await self.routers.maybe_refresh(self.redis)
+            if raw_block is None or isinstance(raw_block, BaseException):
+                self.logger.error(f"Error fetching block {number}: {raw_block}")
+                self.failed_blocks[number] = str(raw_block)
+                continue
+            for tx_data in await self.get_transactions_data(self.select_raw_swaps(raw_block)):
+                yield tx_data
+
+    async def process_blocks(
+        self,
+        block_numbers: Sequence[int],
+        on_batch: Optional[Callable[[List[SwapRecord]], Awaitable[None]]] = None,
+    ) -> Dict[str, int]:
+        """Run the streaming fetch → filter → decode pipeline and store swaps in batches.
+
+        Every STORAGE_BATCH_SIZE decoded swaps are written to Redis and passed to
+        ``on_batch`` before the next batch is collected. With RECEIPTS=1 the
+        batch is enriched with the receipts of its blocks first.
+
+        Args:
+            block_numbers: Block numbers to process.
+            on_batch: Optional coroutine called with every stored batch.
+
+        Returns:
+            Summary with the number of blocks requested, failed blocks, swaps and batches.
+            ``failed_blocks`` then holds the blocks that failed in this call.
+        """
+        self.failed_blocks.clear()
+        summary: Dict[str, int] = {"blocks": len(block_numbers), "failed_blocks": 0, "swaps": 0, "batches": 0}
+        batch: List[SwapRecord] = []
+
+        async def flush() -> None:
+            await self.store_batch(batch, on_batch)
+            summary["swaps"] += len(batch)
+            summary["batches"] += 1
+            batch.clear()
+
+        async for tx_data in self.stream_swaps(block_numbers):
+            batch.append(tx_data)
+            if len(batch) >= self.STORAGE_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+
+        summary["failed_blocks"] = len(self.failed_blocks)
+        await self.flush_cache_stats()
+        return summary
+
+    async def flush_cache_stats(self) -> None:
+        """Add the block cache counters to the totals in Redis read by /block_cache_stats.
+
+        Called after every processed range: a shared analyzer is closed only at
+        worker shutdown, so flushing on close alone would leave the totals stale.
+        """
+        if self.block_cache is not None and self.redis is not None:
+            await self.block_cache.flush_stats(self.redis)
+
+    async def store_batch(
+        self,
+        batch: List[SwapRecord],
+        on_batch: Optional[Callable[[List[SwapRecord]], Awaitable[None]]] = None,
+    ) -> None:
+        """Store one batch of decoded swaps: the step shared by process_blocks and the tip follower.
+
+        With RECEIPTS=1 the batch is enriched with the receipts of its blocks,
+        then it is written to Redis and a copy of it is passed to ``on_batch``.
+        """
+        if self.receipts is not None:
+            await self.receipts.enrich(batch)
+        await self.save_batch_to_redis(batch)
+        if on_batch is not None:
+            await on_batch(list(batch))
 
-        return tx_data
-    
     async def convert_to_dict(self, txs: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
         """Convert a list of transactions to a dictionary with 1-based indices.
 
@@ -428,72 +682,136 @@ class AnalyzerTransactions:
         result_dict: Dict[int, Dict[str, Any]] = {index + 1: tx for index, tx in enumerate(txs)}
         return result_dict
 
-async def analyzer_main(depth_blocks: int, redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0')) -> list[Dict[str, Any]]:
-    """Main function to analyze transactions using NodeRateLimiter."""
-    logger.debug(f"Using redis_url: {redis_url}")
-    node_url = await NodeRateLimiter(redis_url).get_available_node()
-    logger.info(f"NodeRateLimiter initialized. Using {node_url}")
+# (pid, id(loop), node_url) -> (loop, analyzer); see get_shared_analyzer
+_shared_analyzers: Dict[Tuple[int, int, str], Tuple[asyncio.AbstractEventLoop, AnalyzerTransactions]] = {}
 
-    async with AnalyzerTransactions(node_url) as analyzer:
-        logger.debug(f"Generated swap signatures: {[item['signature'] for item in analyzer.SIGNATURES_SWAP]}")
-        data_blocks = await analyzer.get_last_n_blocks(depth_blocks)
-        logger.success(f"Received data for {len(data_blocks)} blocks")
-        txs = await analyzer.extract_transactions(data_blocks)
-        logger.debug(f"Count of transactions: {len(txs)} in {depth_blocks} blocks")
-        filtered_txs = [tx async for tx in analyzer.filter_transactions(txs)]
-        logger.warning(f"Count of filtered transactions (SWAP): {len(filtered_txs)}")
-        result_list_txs = await asyncio.gather(
-            *[analyzer.get_transaction_data(tx) for tx in filtered_txs],
-            return_exceptions=True
-        )
-        list_decode_txs = [tx for tx in result_list_txs if not isinstance(tx, Exception)]
-        logger.warning(f"Decoded {len(list_decode_txs)} transactions")
-        return list_decode_txs
 
-async def analyzer_main(depth_blocks: int, redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0')) -> list[Dict[str, Any]]:
-    """Main function to analyze transactions using NodeRateLimiter."""
-    logger.debug(f"Using redis_url: {redis_url}")
-    node_url = await NodeRateLimiter(redis_url).get_available_node()
-    logger.info(f"NodeRateLimiter initialized. Using {node_url}")
+async def get_shared_analyzer(node_url: str) -> AnalyzerTransactions:
+    """Return an initialized analyzer kept open for the lifetime of the running event loop.
+
+    Its HTTP session, Redis pool and concurrency window are reused by every call
+    on the same loop until close_shared_analyzers() is called.
+
+    Args:
+        node_url: RPC node URL.
+
+    Returns:
+        Initialized AnalyzerTransactions instance.
+    """
+    loop = asyncio.get_running_loop()
+    key = (os.getpid(), id(loop), node_url)
+    entry = _shared_analyzers.get(key)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    analyzer = AnalyzerTransactions(node_url)
+    await analyzer.initialize()
+    _shared_analyzers[key] = (loop, analyzer)
+    return analyzer
+
 
+async def close_shared_analyzers() -> None:
+    """Close the shared analyzers that belong to the running event loop."""
+    loop = asyncio.get_running_loop()
+    for key, (analyzer_loop, analyzer) in list(_shared_analyzers.items()):
+        if analyzer_loop is loop:
+            del _shared_analyzers[key]
+            await analyzer.close()
+
+
+@asynccontextmanager
+async def _open_analyzer(node_url: str, shared: bool) -> AsyncIterator[AnalyzerTransactions]:
+    """Yield a shared analyzer or a fresh one closed on exit."""
+    if shared:
+        yield await get_shared_analyzer(node_url)
+        return
     async with AnalyzerTransactions(node_url) as analyzer:
-        logger.debug(f"Generated swap signatures: {[item['signature'] for item in analyzer.SIGNATURES_SWAP]}")
-        data_blocks = await analyzer.get_last_n_blocks(depth_blocks)
-        logger.success(f"Received data for {len(data_blocks)} blocks")
-        txs = await analyzer.extract_transactions(data_blocks)
-        logger.debug(f"Count of transactions: {len(txs)} in {depth_blocks} blocks")
-        filtered_txs = [tx async for tx in analyzer.filter_transactions(txs)]
-        logger.warning(f"Count of filtered transactions (SWAP): {len(filtered_txs)}")
-        result_list_txs = await asyncio.gather(
-            *[analyzer.get_transaction_data(tx) for tx in filtered_txs],
-            return_exceptions=True
-        )
-        list_decode_txs = [tx for tx in result_list_txs if not isinstance(tx, Exception)]
-        logger.warning(f"Decoded {len(list_decode_txs)} transactions")
-        return list_decode_txs
+        yield analyzer
+
+
+async def analyzer_main(
+    depth_blocks: int,
+    redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+    on_batch: Optional[Callable[[List[SwapRecord]], Awaitable[None]]] = None,
+    shared: bool = False,
+) -> list[SwapRecord]:
+    """Main function to analyze the last N blocks using NodeRateLimiter.
+
+    Without ``on_batch`` the decoded swaps are collected and returned; with it,
+    each stored batch is handed to the callback and the returned list is empty.
+    With ``shared`` the analyzer and its pooled clients outlive the call
+    (see get_shared_analyzer).
+    """
+    if not isinstance(depth_blocks, int) or depth_blocks <= 0:
+        raise ValueError("depth_blocks must be a positive integer")
+    logger.debug(f"Using redis_url: {redis_url}")
+    limiter = NodeRateLimiter(redis_url)
+    try:
+        node_url = await limiter.get_available_node()
+    finally:
+        await limiter.close()
+    logger.info(f"NodeRateLimiter initialized. Using {node_url}")
 
-async def analyzer_slice_main(start_block: int, last_block: int, redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0')) -> list[Dict[str, Any]]:
-    """Main function to analyze transactions using NodeRateLimiter."""
+    async with _open_analyzer(node_url, shared) as analyzer:
+        latest_block: int = await analyzer.w3_async.eth.block_number
+        block_numbers = range(latest_block - depth_blocks + 1, latest_block + 1)
+        return await _run_pipeline(analyzer, block_numbers, on_batch)
+
+async def analyzer_slice_main(
+    start_block: int,
+    last_block: int,
+    redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+    on_batch: Optional[Callable[[List[SwapRecord]], Awaitable[None]]] = None,
+    shared: bool = False,
+    strict: bool = False,
+) -> list[SwapRecord]:
+    """Main function to analyze a range of blocks using NodeRateLimiter.
+
+    Without ``on_batch`` the decoded swaps are collected and returned; with it,
+    each stored batch is handed to the callback and the returned list is empty.
+    With ``shared`` the analyzer and its pooled clients outlive the call
+    (see get_shared_analyzer).
+
+    Raises:
+        FailedBlocksError: With ``strict``, if any block of the range failed
+            (the range must then be processed again, nothing is returned).
+    """
+    if start_block > last_block:
+        raise ValueError("start_block must be less than or equal to last_block")
     logger.debug(f"Using redis_url: {redis_url}")
-    node_url = await NodeRateLimiter(redis_url).get_available_node()
+    limiter = NodeRateLimiter(redis_url)
+    try:
+        node_url = await limiter.get_available_node()
+    finally:
+        await limiter.close()
     logger.info(f"NodeRateLimiter initialized. Using {node_url}")
 
-    async with AnalyzerTransactions(node_url) as analyzer:
-        logger.debug(f"Generated swap signatures: {[item['signature'] for item in analyzer.SIGNATURES_SWAP]}")
-        data_blocks = await analyzer.get_slice_blocks(start_block, last_block)
-        logger.success(f"Received data for {len(data_blocks)} blocks")
-        txs = await analyzer.extract_transactions(data_blocks)
-        len_blocks = len(data_blocks)
-        logger.debug(f"Count of transactions: {len(txs)} in {len_blocks} blocks")
-        filtered_txs = [tx async for tx in analyzer.filter_transactions(txs)]
-        logger.warning(f"Count of filtered transactions (SWAP): {len(filtered_txs)}")
-        result_list_txs = await asyncio.gather(
-            *[analyzer.get_transaction_data(tx) for tx in filtered_txs],
-            return_exceptions=True
-        )
-        list_decode_txs = [tx for tx in result_list_txs if not isinstance(tx, Exception)]
-        logger.warning(f"Decoded {len(list_decode_txs)} transactions")
-        return list_decode_txs
+    async with _open_analyzer(node_url, shared) as analyzer:
+        return await _run_pipeline(analyzer, range(start_block, last_block + 1), on_batch, strict)
+
+async def _run_pipeline(
+    analyzer: AnalyzerTransactions,
+    block_numbers: Sequence[int],
+    on_batch: Optional[Callable[[List[SwapRecord]], Awaitable[None]]] = None,
+    strict: bool = False,
+) -> list[SwapRecord]:
+    """Stream the blocks through the analyzer, collecting swaps unless a callback is given.
+
+    With ``strict`` failed blocks raise FailedBlocksError instead of being only logged.
+    """
+    collected: list[SwapRecord] = []
+
+    async def collect(batch: List[SwapRecord]) -> None:
+        collected.extend(batch)
+
+    logger.info(f"Streaming blocks: {block_numbers[0]} — {block_numbers[-1]}")
+    summary = await analyzer.process_blocks(block_numbers, on_batch=on_batch or collect)
+    logger.warning(
+        f"Processed {summary['blocks']} blocks ({summary['failed_blocks']} failed), "
+        f"decoded {summary['swaps']} swaps in {summary['batches']} batches"
+    )
+    if strict and analyzer.failed_blocks:
+        raise FailedBlocksError(dict(analyzer.failed_blocks))
+    return collected
 
 if __name__ == "__main__":
     # Note: Calling 'main' but function is named 'analyzermain'; kept as is per instruction
@@ -0,0 +1,192 @@
+# analyzer_transactions/backfill.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from redis.asyncio import Redis
+
+# Progress of a backfill job is kept for a week
+BACKFILL_TTL: int = int(os.getenv("BACKFILL_TTL", 7 * 24 * 3600))
+
+
+def split_range(start_block: int, end_block: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Split an inclusive block range into shards aligned to multiples of ``shard_size``.
+
+    Aligned boundaries make the shards of overlapping jobs identical, so their
+    blocks are served from the block cache.
+
+    Args:
+        start_block: First block of the range.
+        end_block: Last block of the range (inclusive).
+        shard_size: Blocks per shard.
+
+    Returns:
+        List of inclusive (start, end) tuples.
+    """
+    if start_block > end_block:
+        raise ValueError("start_block must be less than or equal to end_block")
+    if shard_size <= 0:
+        raise ValueError("shard_size must be a positive integer")
+    shards: List[Tuple[int, int]] = []
+    start = start_block
+    while start <= end_block:
+        end = min(end_block, (start // shard_size + 1) * shard_size - 1)
+        shards.append((start, end))
+        start = end + 1
+    return shards
+
+
+def shard_id(start: int, end: int) -> str:
+    return f"{start}-{end}"
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def summarize(job: Dict[Any, Any], shards: Dict[Any, Any], chunks: Dict[Any, Any],
+              now: Optional[float] = None) -> Dict[str, Any]:
+    """Progress of a backfill job computed from its Redis hashes.
+
+    Works on the raw HGETALL results of the sync and the asyncio clients.
+
+    Args:
+        job: ``backfill:{job_id}`` hash.
+        shards: ``backfill:{job_id}:shards`` hash.
+        chunks: ``backfill:{job_id}:chunks`` hash (checkpoint -> swaps found).
+        now: Current unix time, used for the throughput of a running job.
+
+    Returns:
+        Progress: blocks done/total, swaps found, blocks per second and shard states.
+    """
+    job = {_text(k): _text(v) for k, v in job.items()}
+    start_block, end_block = int(job["start_block"]), int(job["end_block"])
+    blocks_done = 0
+    swaps = 0
+    for field, value in chunks.items():
+        chunk_start, chunk_end = map(int, _text(field).split("-"))
+        blocks_done += chunk_end - chunk_start + 1
+        swaps += int(value)
+    by_status: Dict[str, int] = {}
+    for raw in shards.values():
+        status = json.loads(raw)["status"]
+        by_status[status] = by_status.get(status, 0) + 1
+
+    created_at = float(job["created_at"])
+    finished_at = float(job["updated_at"]) if job.get("status") == "completed" else (now or time.time())
+    elapsed = max(finished_at - created_at, 0.0)
+    blocks_total = end_block - start_block + 1
+    progress: Dict[str, Any] = {
+        "status": job.get("status"),
+        "start_block": start_block,
+        "end_block": end_block,
+        "blocks_done": blocks_done,
+        "blocks_total": blocks_total,
+        "percent": round(100.0 * blocks_done / blocks_total, 1),
+        "swaps": swaps,
+        "chunks_done": len(chunks),
+        "shards": int(job["shards"]),
+        "shards_by_status": by_status,
+        "elapsed_seconds": round(elapsed, 1),
+        "blocks_per_second": round(blocks_done / elapsed, 2) if elapsed > 0 else None,
+    }
+    if "result" in job:
+        progress["result"] = json.loads(job["result"])
+    return progress
+
+
+class BackfillProgress:
+    """Checkpoints and per-shard state of a backfill job in Redis.
+
+    ``backfill:{job_id}`` holds the job (range, shard count, status, totals),
+    ``backfill:{job_id}:shards`` maps "start-end" to the shard state
+    (pending, running, done or failed, attempts, swaps, error) and
+    ``backfill:{job_id}:chunks`` maps every completed chunk "start-end" to the
+    number of swaps found in it. A chunk is checkpointed after its swaps are
+    stored, so a retried task or a restarted worker resumes after the last
+    completed chunk.
+    """
+
+    def __init__(self, redis: Redis, job_id: str, ttl: int = BACKFILL_TTL) -> None:
+        self.redis: Redis = redis
+        self.job_id: str = job_id
+        self.ttl: int = ttl
+        self.job_key: str = f"backfill:{job_id}"
+        self.shards_key: str = f"backfill:{job_id}:shards"
+        self.chunks_key: str = f"backfill:{job_id}:chunks"
+
+    async def create(self, start_block: int, end_block: int, shards: List[Tuple[int, int]]) -> bool:
+        """Register the job and its shards as pending.
+
+        Returns:
+            False if the job already exists (a retry), its checkpoints are kept.
+        """
+        if await self.redis.hget(self.job_key, "start_block") is not None:
+            return False
+        now = f"{time.time():.3f}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self.job_key, mapping={
+            "start_block": start_block,
+            "end_block": end_block,
+            "shards": len(shards),
+            "status": "running",
+            "created_at": now,
+            "updated_at": now,
+        })
+        pipe.hset(self.shards_key, mapping={
+            shard_id(start, end): json.dumps({"status": "pending", "attempts": 0}) for start, end in shards
+        })
+        pipe.expire(self.job_key, self.ttl)
+        pipe.expire(self.shards_key, self.ttl)
+        await pipe.execute()
+        return True
+
+    async def get_shard(self, start: int, end: int) -> Dict[str, Any]:
+        raw = await self.redis.hget(self.shards_key, shard_id(start, end))
+        return json.loads(raw) if raw else {"status": "pending", "attempts": 0}
+
+    async def update_shard(self, start: int, end: int, **fields: Any) -> Dict[str, Any]:
+        """Merge ``fields`` into the shard state (one shard is written by one task at a time)."""
+        state = await self.get_shard(start, end)
+        state.update(fields)
+        await self.redis.hset(self.shards_key, mapping={shard_id(start, end): json.dumps(state)})
+        return state
+
+    async def start_shard(self, start: int, end: int) -> Dict[str, Any]:
+        state = await self.get_shard(start, end)
+        return await self.update_shard(start, end, status="running", attempts=state.get("attempts", 0) + 1, error=None)
+
+    async def completed_chunks(self) -> Dict[str, int]:
+        """Checkpointed chunks "start-end" with the number of swaps found."""
+        chunks = await self.redis.hgetall(self.chunks_key)
+        return {_text(field): int(value) for field, value in chunks.items()}
+
+    async def checkpoint(self, start: int, end: int, swaps: int) -> None:
+        """Mark a chunk as completed, after its swaps were stored."""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self.chunks_key, mapping={shard_id(start, end): swaps})
+        pipe.hset(self.job_key, mapping={"updated_at": f"{time.time():.3f}"})
+        pipe.expire(self.chunks_key, self.ttl)
+        await pipe.execute()
+
+    async def finish(self, totals: Dict[str, Any]) -> None:
+        """Store the aggregated result of the job."""
+        await self.redis.hset(self.job_key, mapping={
+            "status": "completed",
+            "updated_at": f"{time.time():.3f}",
+            "result": json.dumps(totals),
+        })
+
+    async def summary(self) -> Optional[Dict[str, Any]]:
+        """Progress of the job (see summarize), None if the job is unknown."""
+        job = await self.redis.hgetall(self.job_key)
+        if not job:
+            return None
+        summary = summarize(job, await self.redis.hgetall(self.shards_key), await self.redis.hgetall(self.chunks_key))
+        summary["job_id"] = self.job_id
+        return summary
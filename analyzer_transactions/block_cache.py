@@ -0,0 +1,352 @@
+# analyzer_transactions/block_cache.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import zlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable
+from redis.asyncio import Redis
+from analyzer_transactions import logger
+
+REDIS_CACHE_STATS_KEY: str = "block_cache:stats"
+
+
+class BlockCache:
+    """Two-tier cache of raw JSON-RPC blocks (or receipts) keyed by block number.
+
+    Values are compact JSON compressed with zlib. The first tier is an in-process
+    LRU bounded by the total compressed size, the second is Redis, shared by all
+    workers. The Redis tier belongs in its own instance (BLOCK_CACHE_REDIS_URL)
+    with ``maxmemory`` and ``allkeys-lru``, never in the database of the Celery
+    broker. Finalized blocks (``finality_depth`` below the head) get
+    ``final_ttl`` and are indexed in a sorted set of block numbers trimmed to the
+    ``max_final_blocks`` highest, so the cache stays bounded even without a
+    maxmemory policy. Blocks near the tip get ``tip_ttl`` and are dropped when a
+    newer block does not link to them (reorg).
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, kind: str = "block", local_max_bytes: int = 64 * 1024 * 1024,
+                 finality_depth: int = 64, tip_ttl: int = 60, compress_level: int = 6,
+                 final_ttl: int = 7 * 24 * 3600, max_final_blocks: int = 10_000,
+                 redis_url: Optional[str] = None) -> None:
+        """Initialize the cache.
+
+        Args:
+            redis: Redis client of the shared tier, None for the local tier only.
+            kind: Key namespace, e.g. "block" or "receipts".
+            local_max_bytes: Size bound of the in-process LRU (compressed bytes).
+            finality_depth: Blocks at least this far below the head never change.
+            tip_ttl: TTL in seconds of blocks near the tip.
+            compress_level: zlib compression level.
+            final_ttl: TTL in seconds of finalized blocks.
+            max_final_blocks: Finalized blocks kept in Redis, lower ones are evicted first.
+            redis_url: URL of the dedicated Redis the shared tier is connected to, None for the local tier only.
+        """
+        self.redis: Optional[Redis] = redis
+        self.kind: str = kind
+        self.local_max_bytes: int = local_max_bytes
+        self.finality_depth: int = finality_depth
+        self.tip_ttl: int = tip_ttl
+        self.compress_level: int = compress_level
+        self.final_ttl: int = final_ttl
+        self.max_final_blocks: int = max_final_blocks
+        self.redis_url: Optional[str] = redis_url
+        self.head: Optional[int] = None
+        self._local: "OrderedDict[int, bytes]" = OrderedDict()
+        self._local_bytes: int = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0, "local_hits": 0, "misses": 0, "stored": 0, "invalidated": 0, "bytes_stored": 0, "evicted": 0,
+        }
+
+    @classmethod
+    def from_env(cls, redis: Optional[Redis] = None, kind: str = "block") -> Optional["BlockCache"]:
+        """Build the cache from environment variables, None if BLOCK_CACHE is disabled.
+
+        Both tiers are opt-in: the Redis tier is used only when
+        BLOCK_CACHE_REDIS_URL is set, the local one only when BLOCK_CACHE_LOCAL_MB
+        is above 0. Without either there is no cache, so one-off backfill ranges
+        do not pay for compressing blocks that are never read again.
+        """
+        if os.getenv("BLOCK_CACHE", "1").lower() in ("0", "false", "no"):
+            return None
+        redis_url = os.getenv("BLOCK_CACHE_REDIS_URL") or None
+        local_max_bytes = int(float(os.getenv("BLOCK_CACHE_LOCAL_MB", 0)) * 1024 * 1024)
+        if redis_url is None and local_max_bytes <= 0:
+            return None
+        return cls(
+            redis,
+            kind=kind,
+            local_max_bytes=local_max_bytes,
+            finality_depth=int(os.getenv("FINALITY_DEPTH", 64)),
+            tip_ttl=int(os.getenv("BLOCK_CACHE_TIP_TTL", 60)),
+            final_ttl=int(os.getenv("BLOCK_CACHE_FINAL_TTL", 7 * 24 * 3600)),
+            max_final_blocks=int(os.getenv("BLOCK_CACHE_MAX_BLOCKS", 10_000)),
+            redis_url=redis_url,
+        )
+
+    def _key(self, number: int) -> str:
+        return f"{self.kind}:{number}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.kind}:index"
+
+    @property
+    def rpc_saved(self) -> int:
+        """Number of blocks served without a request to the node."""
+        return self.stats["hits"]
+
+    def observe_head(self, number: int) -> None:
+        """Move the known chain head forward."""
+        if self.head is None or number > self.head:
+            self.head = number
+
+    def is_final(self, number: int) -> bool:
+        """Whether the block is deep enough to never change."""
+        return self.head is not None and number <= self.head - self.finality_depth
+
+    def encode(self, value: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), self.compress_level)
+
+    @staticmethod
+    def decode(data: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(data))
+
+    # --- local tier ---
+
+    def _local_get(self, number: int) -> Optional[bytes]:
+        data = self._local.get(number)
+        if data is not None:
+            self._local.move_to_end(number)
+        return data
+
+    def _local_put(self, number: int, data: bytes) -> None:
+        self._local_drop(number)
+        if len(data) > self.local_max_bytes:
+            return
+        self._local[number] = data
+        self._local_bytes += len(data)
+        while self._local_bytes > self.local_max_bytes:
+            _, evicted = self._local.popitem(last=False)
+            self._local_bytes -= len(evicted)
+
+    def _local_drop(self, number: int) -> None:
+        data = self._local.pop(number, None)
+        if data is not None:
+            self._local_bytes -= len(data)
+
+    # --- public API ---
+
+    async def get_many(self, numbers: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Look up blocks: local tier first, then one MGET for the rest.
+
+        Tip blocks that do not link to the next cached block are treated as misses.
+
+        Args:
+            numbers: Block numbers.
+
+        Returns:
+            Mapping of block number to raw block for the cache hits.
+        """
+        numbers = list(numbers)
+        found: Dict[int, bytes] = {}
+        remote: List[int] = []
+        for number in numbers:
+            data = self._local_get(number)
+            if data is not None:
+                found[number] = data
+            else:
+                remote.append(number)
+        local_numbers = set(found)
+
+        if remote and self.redis is not None:
+            try:
+                values = await self.redis.mget([self._key(number) for number in remote])
+            except Exception as e:
+                logger.warning(f"Block cache read failed: {e}")
+                values = [None] * len(remote)
+            for number, data in zip(remote, values):
+                if data is not None:
+                    found[number] = data
+                    self._local_put(number, data)
+
+        blocks: Dict[int, Dict[str, Any]] = {}
+        for number, data in found.items():
+            try:
+                blocks[number] = self.decode(data)
+            except (zlib.error, ValueError) as e:
+                logger.warning(f"Dropped corrupt cache entry {self._key(number)}: {e}")
+                await self.invalidate([number])
+        stale = self._unlinked_tip_blocks(blocks)
+        if stale:
+            await self.invalidate(stale)
+            for number in stale:
+                blocks.pop(number, None)
+
+        self.stats["hits"] += len(blocks)
+        self.stats["local_hits"] += len(local_numbers.intersection(blocks))
+        self.stats["misses"] += len(numbers) - len(blocks)
+        return blocks
+
+    def _unlinked_tip_blocks(self, blocks: Dict[int, Dict[str, Any]]) -> List[int]:
+        stale: List[int] = []
+        for number, block in blocks.items():
+            child = blocks.get(number + 1)
+            if child is not None and not self.is_final(number) and child.get("parentHash") != block.get("hash"):
+                # Either side may be the orphan: refetch both
+                stale.extend((number, number + 1))
+        return sorted(set(stale))
+
+    async def put_many(self, blocks: Dict[int, Dict[str, Any]]) -> None:
+        """Store freshly fetched blocks; finalized ones with final_ttl and in the index, tip ones with tip_ttl.
+
+        A cached tip block that is not the parent of a new block belongs to an
+        orphaned branch: every cached tip block below the new one is invalidated.
+
+        Args:
+            blocks: Mapping of block number to raw block.
+        """
+        if not blocks:
+            return
+        for number in blocks:
+            self.observe_head(number)
+
+        await self._invalidate_reorged(blocks)
+
+        pipe = self.redis.pipeline(transaction=False) if self.redis is not None else None
+        final: Dict[str, int] = {}
+        for number, block in blocks.items():
+            data = self.encode(block)
+            self._local_put(number, data)
+            self.stats["stored"] += 1
+            self.stats["bytes_stored"] += len(data)
+            if pipe is None:
+                continue
+            if self.is_final(number):
+                pipe.setex(self._key(number), self.final_ttl, data)
+                final[str(number)] = number
+            else:
+                pipe.setex(self._key(number), self.tip_ttl, data)
+        if pipe is None:
+            return
+        if final:
+            pipe.zadd(self._index_key, final)
+            pipe.zcard(self._index_key)
+        try:
+            results = await pipe.execute()
+            if final and results[-1] > self.max_final_blocks:
+                await self._evict(results[-1] - self.max_final_blocks)
+        except Exception as e:
+            logger.warning(f"Block cache write failed: {e}")
+
+    async def _evict(self, count: int) -> None:
+        """Drop the count lowest finalized blocks from Redis.
+
+        ZPOPMIN hands every member to one caller only, so concurrent workers
+        never evict the same blocks twice.
+        """
+        popped = await self.redis.zpopmin(self._index_key, count)
+        if popped:
+            await self.redis.delete(*[self._key(int(member)) for member, _ in popped])
+            self.stats["evicted"] += len(popped)
+
+    async def _invalidate_reorged(self, blocks: Dict[int, Dict[str, Any]]) -> None:
+        parents: Dict[int, str] = {
+            number - 1: block.get("parentHash")
+            for number, block in blocks.items()
+            if number - 1 not in blocks and not self.is_final(number - 1)
+        }
+        if not parents:
+            return
+        cached = await self._peek_many(parents)
+        for number, data in cached.items():
+            try:
+                cached_hash = self.decode(data).get("hash")
+            except (zlib.error, ValueError):
+                cached_hash = None
+            if cached_hash != parents[number]:
+                floor = (self.head - self.finality_depth) if self.head is not None else number
+                logger.warning(f"Reorg detected at block {number}: invalidating cached tip blocks from {floor + 1}")
+                await self.invalidate(range(floor + 1, number + 1))
+                return
+
+    async def _peek_many(self, numbers: Iterable[int]) -> Dict[int, bytes]:
+        """Read entries without touching the hit/miss counters."""
+        found: Dict[int, bytes] = {}
+        remote: List[int] = []
+        for number in numbers:
+            data = self._local.get(number)
+            if data is not None:
+                found[number] = data
+            else:
+                remote.append(number)
+        if remote and self.redis is not None:
+            try:
+                values = await self.redis.mget([self._key(number) for number in remote])
+            except Exception as e:
+                logger.warning(f"Block cache read failed: {e}")
+                values = []
+            for number, data in zip(remote, values):
+                if data is not None:
+                    found[number] = data
+        return found
+
+    async def invalidate(self, numbers: Iterable[int]) -> None:
+        """Drop blocks from both tiers."""
+        numbers = list(numbers)
+        if not numbers:
+            return
+        for number in numbers:
+            self._local_drop(number)
+        self.stats["invalidated"] += len(numbers)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(*[self._key(number) for number in numbers])
+            except Exception as e:
+                logger.warning(f"Block cache invalidation failed: {e}")
+
+    async def flush_stats(self, redis: Optional[Redis] = None) -> None:
+        """Add the counters of this instance to the shared totals in Redis and reset them.
+
+        Args:
+            redis: Redis client the totals are kept in (read by the API), the cache's own by default.
+        """
+        redis = redis if redis is not None else self.redis
+        if redis is None or not any(self.stats.values()):
+            return
+        pipe = redis.pipeline(transaction=False)
+        for name, value in self.stats.items():
+            if value:
+                pipe.hincrby(REDIS_CACHE_STATS_KEY, f"{self.kind}:{name}", value)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to flush block cache stats: {e}")
+            return
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    @staticmethod
+    async def read_stats(redis: Redis) -> Dict[str, Dict[str, int]]:
+        """Shared cache totals per kind, with the hit ratio.
+
+        Args:
+            redis: Redis client.
+
+        Returns:
+            {"block": {"hits": ..., "misses": ..., "rpc_saved": ..., "hit_ratio": ...}, ...}
+        """
+        raw = await redis.hgetall(REDIS_CACHE_STATS_KEY)
+        totals: Dict[str, Dict[str, Any]] = {}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            kind, _, name = field.partition(":")
+            totals.setdefault(kind, {})[name] = int(value)
+        for counters in totals.values():
+            lookups = counters.get("hits", 0) + counters.get("misses", 0)
+            counters["rpc_saved"] = counters.get("hits", 0)
+            counters["hit_ratio"] = round(counters.get("hits", 0) / lookups, 4) if lookups else 0.0
+        return totals
@@ -0,0 +1,257 @@
+# analyzer_transactions/block_fetcher.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, Union
+import aiohttp
+from analyzer_transactions import logger
+from analyzer_transactions.rpc_client import RpcClient, RpcHttpError
+from analyzer_transactions.block_cache import BlockCache
+
+# HTTP statuses treated as a signal to back off
+CONGESTION_STATUSES = {429, 503}
+
+
+class AdaptiveWindow:
+    """Concurrency window that grows while latency stays flat and halves on congestion.
+
+    Additive increase: +1 slot per window's worth of fast responses.
+    Multiplicative decrease: the limit is halved on timeouts and HTTP 429/503.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 latency_tolerance: float = 2.0, ewma_alpha: float = 0.2) -> None:
+        """Initialize the window.
+
+        Args:
+            initial: Starting number of concurrent requests.
+            minimum: Lower bound of the window.
+            maximum: Upper bound of the window.
+            latency_tolerance: Allowed ratio of smoothed latency to the baseline
+                before the window stops growing and starts shrinking.
+            ewma_alpha: Smoothing factor of the latency EWMA.
+        """
+        self.minimum: int = max(1, minimum)
+        self.maximum: int = max(self.minimum, maximum)
+        self.limit: float = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_tolerance: float = latency_tolerance
+        self.ewma_alpha: float = ewma_alpha
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+        self.in_flight: int = 0
+        self.peak_in_flight: int = 0
+        self.congestion_events: int = 0
+        self._cond: asyncio.Condition = asyncio.Condition()
+
+    @property
+    def size(self) -> int:
+        """Current integer window size."""
+        return int(self.limit)
+
+    async def acquire(self) -> None:
+        """Wait for a free slot in the window."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.size)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def release(self) -> None:
+        """Return a slot to the window."""
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        """Record a successful request and adjust the window.
+
+        Args:
+            latency: Request latency in seconds.
+        """
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.ewma_alpha * (latency - self.latency_ewma)
+        if self.latency_baseline is None or latency < self.latency_baseline:
+            self.latency_baseline = latency
+
+        if self.latency_ewma <= self.latency_baseline * self.latency_tolerance:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.size)
+        else:
+            self.limit = max(self.minimum, self.limit - 1.0 / self.size)
+
+    def on_congestion(self) -> None:
+        """Record a timeout or rate-limit response and halve the window."""
+        self.congestion_events += 1
+        self.limit = max(float(self.minimum), self.limit / 2)
+        # Latency observed before the overload is no longer a reliable baseline
+        self.latency_baseline = self.latency_ewma
+        logger.debug(f"Concurrency window reduced to {self.size}")
+
+
+class BlockFetcher:
+    """Fetch raw blocks in batches under an adaptive concurrency window."""
+
+    def __init__(self, rpc: RpcClient, window: AdaptiveWindow, max_retries: int = 5,
+                 backoff: float = 0.5, cache: Optional[BlockCache] = None) -> None:
+        """Initialize the fetcher.
+
+        Args:
+            rpc: JSON-RPC client; its batch_size defines the blocks per request.
+            window: Concurrency window shared by all fetches of this node.
+            max_retries: Retries of a request after a timeout or rate-limit response.
+            backoff: Base delay before a retry in seconds (doubled on each attempt).
+            cache: Optional block cache consulted before the node.
+        """
+        self.rpc: RpcClient = rpc
+        self.window: AdaptiveWindow = window
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff
+        self.cache: Optional[BlockCache] = cache
+
+    @staticmethod
+    def _is_congestion(error: BaseException) -> bool:
+        if isinstance(error, RpcHttpError):
+            return error.status in CONGESTION_STATUSES
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+    async def _fetch_chunk(self, chunk: List[int], results: asyncio.Queue) -> None:
+        """Fetch one request worth of blocks, retrying on congestion.
+
+        The caller acquires the window slot; it is released here.
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        holding = True
+        try:
+            while True:
+                started = loop.time()
+                try:
+                    blocks = await self.rpc.get_blocks(chunk, full_transactions=True)
+                except Exception as e:
+                    await self.window.release()
+                    holding = False
+                    if self._is_congestion(e) and attempt < self.max_retries:
+                        self.window.on_congestion()
+                        attempt += 1
+                        await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                        await self.window.acquire()
+                        holding = True
+                        continue
+                    logger.error(f"Error fetching blocks {chunk[0]} — {chunk[-1]}: {e!r}")
+                    for number in chunk:
+                        await results.put((number, e))
+                    return
+                self.window.on_success(loop.time() - started)
+                await self.window.release()
+                holding = False
+                if self.cache is not None:
+                    await self.cache.put_many({
+                        number: block for number, block in blocks.items()
+                        if not isinstance(block, BaseException)
+                    })
+                for number in chunk:
+                    await results.put((number, blocks[number]))
+                return
+        finally:
+            if holding:
+                await self.window.release()
+
+    async def _refresh_head(self) -> None:
+        """Update the cache's chain head, which decides what is finalized."""
+        try:
+            self.cache.observe_head(int(await self.rpc.call("eth_blockNumber"), 16))
+        except Exception as e:
+            # Without a head every block is treated as a tip block (short TTL)
+            logger.warning(f"Failed to read the chain head for the block cache: {e!r}")
+
+    async def _produce(self, block_numbers: List[int], results: asyncio.Queue, capacity: asyncio.Semaphore) -> None:
+        """Schedule chunk requests, never more than the window allows.
+
+        A chunk is only scheduled once ``capacity`` has room for all of its
+        blocks; the consumer returns one unit per block taken from the queue.
+        """
+        batch_size = self.rpc.batch_size
+        tasks: List[asyncio.Task] = []
+        try:
+            for offset in range(0, len(block_numbers), batch_size):
+                for _ in block_numbers[offset:offset + batch_size]:
+                    await capacity.acquire()
+                await self.window.acquire()
+                tasks.append(asyncio.create_task(
+                    self._fetch_chunk(block_numbers[offset:offset + batch_size], results)
+                ))
+                tasks = [task for task in tasks if not task.done()]
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        await results.put(None)
+
+    async def fetch(self, block_numbers: List[int],
+                    head: Optional[int] = None) -> AsyncGenerator[Tuple[int, Union[Dict[str, Any], BaseException]], None]:
+        """Fetch blocks, yielding them in completion order.
+
+        Cached blocks are yielded first; only the misses are requested from the
+        node. Blocks fetched but not yet taken by the consumer (in flight or
+        queued) never exceed the queue bound, so a slow consumer pauses fetching
+        and memory does not grow with the range.
+
+        Args:
+            block_numbers: Block numbers to fetch.
+            head: Chain head if the caller already knows it (saves the lookup for the cache).
+
+        Yields:
+            Tuples of (block_number, raw_block) where raw_block is the raw JSON block
+            or the exception raised for that block.
+        """
+        block_numbers = list(block_numbers)
+        bound = self.window.maximum * self.rpc.batch_size
+        if self.cache is not None:
+            if head is None:
+                await self._refresh_head()
+            else:
+                self.cache.observe_head(head)
+            missing: List[int] = []
+            # Looked up in slices of the queue bound: a cached range is not loaded at once
+            for offset in range(0, len(block_numbers), bound):
+                numbers = block_numbers[offset:offset + bound]
+                cached = await self.cache.get_many(numbers)
+                for number in numbers:
+                    if number in cached:
+                        yield number, cached.pop(number)
+                    else:
+                        missing.append(number)
+            block_numbers = missing
+            if not block_numbers:
+                return
+
+        results: asyncio.Queue = asyncio.Queue(maxsize=bound)
+        # The window limits requests in flight; this limits blocks held in memory
+        capacity = asyncio.Semaphore(bound)
+        producer = asyncio.create_task(self._produce(block_numbers, results, capacity))
+        try:
+            while True:
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    # Producer stopped without the end marker: surface its error
+                    getter.cancel()
+                    producer.result()
+                    break
+                item = getter.result()
+                if item is None:
+                    break
+                capacity.release()
+                yield item
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
@@ -0,0 +1,227 @@
+# analyzer_transactions/codec.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import struct
+from typing import Any, Callable, Dict, Mapping, Tuple
+from analyzer_transactions.swap_record import SwapRecord
+
+# Every payload starts with MAGIC and the format version it was written with
+MAGIC: bytes = b"SB"
+FORMAT_VERSION: int = 1
+HEADER_SIZE: int = len(MAGIC) + 1
+# Name and MIME type under which the codec is registered in kombu
+SERIALIZER_NAME: str = "swapbin"
+CONTENT_TYPE: str = "application/x-swapbin"
+
+# Type tags of format version 1
+NONE, FALSE, TRUE = 0x00, 0x01, 0x02
+INT8, INT32, INT64, BIGINT = 0x03, 0x04, 0x05, 0x06
+FLOAT = 0x07
+STR8, STR32 = 0x08, 0x09
+BYTES8, BYTES32 = 0x0A, 0x0B
+LIST8, LIST32 = 0x0C, 0x0D
+DICT8, DICT32 = 0x0E, 0x0F
+SWAP_RECORD = 0x10
+
+_INT32 = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_UINT32 = struct.Struct(">I")
+_FLOAT = struct.Struct(">d")
+
+
+class CodecError(ValueError):
+    """Raised for values the codec cannot encode and payloads it cannot decode."""
+
+
+def _encode_sized(out: bytearray, tag8: int, tag32: int, size: int) -> None:
+    if size < 0x100:
+        out.append(tag8)
+        out.append(size)
+    else:
+        out.append(tag32)
+        out += _UINT32.pack(size)
+
+
+def _encode_value(obj: Any, out: bytearray) -> None:
+    kind = type(obj)
+    if kind is str:
+        data = obj.encode()
+        _encode_sized(out, STR8, STR32, len(data))
+        out += data
+    elif kind is int:
+        if -0x80 <= obj < 0x80:
+            out.append(INT8)
+            out.append(obj & 0xFF)
+        elif -0x8000_0000 <= obj < 0x8000_0000:
+            out.append(INT32)
+            out += _INT32.pack(obj)
+        elif -0x8000_0000_0000_0000 <= obj < 0x8000_0000_0000_0000:
+            out.append(INT64)
+            out += _INT64.pack(obj)
+        else:
+            # uint256 amounts: two's complement, big-endian, as many bytes as needed
+            data = obj.to_bytes((obj.bit_length() + 8) // 8, "big", signed=True)
+            if len(data) > 0xFF:
+                raise CodecError(f"Integer too large to encode: {obj.bit_length()} bits")
+            out.append(BIGINT)
+            out.append(len(data))
+            out += data
+    elif kind is dict:
+        _encode_sized(out, DICT8, DICT32, len(obj))
+        for key, value in obj.items():
+            _encode_value(key, out)
+            _encode_value(value, out)
+    elif kind is list or kind is tuple:
+        _encode_sized(out, LIST8, LIST32, len(obj))
+        for item in obj:
+            _encode_value(item, out)
+    elif obj is None:
+        out.append(NONE)
+    elif kind is bool:
+        out.append(TRUE if obj else FALSE)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        # HexBytes included; decoded back as plain bytes
+        _encode_sized(out, BYTES8, BYTES32, len(obj))
+        out += obj
+    elif kind is float:
+        out.append(FLOAT)
+        out += _FLOAT.pack(obj)
+    elif isinstance(obj, SwapRecord):
+        out.append(SWAP_RECORD)
+        for name in SwapRecord.__slots__:
+            _encode_value(getattr(obj, name), out)
+    elif isinstance(obj, int):
+        _encode_value(int(obj), out)
+    elif isinstance(obj, str):
+        _encode_value(str(obj), out)
+    elif isinstance(obj, Mapping):
+        # web3 AttributeDict and other read-only mappings
+        _encode_value(dict(obj), out)
+    else:
+        raise CodecError(f"Cannot encode value of type {kind.__name__}")
+
+
+def _decode_value(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == STR8:
+        end = pos + 1 + data[pos]
+        return data[pos + 1:end].decode(), end
+    if tag == INT8:
+        value = data[pos]
+        return (value - 0x100 if value & 0x80 else value), pos + 1
+    if tag == DICT8 or tag == DICT32:
+        if tag == DICT8:
+            count, pos = data[pos], pos + 1
+        else:
+            count, pos = _UINT32.unpack_from(data, pos)[0], pos + 4
+        result: Dict[Any, Any] = {}
+        for _ in range(count):
+            key, pos = _decode_value(data, pos)
+            result[key], pos = _decode_value(data, pos)
+        return result, pos
+    if tag == LIST8 or tag == LIST32:
+        if tag == LIST8:
+            count, pos = data[pos], pos + 1
+        else:
+            count, pos = _UINT32.unpack_from(data, pos)[0], pos + 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == NONE:
+        return None, pos
+    if tag == BYTES8:
+        end = pos + 1 + data[pos]
+        return bytes(data[pos + 1:end]), end
+    if tag == INT32:
+        return _INT32.unpack_from(data, pos)[0], pos + 4
+    if tag == INT64:
+        return _INT64.unpack_from(data, pos)[0], pos + 8
+    if tag == BIGINT:
+        end = pos + 1 + data[pos]
+        return int.from_bytes(data[pos + 1:end], "big", signed=True), end
+    if tag == FALSE or tag == TRUE:
+        return tag == TRUE, pos
+    if tag == FLOAT:
+        return _FLOAT.unpack_from(data, pos)[0], pos + 8
+    if tag == STR32:
+        size = _UINT32.unpack_from(data, pos)[0]
+        return data[pos + 4:pos + 4 + size].decode(), pos + 4 + size
+    if tag == BYTES32:
+        size = _UINT32.unpack_from(data, pos)[0]
+        return bytes(data[pos + 4:pos + 4 + size]), pos + 4 + size
+    if tag == SWAP_RECORD:
+        fields = []
+        for _ in SwapRecord.__slots__:
+            value, pos = _decode_value(data, pos)
+            fields.append(value)
+        return SwapRecord(*fields), pos
+    raise CodecError(f"Unknown type tag 0x{tag:02x} at offset {pos - 1}")
+
+
+# Format version -> decoder of the body; older versions stay readable after a format change
+_DECODERS: Dict[int, Callable[[bytes, int], Tuple[Any, int]]] = {
+    1: _decode_value,
+}
+
+
+def encode(obj: Any) -> bytes:
+    """Encode a value into the versioned binary format.
+
+    Unlike the JSON path (``deep_serialize``), integers of any size, bytes and
+    SwapRecords keep their types: a uint256 amount takes 1 + 1..33 bytes
+    instead of its decimal string, a hash 34 bytes instead of 66 hex digits.
+
+    Args:
+        obj: None, bool, int, float, str, bytes, list/tuple, dict or SwapRecord,
+            nested arbitrarily.
+
+    Returns:
+        Payload with the format header.
+    """
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _encode_value(obj, out)
+    return bytes(out)
+
+
+def decode(data: bytes) -> Any:
+    """Decode a payload written by encode() with any supported format version.
+
+    Tuples are returned as lists and bytes-like values as plain bytes.
+
+    Raises:
+        CodecError: The header is missing, the version is unknown or the payload is malformed.
+    """
+    if not is_encoded(data):
+        raise CodecError("Missing swapbin header")
+    decoder = _DECODERS.get(data[len(MAGIC)])
+    if decoder is None:
+        raise CodecError(f"Unsupported swapbin format version {data[len(MAGIC)]}")
+    try:
+        value, end = decoder(data, HEADER_SIZE)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise CodecError(f"Truncated or malformed swapbin payload: {e}") from None
+    if end > len(data):
+        raise CodecError("Truncated swapbin payload")
+    if end < len(data):
+        raise CodecError(f"{len(data) - end} trailing bytes after swapbin payload")
+    return value
+
+
+def is_encoded(data: bytes) -> bool:
+    """Whether the payload was written by encode() (as opposed to legacy JSON)."""
+    return len(data) >= HEADER_SIZE and data[:len(MAGIC)] == MAGIC
+
+
+def register_kombu_serializer() -> None:
+    """Register the codec in kombu under SERIALIZER_NAME for Celery messages and results."""
+    from kombu.serialization import register
+
+    register(SERIALIZER_NAME, encode, decode, content_type=CONTENT_TYPE, content_encoding="binary")
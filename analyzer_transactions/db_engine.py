@@ -0,0 +1,100 @@
+# analyzer_transactions/db_engine.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from loguru import logger
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from config.settings import DATABASE_URL
+
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+# (pid, id(loop), url) -> (loop, engine). asyncpg connections belong to the loop
+# that opened them, so every process/event loop pair gets its own pool.
+_engines: Dict[Tuple[int, int, str], Tuple[Optional[asyncio.AbstractEventLoop], AsyncEngine]] = {}
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_engine(url: Optional[str] = None) -> AsyncEngine:
+    """Return the shared engine for this process, event loop and database URL.
+
+    The engine is created on first use and reused by every DatabaseWorker on
+    the same loop until dispose_engines() is called.
+
+    Args:
+        url: Database URL (defaults to DATABASE_URL).
+
+    Returns:
+        AsyncEngine with a connection pool of DB_POOL_SIZE (+DB_MAX_OVERFLOW).
+    """
+    url = url or DATABASE_URL
+    loop = _current_loop()
+    key = (os.getpid(), id(loop), url)
+    entry = _engines.get(key)
+    if entry is not None and entry[0] is loop and not (loop is not None and loop.is_closed()):
+        return entry[1]
+
+    engine = create_async_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+    _engines[key] = (loop, engine)
+    logger.info(f"Created database engine for pid {os.getpid()} (pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW})")
+    return engine
+
+
+async def dispose_engines() -> int:
+    """Dispose the engines that belong to the running event loop of this process.
+
+    Engines of event loops that are already closed are dropped as well.
+
+    Returns:
+        Number of engines disposed.
+    """
+    loop = _current_loop()
+    pid = os.getpid()
+    disposed = 0
+    for key, (engine_loop, engine) in list(_engines.items()):
+        if key[0] != pid:
+            continue
+        if engine_loop is loop:
+            await engine.dispose()
+            disposed += 1
+            del _engines[key]
+        elif engine_loop is not None and engine_loop.is_closed():
+            del _engines[key]
+    if disposed:
+        logger.info(f"Disposed {disposed} database engine(s) for pid {pid}")
+    return disposed
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Connection pool statistics of the engines created in this process.
+
+    Returns:
+        One dictionary per engine with the masked URL and pool counters.
+    """
+    stats: List[Dict[str, Any]] = []
+    for (pid, loop_id, url), (_, engine) in _engines.items():
+        if pid != os.getpid():
+            continue
+        pool = engine.pool
+        stats.append({
+            "url": make_url(url).render_as_string(hide_password=True),
+            "pid": pid,
+            "loop_id": loop_id,
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    return stats
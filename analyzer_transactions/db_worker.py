@@ -4,17 +4,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import json
 import re
+import time
 from loguru import logger
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String, JSON, BigInteger, text, select
+from sqlalchemy import Column, Integer, String, JSON, BigInteger, text, select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import OperationalError, ProgrammingError, SQLAlchemyError
 from redis.asyncio import Redis
 from config.settings import DATABASE_URL
+from analyzer_transactions.db_engine import get_engine
+from analyzer_transactions.swap_record import SwapRecord, SwapBatch, json_safe
 
 Base = declarative_base()
 POSTGRES_DB = os.getenv("POSTGRES_DB", "analyzer")
 POSTGRES_TABLE_SWAP: str = os.getenv("POSTGRES_TABLE_SWAP", "swap_txs")
+# Rows per INSERT statement (3 bind parameters per row, PostgreSQL allows 32767)
+DB_INSERT_CHUNK_SIZE: int = int(os.getenv("DB_INSERT_CHUNK_SIZE", 1000))
 
 class Transaction(Base):
     __tablename__ = POSTGRES_TABLE_SWAP
@@ -23,12 +29,35 @@ class Transaction(Base):
     block_number = Column(BigInteger)
     decoded_input = Column(JSON)
 
+def _decoded_with_receipt(tx: dict):
+    """decoded_input with the receipt data (see analyzer_transactions.receipts) under "executed"."""
+    decoded = tx.get("decoded_input")
+    if tx.get("executed") is None:
+        return decoded
+    return {**(decoded or {}), "executed": tx["executed"]}
+
+
+def to_tx_rows(transactions: list) -> list[dict]:
+    """Convert decoded analyzer transactions (SwapRecords or dictionaries) to rows for save_transactions."""
+    if transactions and all(isinstance(tx, SwapRecord) for tx in transactions):
+        return SwapBatch.from_records(transactions).rows()
+    transactions = [tx.to_dict() if isinstance(tx, SwapRecord) else tx for tx in transactions]
+    return [
+        {
+            "tx_hash": "0x" + tx["hash"].hex() if isinstance(tx["hash"], bytes) else tx["hash"],
+            "block_number": tx.get("blockNumber"),
+            "decoded_input": json_safe(_decoded_with_receipt(tx))
+        }
+        for tx in transactions if isinstance(tx, dict) and "hash" in tx
+    ]
+
 class DatabaseWorker:
     """Class for working with PostgreSQL database."""
     def __init__(self):
         self.logger = logger
         self.DB_URI = DATABASE_URL
-        self.engine = create_async_engine(self.DB_URI, pool_size=20, max_overflow=10)
+        # Shared per process and event loop, see analyzer_transactions.db_engine
+        self.engine = get_engine(self.DB_URI)
 
     async def connect(self):
         """Test database connection."""
@@ -36,9 +65,8 @@ class DatabaseWorker:
             self.logger.info("Connected to PostgreSQL database.")
 
     async def close(self):
-        """Dispose of the engine."""
-        await self.engine.dispose()
-        self.logger.info("Database engine disposed.")
+        """Release the worker. The shared engine is disposed by dispose_engines() on shutdown."""
+        self.logger.debug("Database worker released.")
 
     async def __aenter__(self):
         await self.connect()
@@ -98,33 +126,83 @@ class DatabaseWorker:
             else:
                 self.logger.info(f"Table '{table_name}' already exists.")
 
-    async def save_transactions(self, redis: Redis, tx_data_list: list[dict]):
-        """Save transactions from the provided list to database."""
-        async_session = sessionmaker(self.engine, class_=AsyncSession)
-        async with async_session() as session:
-            saved_count = 0
-            for tx_data in tx_data_list:
-                tx_hash = tx_data.get("tx_hash")
-                if not tx_hash:
-                    self.logger.warning("Transaction data missing tx_hash, skipping")
-                    continue
-                
-                # Проверяем, не существует ли транзакция в базе данных
-                existing = await session.execute(select(Transaction).filter(Transaction.tx_hash == tx_hash))
-                if not existing.scalars().first():
-                    transaction = Transaction(
-                        tx_hash=tx_hash,
-                        block_number=tx_data.get("block_number"),
-                        decoded_input=tx_data.get("decoded_input")
-                    )
-                    session.add(transaction)
-                    # Сохраняем данные в Redis (если их там нет)
-                    await redis.setex(f"tx:{tx_hash}", 3600, json.dumps(tx_data))
-                    # Устанавливаем флаг в Redis
-                    await redis.setex(f"tx:{tx_hash}:saved_to_db", 3600, "true")
-                    saved_count += 1
-            await session.commit()
-        self.logger.info(f"Saved {saved_count} transactions from {len(tx_data_list)} provided to table 'swap_txs'.")
+    def _build_insert(self, rows: list[dict]):
+        """Build a bulk INSERT ... ON CONFLICT (tx_hash) DO NOTHING RETURNING tx_hash statement."""
+        return (
+            pg_insert(Transaction)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Transaction.tx_hash])
+            .returning(Transaction.tx_hash)
+        )
+
+    async def save_transactions(self, redis: Redis, tx_data_list: list[dict], chunk_size: int = None) -> dict:
+        """Bulk-save transactions, skipping hashes that already exist in the table.
+
+        Rows are written in chunks with INSERT ... ON CONFLICT (tx_hash) DO NOTHING,
+        and the saved_to_db flags of the inserted rows are set in one pipeline.
+        The ``tx:{hash}`` values themselves are left to the analyzer
+        (save_batch_to_redis), so the key holds one REDIS_CODEC format only.
+
+        Returns:
+            dict: provided, inserted and skipped counts, elapsed seconds and rows/sec.
+        """
+        chunk_size = chunk_size or DB_INSERT_CHUNK_SIZE
+        started = time.perf_counter()
+
+        rows_by_hash: dict = {}
+        for tx_data in tx_data_list:
+            tx_hash = tx_data.get("tx_hash")
+            if not tx_hash:
+                self.logger.warning("Transaction data missing tx_hash, skipping")
+                continue
+            rows_by_hash.setdefault(tx_hash, tx_data)
+
+        inserted_hashes: list[str] = []
+        if rows_by_hash:
+            rows = [
+                {
+                    "tx_hash": tx_hash,
+                    "block_number": tx_data.get("block_number"),
+                    "decoded_input": tx_data.get("decoded_input"),
+                }
+                for tx_hash, tx_data in rows_by_hash.items()
+            ]
+            async with self.engine.begin() as conn:
+                for offset in range(0, len(rows), chunk_size):
+                    result = await conn.execute(self._build_insert(rows[offset:offset + chunk_size]))
+                    inserted_hashes.extend(result.scalars().all())
+
+        if inserted_hashes:
+            # Флаги сохранения в Redis одним pipeline; tx:{hash} уже записан анализатором в формате REDIS_CODEC
+            pipe = redis.pipeline(transaction=False)
+            for tx_hash in inserted_hashes:
+                pipe.setex(f"tx:{tx_hash}:saved_to_db", 3600, "true")
+            await pipe.execute()
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "provided": len(tx_data_list),
+            "inserted": len(inserted_hashes),
+            "skipped": len(tx_data_list) - len(inserted_hashes),
+            "elapsed": round(elapsed, 4),
+            "rows_per_sec": round(len(rows_by_hash) / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        self.logger.info(
+            f"Saved {stats['inserted']} transactions from {stats['provided']} provided to table "
+            f"'{POSTGRES_TABLE_SWAP}' ({stats['skipped']} skipped, {stats['rows_per_sec']} rows/sec)."
+        )
+        return stats
+
+    async def delete_from_block(self, block_number: int) -> int:
+        """Delete transactions of block_number and later blocks (orphaned by a reorg).
+
+        Returns:
+            int: Number of deleted rows.
+        """
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(Transaction).where(Transaction.block_number >= block_number))
+        self.logger.info(f"Deleted {result.rowcount} transactions from block {block_number} on.")
+        return result.rowcount
 
     async def fetch_transactions(self, redis: Redis, tx_hash: str = None) -> list[dict]:
         """Fetch transactions from database with Redis caching."""
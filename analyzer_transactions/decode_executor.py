@@ -0,0 +1,174 @@
+# analyzer_transactions/decode_executor.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Union
+from analyzer_transactions import logger
+from analyzer_transactions.decoder import SelectorIndex
+
+DECODE_MODES = ("inline", "thread", "process")
+
+# Result of a worker for one calldata: None (unknown selector), an error message,
+# or (parameter values, expansions such as "calls"/"commands"/"hops")
+Compact = Union[None, str, Tuple[tuple, Optional[Dict[str, Any]]]]
+
+# Decoder table of a worker process, built once by _init_worker
+_worker_index: Optional[SelectorIndex] = None
+
+
+def _init_worker(abis: List[List[Dict[str, Any]]], methods: List[str]) -> None:
+    global _worker_index
+    _worker_index = SelectorIndex(abis, methods)
+
+
+def _decode_compact(index: SelectorIndex, calldata: bytes) -> Compact:
+    try:
+        decoded = index.decode(calldata)
+    except Exception as e:
+        return str(e) or repr(e)
+    if decoded is None:
+        return None
+    params = decoded.pop("params")
+    decoded.pop("method")
+    return tuple(params.values()), decoded or None
+
+
+def _decode_batch(calldatas: List[bytes]) -> List[Compact]:
+    """Worker process entry point: decode a batch with the preloaded table."""
+    return [_decode_compact(_worker_index, calldata) for calldata in calldatas]
+
+
+class DecodeExecutor:
+    """Runs calldata decoding inline, in a thread pool or in a process pool.
+
+    ``inline`` decodes on the event loop (the former behaviour). ``thread``
+    moves batches off the loop but still holds the GIL. ``process`` sends
+    batches of raw calldata to worker processes that build their own
+    SelectorIndex once; they return compact tuples that are turned back into
+    ``{"method", "params", ...}`` dictionaries with the local index.
+    """
+
+    def __init__(self, index: SelectorIndex, mode: str = "inline", workers: Optional[int] = None,
+                 batch_size: int = 256, abis: Optional[List[List[Dict[str, Any]]]] = None,
+                 methods: Optional[Iterable[str]] = None) -> None:
+        """Initialize the executor.
+
+        Args:
+            index: Selector index of the analyzer, used inline and to rebuild worker results.
+            mode: "inline", "thread" or "process".
+            workers: Pool size, defaults to the number of CPUs.
+            batch_size: Calldatas per pool task.
+            abis: ABIs the worker processes build their index from (process mode).
+            methods: Method names of the worker index (process mode).
+        """
+        if mode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {mode!r}, expected one of {DECODE_MODES}")
+        if mode == "process" and (abis is None or methods is None):
+            raise ValueError("Process mode needs the ABIs and methods of the index")
+        self.index: SelectorIndex = index
+        self.mode: str = mode
+        self.workers: int = workers or os.cpu_count() or 1
+        self.batch_size: int = max(1, batch_size)
+        self.abis = abis
+        self.methods: List[str] = list(methods or ())
+        self.stats: Dict[str, int] = {"decoded": 0, "unknown": 0, "errors": 0, "batches": 0}
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls, index: SelectorIndex, abis: List[List[Dict[str, Any]]], methods: Iterable[str]) -> "DecodeExecutor":
+        """Build the executor from DECODE_EXECUTOR, DECODE_WORKERS and DECODE_BATCH_SIZE."""
+        workers = os.getenv("DECODE_WORKERS")
+        return cls(
+            index,
+            mode=os.getenv("DECODE_EXECUTOR", "inline").lower(),
+            workers=int(workers) if workers else None,
+            batch_size=int(os.getenv("DECODE_BATCH_SIZE", 256)),
+            abis=abis,
+            methods=methods,
+        )
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="decode")
+            else:
+                # spawn: the workers must not inherit the event loop, sockets and threads of the parent
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.abis, self.methods),
+                )
+        return self._pool
+
+    def close(self) -> None:
+        """Shut the pool down."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _expand(self, calldata: bytes, compact: Compact) -> Optional[Dict[str, Any]]:
+        """Turn a worker result back into the dictionary returned by SelectorIndex.decode."""
+        if compact is None:
+            self.stats["unknown"] += 1
+            return None
+        entry = self.index.get(calldata)
+        if isinstance(compact, str):
+            self.stats["errors"] += 1
+            logger.error(f"Error decoding input for method {entry.name if entry else '?'}: {compact}")
+            return None
+        values, extra = compact
+        self.stats["decoded"] += 1
+        decoded: Dict[str, Any] = {"method": entry.name, "params": dict(zip(entry.input_names, values))}
+        if extra:
+            decoded.update(extra)
+        return decoded
+
+    def _decode_inline(self, calldatas: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = []
+        for calldata in calldatas:
+            try:
+                decoded = self.index.decode(calldata)
+            except Exception as e:
+                entry = self.index.get(calldata)
+                self.stats["errors"] += 1
+                logger.error(f"Error decoding input for method {entry.name if entry else '?'}: {e}")
+                results.append(None)
+                continue
+            self.stats["decoded" if decoded is not None else "unknown"] += 1
+            results.append(decoded)
+        return results
+
+    async def decode_many(self, calldatas: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """Decode calldatas with the configured executor.
+
+        Args:
+            calldatas: Raw transaction inputs.
+
+        Returns:
+            Decoded inputs in the order of ``calldatas``; None for unknown or malformed ones.
+        """
+        if not calldatas:
+            return []
+        if self.mode == "inline":
+            return self._decode_inline(calldatas)
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunks = [calldatas[offset:offset + self.batch_size] for offset in range(0, len(calldatas), self.batch_size)]
+        self.stats["batches"] += len(chunks)
+        if self.mode == "thread":
+            decoded = await asyncio.gather(*[loop.run_in_executor(pool, self._decode_inline, chunk) for chunk in chunks])
+            return [item for chunk in decoded for item in chunk]
+        compact = await asyncio.gather(*[loop.run_in_executor(pool, _decode_batch, chunk) for chunk in chunks])
+        return [
+            self._expand(calldata, result)
+            for chunk, results in zip(chunks, compact)
+            for calldata, result in zip(chunk, results)
+        ]
@@ -0,0 +1,298 @@
+# analyzer_transactions/decoder.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, NamedTuple, Callable, Union, Set, Tuple
+from eth_abi.registry import registry
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_utils import decode_hex
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_input_names
+
+SELECTOR_SIZE: int = 4
+# Wrapped calls nested deeper than this (multicall in multicall, execute sub-plans) are not decoded
+MAX_NESTING_DEPTH: int = 3
+# Inner payloads remembered by SelectorIndex (routers repeat the same calls across transactions)
+NESTED_MEMO_SIZE: int = 4096
+# Packed Uniswap V3 path: token (20 bytes), then fee (3 bytes) + token for every hop
+V3_PATH_ADDRESS_SIZE: int = 20
+V3_PATH_HOP_SIZE: int = 23
+# Universal Router command byte: low bits are the command type, the high bit allows it to revert
+COMMAND_TYPE_MASK: int = 0x3F
+FLAG_ALLOW_REVERT: int = 0x80
+_MISSING = object()
+
+
+class SelectorEntry(NamedTuple):
+    """Precompiled decoder for a single ABI function."""
+    name: str
+    input_names: List[str]
+    input_types: List[str]
+    decoder: Callable[[ContextFramesBytesIO], tuple]
+    abi_item: Dict[str, Any]
+
+
+class RouterCommand(NamedTuple):
+    """Precompiled decoder for the input of a Universal Router command."""
+    name: str
+    input_names: List[str]
+    decoder: Optional[Callable[[ContextFramesBytesIO], tuple]]
+
+
+def _command(name: str, inputs: List[Tuple[str, str]]) -> RouterCommand:
+    types = [input_type for _, input_type in inputs]
+    return RouterCommand(name, [input_name for input_name, _ in inputs], registry.get_tuple_decoder(*types) if inputs else None)
+
+
+# Commands.sol of the Universal Router; commands without inputs here are reported by name only
+UNIVERSAL_ROUTER_COMMANDS: Dict[int, RouterCommand] = {
+    0x00: _command("V3_SWAP_EXACT_IN", [("recipient", "address"), ("amountIn", "uint256"),
+                                        ("amountOutMin", "uint256"), ("path", "bytes"), ("payerIsUser", "bool")]),
+    0x01: _command("V3_SWAP_EXACT_OUT", [("recipient", "address"), ("amountOut", "uint256"),
+                                         ("amountInMax", "uint256"), ("path", "bytes"), ("payerIsUser", "bool")]),
+    0x02: _command("PERMIT2_TRANSFER_FROM", [("token", "address"), ("recipient", "address"), ("amount", "uint160")]),
+    0x03: _command("PERMIT2_PERMIT_BATCH", []),
+    0x04: _command("SWEEP", [("token", "address"), ("recipient", "address"), ("amountMin", "uint256")]),
+    0x05: _command("TRANSFER", [("token", "address"), ("recipient", "address"), ("value", "uint256")]),
+    0x06: _command("PAY_PORTION", [("token", "address"), ("recipient", "address"), ("bips", "uint256")]),
+    0x08: _command("V2_SWAP_EXACT_IN", [("recipient", "address"), ("amountIn", "uint256"),
+                                        ("amountOutMin", "uint256"), ("path", "address[]"), ("payerIsUser", "bool")]),
+    0x09: _command("V2_SWAP_EXACT_OUT", [("recipient", "address"), ("amountOut", "uint256"),
+                                         ("amountInMax", "uint256"), ("path", "address[]"), ("payerIsUser", "bool")]),
+    0x0A: _command("PERMIT2_PERMIT", []),
+    0x0B: _command("WRAP_ETH", [("recipient", "address"), ("amountMin", "uint256")]),
+    0x0C: _command("UNWRAP_WETH", [("recipient", "address"), ("amountMin", "uint256")]),
+    0x21: _command("EXECUTE_SUB_PLAN", [("commands", "bytes"), ("inputs", "bytes[]")]),
+}
+
+
+def decode_v3_path(path: bytes, exact_output: bool = False) -> List[Dict[str, Any]]:
+    """Split a packed Uniswap V3 path into token/fee hops.
+
+    Args:
+        path: Packed path (token, fee, token, ...).
+        exact_output: The path belongs to an exact-output swap and is encoded
+            from the output token back; the hops are returned in swap order.
+
+    Returns:
+        Hops as dictionaries with token_in, fee and token_out.
+
+    Raises:
+        ValueError: If the length is not a valid packed path.
+    """
+    if len(path) < V3_PATH_ADDRESS_SIZE + V3_PATH_HOP_SIZE or (len(path) - V3_PATH_ADDRESS_SIZE) % V3_PATH_HOP_SIZE:
+        raise ValueError(f"Invalid V3 path length: {len(path)}")
+    hops: List[Dict[str, Any]] = []
+    for offset in range(0, len(path) - V3_PATH_ADDRESS_SIZE, V3_PATH_HOP_SIZE):
+        first = "0x" + path[offset:offset + V3_PATH_ADDRESS_SIZE].hex()
+        fee = int.from_bytes(path[offset + V3_PATH_ADDRESS_SIZE:offset + V3_PATH_HOP_SIZE], "big")
+        second = "0x" + path[offset + V3_PATH_HOP_SIZE:offset + V3_PATH_HOP_SIZE + V3_PATH_ADDRESS_SIZE].hex()
+        hops.append({"token_in": first, "fee": fee, "token_out": second})
+    if exact_output:
+        hops = [{"token_in": hop["token_out"], "fee": hop["fee"], "token_out": hop["token_in"]} for hop in reversed(hops)]
+    return hops
+
+
+class SelectorIndex:
+    """Registry of prebuilt eth_abi decoders keyed by the raw 4-byte selector.
+
+    Detection and decoding of a transaction input are a single dict lookup on
+    ``input[:4]``: no hex conversion and no scan over the known signatures.
+
+    Wrapper calls are expanded recursively: the ``data`` of ``multicall`` is
+    decoded with the same index into ``calls`` and the inputs of a Universal
+    Router ``execute`` into ``commands``. V3 ``path`` bytes get ``hops``.
+    Inner payloads are memoized by their hash, so the result dictionaries may
+    be shared between transactions and must not be modified.
+    """
+
+    def __init__(self, abis: Iterable[List[Dict[str, Any]]], methods: Iterable[str],
+                 max_depth: int = MAX_NESTING_DEPTH, memo_size: int = NESTED_MEMO_SIZE) -> None:
+        """Build the index from ABI definitions.
+
+        Args:
+            abis: ABI definitions (lists of ABI items).
+            methods: Names of the functions to include.
+            max_depth: Nesting depth up to which wrapped calls are decoded.
+            memo_size: Number of decoded inner payloads remembered.
+        """
+        self.max_depth: int = max_depth
+        self.memo_size: int = memo_size
+        self._memo: "OrderedDict[Tuple[str, int, bytes], Optional[Dict[str, Any]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"nested": 0, "memo_hits": 0, "too_deep": 0, "malformed": 0}
+        self._expanders: Dict[str, Callable[[Dict[str, Any], int], None]] = {
+            "multicall": self._expand_multicall,
+            "execute": self._expand_execute,
+            "exactInput": self._expand_path,
+            "exactOutput": self._expand_path,
+        }
+        self.entries: Dict[bytes, SelectorEntry] = {}
+        # Lowercase hex selectors (without 0x) for filtering raw JSON-RPC transactions
+        self.hex_selectors: Set[str] = set()
+        wanted = set(methods)
+        for abi in abis:
+            for item in abi:
+                if not isinstance(item, dict):
+                    continue
+                if item.get("type") != "function" or item.get("name") not in wanted:
+                    continue
+                self.add(item)
+
+    def add(self, abi_item: Dict[str, Any]) -> bytes:
+        """Compile and register a decoder for an ABI function item.
+
+        Args:
+            abi_item: ABI function definition.
+
+        Returns:
+            The 4-byte selector of the function.
+        """
+        selector: bytes = bytes(function_abi_to_4byte_selector(abi_item))
+        input_types: List[str] = list(get_abi_input_types(abi_item))
+        self.entries[selector] = SelectorEntry(
+            name=abi_item["name"],
+            input_names=list(get_abi_input_names(abi_item)),
+            input_types=input_types,
+            decoder=registry.get_tuple_decoder(*input_types),
+            abi_item=abi_item,
+        )
+        self.hex_selectors.add(selector.hex())
+        return selector
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, selector: bytes) -> bool:
+        return selector in self.entries
+
+    def matches_hex(self, input_hex: Optional[str]) -> bool:
+        """Check the selector of a raw JSON-RPC ``input`` field without decoding it.
+
+        Args:
+            input_hex: 0x-prefixed hex calldata as returned by the node.
+
+        Returns:
+            True if the selector belongs to the index.
+        """
+        return bool(input_hex) and input_hex[2:10].lower() in self.hex_selectors
+
+    def get(self, calldata: bytes) -> Optional[SelectorEntry]:
+        """Look up the entry for the selector of the given calldata.
+
+        Args:
+            calldata: Raw transaction input.
+
+        Returns:
+            The matching entry, or None if the selector is unknown.
+        """
+        return self.entries.get(calldata[:SELECTOR_SIZE])
+
+    def decode(self, calldata: Union[bytes, str]) -> Optional[Dict[str, Any]]:
+        """Decode calldata into the method name and its named parameters.
+
+        Args:
+            calldata: Raw transaction input (bytes or 0x-prefixed hex string).
+
+        Returns:
+            Dictionary with method name and decoded parameters, or None if the
+            selector is unknown.
+
+        Raises:
+            eth_abi.exceptions.DecodingError: If the arguments are malformed.
+        """
+        if isinstance(calldata, str):
+            calldata = decode_hex(calldata)
+        return self._decode(calldata, 0)
+
+    def _decode(self, calldata: bytes, depth: int) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(calldata[:SELECTOR_SIZE])
+        if entry is None:
+            return None
+        values: tuple = entry.decoder(ContextFramesBytesIO(calldata[SELECTOR_SIZE:]))
+        decoded: Dict[str, Any] = {
+            "method": entry.name,
+            "params": dict(zip(entry.input_names, values)),
+        }
+        expand = self._expanders.get(entry.name)
+        if expand is not None:
+            expand(decoded, depth)
+        return decoded
+
+    def _memoized(self, kind: str, payload: bytes, depth: int,
+                  decode: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Decode a wrapped payload once per distinct content; None if too deep or malformed.
+
+        The key includes the kind of payload ("call" or "command") and the
+        depth: the same payload decoded deeper may have been cut at max_depth.
+        """
+        if depth > self.max_depth:
+            self.stats["too_deep"] += 1
+            return None
+        self.stats["nested"] += 1
+        key = (kind, depth, hashlib.blake2b(payload, digest_size=16).digest())
+        cached = self._memo.get(key, _MISSING)
+        if cached is not _MISSING:
+            try:
+                self._memo.move_to_end(key)
+            except KeyError:  # Evicted by another decode thread meanwhile
+                pass
+            self.stats["memo_hits"] += 1
+            return cached
+        try:
+            decoded = decode()
+        except Exception:
+            # A malformed inner call does not invalidate the rest of the wrapper
+            self.stats["malformed"] += 1
+            decoded = None
+        self._memo[key] = decoded
+        while len(self._memo) > self.memo_size:
+            try:
+                self._memo.popitem(last=False)
+            except KeyError:
+                break
+        return decoded
+
+    def _expand_multicall(self, decoded: Dict[str, Any], depth: int) -> None:
+        decoded["calls"] = [
+            self._memoized("call", data, depth + 1, lambda data=data: self._decode(data, depth + 1))
+            for data in decoded["params"].get("data", ())
+        ]
+
+    def _expand_execute(self, decoded: Dict[str, Any], depth: int) -> None:
+        params = decoded["params"]
+        decoded["commands"] = self._decode_commands(params.get("commands", b""), params.get("inputs", ()), depth + 1)
+
+    def _expand_path(self, decoded: Dict[str, Any], depth: int) -> None:
+        # SwapRouter and SwapRouter02 structs both start with the path
+        try:
+            decoded["hops"] = decode_v3_path(decoded["params"]["params"][0], exact_output=decoded["method"] == "exactOutput")
+        except (ValueError, TypeError, IndexError, KeyError):
+            self.stats["malformed"] += 1
+
+    def _decode_commands(self, commands: bytes, inputs: Iterable[bytes], depth: int) -> List[Optional[Dict[str, Any]]]:
+        return [
+            self._memoized("command", bytes((command,)) + data, depth,
+                           lambda command=command, data=data: self._decode_command(command, data, depth))
+            for command, data in zip(commands, inputs)
+        ]
+
+    def _decode_command(self, command: int, data: bytes, depth: int) -> Dict[str, Any]:
+        """Decode the input of one Universal Router command."""
+        spec = UNIVERSAL_ROUTER_COMMANDS.get(command & COMMAND_TYPE_MASK)
+        decoded: Dict[str, Any] = {
+            "command": spec.name if spec is not None else hex(command & COMMAND_TYPE_MASK),
+            "allow_revert": bool(command & FLAG_ALLOW_REVERT),
+        }
+        if spec is None or spec.decoder is None:
+            return decoded
+        params = dict(zip(spec.input_names, spec.decoder(ContextFramesBytesIO(data))))
+        decoded["params"] = params
+        if spec.name == "EXECUTE_SUB_PLAN":
+            decoded["commands"] = self._decode_commands(params["commands"], params["inputs"], depth + 1)
+        elif isinstance(params.get("path"), bytes):
+            decoded["hops"] = decode_v3_path(params["path"], exact_output=spec.name == "V3_SWAP_EXACT_OUT")
+        return decoded
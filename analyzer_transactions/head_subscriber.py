@@ -0,0 +1,140 @@
+# analyzer_transactions/head_subscriber.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, Optional
+import aiohttp
+from analyzer_transactions import logger
+from analyzer_transactions.rpc_client import RpcError
+
+
+class WsSubscriber:
+    """Keep an ``eth_subscribe`` WebSocket subscription open and hand notifications to ``_on_notification``.
+
+    The connection is re-established with exponential backoff.
+    """
+
+    SUBSCRIBE_ID: int = 1
+
+    def __init__(self, ws_url: str, params: List[Any], backoff: float = 0.5, max_backoff: float = 30.0,
+                 heartbeat: float = 20.0) -> None:
+        """Initialize the subscriber.
+
+        Args:
+            ws_url: WebSocket URL of the node.
+            params: eth_subscribe parameters, e.g. ["newHeads"].
+            backoff: First reconnect delay in seconds (doubled up to max_backoff).
+            max_backoff: Upper bound of the reconnect delay.
+            heartbeat: WebSocket ping interval in seconds.
+        """
+        self.ws_url: str = ws_url
+        self.params: List[Any] = params
+        self.backoff: float = backoff
+        self.max_backoff: float = max_backoff
+        self.heartbeat: float = heartbeat
+        self.connected: asyncio.Event = asyncio.Event()
+        self.stats: Dict[str, int] = {"notifications": 0, "connects": 0, "disconnects": 0}
+        self._delay: float = backoff
+
+    def _on_notification(self, result: Any) -> None:
+        raise NotImplementedError
+
+    def _on_disconnect(self) -> None:
+        """Called after the connection was lost, before the reconnect delay."""
+
+    async def _subscribe_once(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.ws_url, heartbeat=self.heartbeat) as ws:
+                await ws.send_json({"jsonrpc": "2.0", "id": self.SUBSCRIBE_ID,
+                                    "method": "eth_subscribe", "params": self.params})
+                subscription: Optional[str] = None
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        raise ws.exception() or ConnectionError("WebSocket error")
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    data = json.loads(message.data)
+                    if data.get("id") == self.SUBSCRIBE_ID:
+                        error = data.get("error")
+                        if error:
+                            raise RpcError(error.get("code", -32603), error.get("message", "unknown error"), error.get("data"))
+                        subscription = data["result"]
+                        self.stats["connects"] += 1
+                        self._delay = self.backoff
+                        self.connected.set()
+                        logger.info(f"Subscribed to {self.params[0]} at {self.ws_url} ({subscription})")
+                        continue
+                    params = data.get("params") or {}
+                    if data.get("method") == "eth_subscription" and params.get("subscription") == subscription:
+                        self.stats["notifications"] += 1
+                        self._on_notification(params["result"])
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Hold the subscription until ``stop`` is set, reconnecting on failures."""
+        while not stop.is_set():
+            session = asyncio.ensure_future(self._subscribe_once())
+            stopped = asyncio.ensure_future(stop.wait())
+            try:
+                await asyncio.wait({session, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stopped.cancel()
+                if not session.done():
+                    session.cancel()
+                    try:
+                        await session
+                    except asyncio.CancelledError:
+                        pass
+            self.connected.clear()
+            if stop.is_set():
+                break
+            if not session.cancelled() and session.exception() is not None:
+                logger.warning(f"{self.params[0]} subscription to {self.ws_url} failed: {session.exception()!r}")
+            self.stats["disconnects"] += 1
+            self._on_disconnect()
+            try:
+                await asyncio.wait_for(stop.wait(), self._delay)
+            except asyncio.TimeoutError:
+                pass
+            self._delay = min(self._delay * 2, self.max_backoff)
+
+
+class HeadSubscriber(WsSubscriber):
+    """Keep an ``eth_subscribe("newHeads")`` WebSocket subscription open.
+
+    The latest announced block number is exposed as ``latest`` and every
+    notification sets ``event``. A disconnect resets ``latest`` to None and
+    sets ``event``, so the consumer looks the head up and backfills the heads
+    missed meanwhile (e.g. from its cursor).
+    """
+
+    def __init__(self, ws_url: str, backoff: float = 0.5, max_backoff: float = 30.0, heartbeat: float = 20.0) -> None:
+        """Initialize the subscriber.
+
+        Args:
+            ws_url: WebSocket URL of the node.
+            backoff: First reconnect delay in seconds (doubled up to max_backoff).
+            max_backoff: Upper bound of the reconnect delay.
+            heartbeat: WebSocket ping interval in seconds.
+        """
+        super().__init__(ws_url, ["newHeads"], backoff=backoff, max_backoff=max_backoff, heartbeat=heartbeat)
+        self.latest: Optional[int] = None
+        self.received_at: Optional[float] = None
+        self.event: asyncio.Event = asyncio.Event()
+
+    def _on_notification(self, header: Dict[str, Any]) -> None:
+        number = int(header["number"], 16)
+        if self.latest is None or number > self.latest:
+            self.latest = number
+            self.received_at = time.monotonic()
+        self.event.set()
+
+    def _on_disconnect(self) -> None:
+        # Heads may have been missed while disconnected: the consumer looks the head up and catches up
+        self.latest = None
+        self.event.set()
@@ -0,0 +1,273 @@
+# analyzer_transactions/mempool.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union
+from redis.asyncio import Redis
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions, ZERO_ADDRESS, PENDING_KEY_PREFIX, _open_analyzer
+from analyzer_transactions.head_subscriber import WsSubscriber
+from analyzer_transactions.node_limiter import NodeRateLimiter
+from analyzer_transactions.rpc_client import RpcError
+
+PENDING_STREAM_KEY: str = "swaps:pending"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    return str(value)
+
+
+class PendingTxSubscriber(WsSubscriber):
+    """``newPendingTransactions`` subscription feeding a PendingSwapStream."""
+
+    def __init__(self, stream: "PendingSwapStream", ws_url: str, full_transactions: bool = True, **kwargs: Any) -> None:
+        """Initialize the subscriber.
+
+        Args:
+            stream: Consumer of the notifications.
+            ws_url: WebSocket URL of the node.
+            full_transactions: Ask for full transaction objects (geth, erigon),
+                hashes only otherwise. Both kinds are accepted either way.
+        """
+        params: List[Any] = ["newPendingTransactions", True] if full_transactions else ["newPendingTransactions"]
+        super().__init__(ws_url, params, **kwargs)
+        self.stream: PendingSwapStream = stream
+
+    def _on_notification(self, result: Union[str, Dict[str, Any]]) -> None:
+        self.stream.handle(result)
+
+
+class PendingSwapStream:
+    """Detect swaps among pending transactions and publish them to a bounded Redis stream.
+
+    Notifications are filtered and decoded synchronously (router set, selector
+    index), so only swaps leave the WebSocket reader. Hash-only notifications
+    are collected and fetched with batched ``eth_getTransactionByHash`` calls.
+    Every decoded swap is appended with XADD (approximate MAXLEN) and marked
+    with ``pending:tx:{hash}``; AnalyzerTransactions.save_batch_to_redis removes
+    the marker when the swap is mined.
+    """
+
+    def __init__(
+        self,
+        analyzer: AnalyzerTransactions,
+        redis: Optional[Redis],
+        stream_key: str = PENDING_STREAM_KEY,
+        maxlen: int = 100_000,
+        pending_ttl: int = 900,
+        batch_size: int = 500,
+        fetch_batch_size: int = 100,
+        flush_interval: float = 0.05,
+        seen_size: int = 200_000,
+    ) -> None:
+        """Initialize the stream.
+
+        Args:
+            analyzer: Analyzer providing the router registry, selector index and RPC client.
+            redis: Redis client the swaps are written to.
+            stream_key: Redis stream key.
+            maxlen: Approximate maximum stream length.
+            pending_ttl: Expiry of the pending markers in seconds.
+            batch_size: Swaps written per pipeline.
+            fetch_batch_size: Buffered hashes that trigger a fetch before flush_interval.
+            flush_interval: Maximum delay of a buffered swap or hash in seconds.
+            seen_size: Number of recent hashes remembered to skip re-announcements.
+        """
+        self.analyzer: AnalyzerTransactions = analyzer
+        self.redis: Optional[Redis] = redis
+        self.stream_key: str = stream_key
+        self.maxlen: int = maxlen
+        self.pending_ttl: int = pending_ttl
+        self.batch_size: int = batch_size
+        self.fetch_batch_size: int = fetch_batch_size
+        self.flush_interval: float = flush_interval
+        self.seen_size: int = seen_size
+        self.buffer: List[Dict[str, str]] = []
+        self.hashes: List[str] = []
+        self.ready: asyncio.Event = asyncio.Event()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "received": 0, "duplicates": 0, "swaps": 0, "decode_errors": 0,
+            "fetched": 0, "not_found": 0, "written": 0, "round_trips": 0,
+        }
+
+    @classmethod
+    def from_env(cls, analyzer: AnalyzerTransactions, redis: Optional[Redis]) -> "PendingSwapStream":
+        """Build the stream with settings from environment variables."""
+        return cls(
+            analyzer,
+            redis,
+            stream_key=os.getenv("MEMPOOL_STREAM_KEY", PENDING_STREAM_KEY),
+            maxlen=int(os.getenv("MEMPOOL_STREAM_MAXLEN", 100_000)),
+            pending_ttl=int(os.getenv("MEMPOOL_PENDING_TTL", 900)),
+            batch_size=int(os.getenv("MEMPOOL_BATCH_SIZE", 500)),
+        )
+
+    def _is_new(self, tx_hash: str) -> bool:
+        if tx_hash in self._seen:
+            self.stats["duplicates"] += 1
+            return False
+        self._seen[tx_hash] = None
+        if len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def handle(self, item: Union[str, Dict[str, Any]]) -> None:
+        """Process one notification: a full transaction or a transaction hash."""
+        self.stats["received"] += 1
+        if isinstance(item, str):
+            if self._is_new(item):
+                self.hashes.append(item)
+                if len(self.hashes) >= self.fetch_batch_size:
+                    self.ready.set()
+        elif isinstance(item, dict) and item.get("hash") and self._is_new(item["hash"]):
+            self._select(item)
+
+    def _select(self, raw_tx: Dict[str, Any]) -> None:
+        """Filter a raw pending transaction and buffer it if it is a swap."""
+        to: Optional[str] = raw_tx.get("to")
+        if not to or to == ZERO_ADDRESS or not self.analyzer.routers.allows(to):
+            return
+        input_hex: Optional[str] = raw_tx.get("input")
+        if not self.analyzer.SELECTOR_INDEX.matches_hex(input_hex):
+            return
+        try:
+            decoded = self.analyzer.SELECTOR_INDEX.decode(input_hex)
+        except Exception as e:
+            self.stats["decode_errors"] += 1
+            logger.debug(f"Failed to decode pending tx {raw_tx['hash']}: {e}")
+            return
+        if decoded is None:
+            return
+        self.buffer.append({
+            "hash": raw_tx["hash"],
+            "from": raw_tx.get("from") or "",
+            "to": to,
+            "nonce": raw_tx.get("nonce") or "",
+            "max_fee": raw_tx.get("maxFeePerGas") or raw_tx.get("gasPrice") or "",
+            "method": decoded["method"],
+            "params": json.dumps(decoded["params"], default=_json_default),
+            "seen_at": f"{time.time():.3f}",
+        })
+        self.stats["swaps"] += 1
+        if len(self.buffer) >= self.batch_size:
+            self.ready.set()
+
+    async def _fetch_hashes(self) -> None:
+        hashes, self.hashes = self.hashes, []
+        # call_many packs the lookups into JSON-RPC batches of RPC_BATCH_SIZE
+        results = await self.analyzer.rpc.call_many([("eth_getTransactionByHash", [tx_hash]) for tx_hash in hashes])
+        for raw_tx in results:
+            if raw_tx is None or isinstance(raw_tx, RpcError):
+                # Already mined or dropped from the pool
+                self.stats["not_found"] += 1
+                continue
+            self.stats["fetched"] += 1
+            self._select(raw_tx)
+
+    async def flush(self) -> int:
+        """Fetch the buffered hashes and write the buffered swaps with one pipeline.
+
+        Returns:
+            Number of swaps written.
+        """
+        self.ready.clear()
+        if self.hashes:
+            await self._fetch_hashes()
+        if not self.buffer or self.redis is None:
+            return 0
+        batch, self.buffer = self.buffer, []
+        pipe = self.redis.pipeline(transaction=False)
+        for fields in batch:
+            pipe.xadd(self.stream_key, fields, maxlen=self.maxlen, approximate=True)
+            pipe.setex(f"{PENDING_KEY_PREFIX}tx:{fields['hash']}", self.pending_ttl, fields["seen_at"])
+        await pipe.execute()
+        self.stats["written"] += len(batch)
+        self.stats["round_trips"] += 1
+        return len(batch)
+
+    async def run(self, subscriber: WsSubscriber, duration: Optional[float] = None,
+                  stop: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """Consume the subscription until ``duration`` elapses or ``stop`` is set.
+
+        Buffers are flushed when full or every ``flush_interval`` seconds.
+
+        Args:
+            subscriber: Subscription calling ``handle`` for every notification.
+            duration: Maximum running time in seconds, None to run until stopped.
+            stop: Optional event that ends the loop.
+
+        Returns:
+            Counters of the run.
+        """
+        stop = stop or asyncio.Event()
+        deadline = time.monotonic() + duration if duration is not None else None
+        subscription = asyncio.create_task(subscriber.run(stop))
+        try:
+            while not stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                try:
+                    await asyncio.wait_for(self.ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Failed to flush pending swaps: {e!r}")
+        finally:
+            stop.set()
+            await subscription
+            await self.flush()
+        logger.info(
+            f"Mempool: {self.stats['received']} notifications, {self.stats['swaps']} swaps, "
+            f"{self.stats['written']} written in {self.stats['round_trips']} round-trips"
+        )
+        return dict(self.stats)
+
+
+async def mempool_main(
+    redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+    ws_url: Optional[str] = os.getenv('NODE_WS_URL'),
+    duration: Optional[float] = None,
+    full_transactions: bool = os.getenv("MEMPOOL_FULL_TRANSACTIONS", "1").lower() not in ("0", "false", "no"),
+    shared: bool = False,
+    stop: Optional[asyncio.Event] = None,
+) -> Dict[str, Any]:
+    """Stream pending swaps of a node chosen by NodeRateLimiter into Redis.
+
+    Args:
+        redis_url: Redis URL of the node configuration.
+        ws_url: WebSocket URL of the node.
+        duration: Maximum running time in seconds, None to run until stopped.
+        full_transactions: Subscribe to full transactions instead of hashes.
+        shared: Reuse the analyzer kept open for the running event loop.
+        stop: Optional event that ends the loop.
+
+    Returns:
+        Counters of the run.
+    """
+    if not ws_url:
+        raise ValueError("NODE_WS_URL is not set")
+    limiter = NodeRateLimiter(redis_url)
+    try:
+        node_url = await limiter.get_available_node()
+    finally:
+        await limiter.close()
+    logger.info(f"NodeRateLimiter initialized. Using {node_url}")
+
+    async with _open_analyzer(node_url, shared) as analyzer:
+        stream = PendingSwapStream.from_env(analyzer, analyzer.redis)
+        subscriber = PendingTxSubscriber(stream, ws_url, full_transactions=full_transactions)
+        return await stream.run(subscriber, duration=duration, stop=stop)
+
+
+if __name__ == "__main__":
+    asyncio.run(mempool_main())
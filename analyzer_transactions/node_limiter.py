@@ -6,16 +6,243 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import asyncio
+import itertools
+import time
+from collections import deque
 import redis.asyncio as aioredis
 import json
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterable, Deque
 from analyzer_transactions import logger
 
+# Per-node token bucket (per_second tokens, refilled continuously, burst of one
+# second) and daily counter, checked for all nodes in one round-trip. Nodes are
+# tried in the given order (best score first) and the first node with quota
+# left grants a lease of its amount of tokens, or of what is left of its daily
+# quota if that is less, but never less than the cost of the request.
+# A lease larger than the bucket (a batch on a slow node) overdraws it and the
+# debt delays the next one.
+# KEYS: bucket, day counter and cooldown key of every node.
+# ARGV: per_second, per_day, lease amount and request cost of every node.
+# Returns {node index (1-based) or 0, wait in ms until a node may have quota,
+# tokens leased}.
+ACQUIRE_SCRIPT = """
+local count = #ARGV / 4
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local best_wait = -1
+for i = 0, count - 1 do
+    local bucket_key, day_key, cooldown_key = KEYS[i * 3 + 1], KEYS[i * 3 + 2], KEYS[i * 3 + 3]
+    local per_second = tonumber(ARGV[1 + i * 4])
+    local per_day = tonumber(ARGV[2 + i * 4])
+    local amount = tonumber(ARGV[3 + i * 4])
+    local cost = tonumber(ARGV[4 + i * 4])
+    local wait = 0
+    local cooldown = redis.call('PTTL', cooldown_key)
+    if cooldown > 0 then
+        wait = cooldown / 1000
+    end
+    local tokens = 0
+    if wait == 0 and per_second > 0 then
+        local state = redis.call('HMGET', bucket_key, 'tokens', 'ts')
+        tokens = tonumber(state[1]) or per_second
+        local ts = tonumber(state[2]) or now
+        tokens = math.min(per_second, tokens + (now - ts) * per_second)
+        local need = math.min(amount, per_second)
+        if tokens < need then
+            wait = (need - tokens) / per_second
+        end
+    end
+    if wait == 0 and per_day > 0 then
+        local used = tonumber(redis.call('GET', day_key) or '0')
+        if used + amount > per_day then
+            amount = math.max(cost, per_day - used)
+        end
+        if used + amount > per_day then
+            wait = redis.call('TTL', day_key)
+            if wait <= 0 then
+                wait = 86400
+            end
+        end
+    end
+    if wait == 0 then
+        if per_second > 0 then
+            redis.call('HSET', bucket_key, 'tokens', tokens - amount, 'ts', now)
+            redis.call('EXPIRE', bucket_key, 60)
+        end
+        if per_day > 0 and redis.call('INCRBY', day_key, amount) == amount then
+            redis.call('EXPIRE', day_key, 86400)
+        end
+        return {i + 1, 0, amount}
+    end
+    if best_wait < 0 or wait < best_wait then
+        best_wait = wait
+    end
+end
+return {0, math.ceil(best_wait * 1000), 0}
+"""
+
+# Unused tokens of expired leases go back to the bucket (up to its capacity)
+# and to the daily counter.
+# KEYS: bucket and day counter of every node.
+# ARGV: per_second, per_day and unused tokens of every node.
+RELEASE_SCRIPT = """
+for i = 0, #KEYS / 2 - 1 do
+    local bucket_key, day_key = KEYS[i * 2 + 1], KEYS[i * 2 + 2]
+    local per_second = tonumber(ARGV[1 + i * 3])
+    local per_day = tonumber(ARGV[2 + i * 3])
+    local unused = tonumber(ARGV[3 + i * 3])
+    if per_second > 0 then
+        local tokens = tonumber(redis.call('HGET', bucket_key, 'tokens'))
+        if tokens then
+            redis.call('HSET', bucket_key, 'tokens', math.min(per_second, tokens + unused))
+        end
+    end
+    if per_day > 0 then
+        local used = tonumber(redis.call('GET', day_key) or '0')
+        if used > 0 then
+            redis.call('DECRBY', day_key, math.min(used, unused))
+        end
+    end
+end
+return 1
+"""
+
+
+class NoAvailableNodeError(Exception):
+    """No configured node has quota left within the timeout."""
+
+
+class TokenLease:
+    """Tokens of one node taken from Redis and spent locally until ``expires_at``."""
+
+    __slots__ = ("node", "tokens", "expires_at")
+
+    def __init__(self, node: Dict, tokens: float, expires_at: float) -> None:
+        self.node: Dict = node
+        self.tokens: float = tokens
+        self.expires_at: float = expires_at
+
+
+class NodeHealth:
+    """Latency, error rate and chain head of one node as seen by this process."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 200, min_samples: int = 20) -> None:
+        """Initialize the tracker.
+
+        Args:
+            alpha: Smoothing factor of the latency and error rate EWMAs.
+            window: Number of recent latencies kept for the percentile.
+            min_samples: Latencies required before percentile() returns a value.
+        """
+        self.alpha: float = alpha
+        self.min_samples: int = min_samples
+        self.latency: Optional[float] = None
+        self.error_rate: float = 0.0
+        self.head: Optional[int] = None
+        self.requests: int = 0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, latency: float, error: bool = False) -> None:
+        self.requests += 1
+        self.error_rate += self.alpha * ((1.0 if error else 0.0) - self.error_rate)
+        self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        if not error:
+            self.samples.append(latency)
+
+    def percentile(self, q: float = 0.95) -> Optional[float]:
+        """Latency percentile of the recent successful requests, None until min_samples."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def score(self, head_lag: int = 0, lag_penalty: float = 0.5, error_penalty: float = 1.0) -> float:
+        """Expected cost of a request in seconds, lower is better.
+
+        Unmeasured nodes score 0 and are tried first. Errors inflate the latency
+        by the expected number of attempts and add error_penalty (the retry on
+        another node) weighted by the error rate; every block of head lag adds
+        lag_penalty.
+        """
+        expected_latency = (self.latency or 0.0) / max(1.0 - self.error_rate, 0.05)
+        return expected_latency + self.error_rate * error_penalty + head_lag * lag_penalty
+
+
 class NodeRateLimiter:
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, config_refresh: float = float(os.getenv("NODE_CONFIG_REFRESH", 10)),
+                 lease_size: int = int(os.getenv("NODE_LEASE_SIZE", 50)),
+                 lease_ttl: float = float(os.getenv("NODE_LEASE_TTL", 1.0))):
         self.redis = aioredis.from_url(redis_url)
         self.redis_url = redis_url
+        # Токены берутся из Redis арендой по lease_size и тратятся локально без I/O;
+        # неизрасходованные возвращаются через lease_ttl секунд
+        self.lease_size: int = max(1, lease_size)
+        self.lease_ttl: float = lease_ttl
+        self._leases: Dict[str, TokenLease] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        # Конфигурация нод для acquire перечитывается не чаще config_refresh секунд
+        self.config_refresh: float = config_refresh
+        self._config: Optional[List[Dict]] = None
+        self._config_loaded_at: float = 0.0
+        self._rotation = itertools.count()
+        self._wait: float = 0.0
+        self._acquire_script = self.redis.register_script(ACQUIRE_SCRIPT)
+        self._release_script = self.redis.register_script(RELEASE_SCRIPT)
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.lease_stats: Dict[str, int] = {"local": 0, "leases": 0, "released": 0, "round_trips": 0}
+        self.health: Dict[str, NodeHealth] = {}
+
+    def _health(self, node_url: str) -> NodeHealth:
+        health = self.health.get(node_url)
+        if health is None:
+            health = self.health[node_url] = NodeHealth()
+        return health
+
+    def observe(self, node_url: str, latency: float, error: bool = False) -> None:
+        """Учёт задержки и результата запроса к ноде."""
+        self._health(node_url).observe(latency, error)
+
+    def observe_head(self, node_url: str, head: int) -> None:
+        """Учёт последнего блока, известного ноде."""
+        health = self._health(node_url)
+        health.head = max(health.head or 0, head)
+
+    def hedge_delay(self, node_url: str, q: float = 0.95) -> Optional[float]:
+        """Задержка, после которой запрос дублируется на другую ноду (p95 ноды)."""
+        return self._health(node_url).percentile(q)
+
+    def ranked(self, config: List[Dict], exclude: Iterable[str] = ()) -> List[Dict]:
+        """Ноды в порядке оценки: задержка EWMA, доля ошибок и отставание от головы цепи.
+
+        При равной оценке (например, ещё не измеренные ноды) порядок ротируется.
+        """
+        excluded = set(exclude)
+        nodes = [node for node in config if node["url"] not in excluded]
+        if not nodes:
+            return []
+        start = next(self._rotation) % len(nodes)
+        nodes = nodes[start:] + nodes[:start]
+        heads = [self.health[node["url"]].head for node in nodes
+                 if node["url"] in self.health and self.health[node["url"]].head is not None]
+        best_head = max(heads, default=0)
+
+        def score(node: Dict) -> float:
+            health = self.health.get(node["url"])
+            if health is None:
+                return 0.0
+            lag = best_head - health.head if health.head is not None else 0
+            return health.score(lag)
+
+        return sorted(nodes, key=score)
+
+    async def close(self):
+        """Возврат неизрасходованных токенов и закрытие соединения с Redis."""
+        try:
+            await self._release([url for url in self._leases])
+        except Exception as e:
+            logger.warning(f"Failed to release node leases: {e!r}")
+        await self.redis.aclose()
 
     async def initialize_nodes(self, initial_config: List[Dict] = None):
         """Инициализация конфигурации нод в Redis."""
@@ -50,33 +277,146 @@ class NodeRateLimiter:
     def _node_key(self, node_id: str, period: int) -> str:
         return f"node:{node_id}:{period}"
 
-    async def _increment_and_check(self, node_id: str, max_count: int, period_sec: int) -> bool:
-        """Увеличение счетчика запросов и проверка лимита."""
-        if max_count == 0:
-            return True
-        key = self._node_key(node_id, period_sec)
-        pipe = self.redis.pipeline()
-        pipe.incr(key)
-        pipe.expire(key, period_sec)
-        count, _ = await pipe.execute()
-        logger.debug(f"Node {node_id}: {count}/{max_count} requests for period {period_sec}s")
-        return count <= max_count
+    def _cooldown_key(self, node_id: str) -> str:
+        return f"node:{node_id}:cooldown"
+
+    async def _acquire_config(self) -> List[Dict]:
+        now = time.monotonic()
+        if self._config is None or now - self._config_loaded_at >= self.config_refresh:
+            self._config = await self.get_node_config()
+            self._config_loaded_at = now
+        return self._config
+
+    def _lease_amount(self, node: Dict, cost: int) -> int:
+        """Размер новой аренды: lease_size, не больше per_second и per_day ноды, но не меньше cost."""
+        amount = self.lease_size
+        for limit in (node.get("per_second", 0), node.get("per_day", 0)):
+            if limit > 0:
+                amount = min(amount, limit)
+        return max(cost, amount)
+
+    def _take_local(self, config: List[Dict], cost: int, now: float) -> Optional[str]:
+        """Списание cost токенов из аренды без I/O.
+
+        Берётся первая по оценке нода с действующей арендой. Нода без аренды,
+        стоящая выше, прерывает перебор: её квоту нужно проверить в Redis.
+        Исчерпанные аренды (и пустые у нод без квоты) пропускаются до истечения.
+        """
+        for node in config:
+            lease = self._leases.get(node["url"])
+            if lease is None or lease.expires_at <= now:
+                return None
+            if lease.tokens >= cost:
+                lease.tokens -= cost
+                self.lease_stats["local"] += 1
+                return node["url"]
+        return None
+
+    async def _release(self, node_urls: Iterable[str]) -> None:
+        """Возврат неизрасходованных токенов аренд node_urls в Redis одним вызовом."""
+        keys: List[str] = []
+        args: List[float] = []
+        for url in node_urls:
+            lease = self._leases.pop(url, None)
+            if lease is None or lease.tokens <= 0 or lease.tokens == float("inf"):
+                continue
+            keys += [f"node:{url}:bucket", self._node_key(url, 86400)]
+            args += [lease.node.get("per_second", 0), lease.node.get("per_day", 0), int(lease.tokens)]
+            self.lease_stats["released"] += int(lease.tokens)
+        if keys:
+            self.lease_stats["round_trips"] += 1
+            await self._release_script(keys=keys, args=args)
+
+    async def acquire(self, cost: int = 1, timeout: float = 30.0, exclude: Iterable[str] = ()) -> str:
+        """Выбор ноды для одного HTTP-запроса с cost вызовами.
+
+        Ноды перебираются в порядке оценки (см. ranked). Запрос сначала
+        оплачивается из локальной аренды токенов без обращения к Redis. Новая
+        аренда (lease_size токенов, не больше лимитов ноды и остатка её квоты,
+        но не меньше cost) берётся Lua-скриптом, который атомарно за один round-trip проверяет и списывает
+        квоты всех нод (per_second как token bucket, per_day); ноды на cooldown
+        пропускаются. Если квоты нет ни у одной ноды, ждём до её появления.
+
+        Args:
+            cost: Число JSON-RPC вызовов в запросе.
+            timeout: Максимальное ожидание свободной ноды в секундах.
+            exclude: Ноды, которые не выбираются (например, для дублирующего запроса).
+
+        Returns:
+            URL выбранной ноды.
+
+        Raises:
+            NoAvailableNodeError: Если за timeout квота не освободилась.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            config = [node for node in self.ranked(await self._acquire_config(), exclude)
+                      if self._cooldown_until.get(node["url"], 0.0) <= now]
+            node_url = self._take_local(config, cost, now)
+            if node_url is None:
+                node_url = await self._lease(config, cost, now)
+            if node_url is not None:
+                stats = self.stats.setdefault(node_url, {"requests": 0, "calls": 0, "cooldowns": 0})
+                stats["requests"] += 1
+                stats["calls"] += cost
+                return node_url
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise NoAvailableNodeError(f"No node has quota for {cost} calls after {timeout}s")
+            await asyncio.sleep(min(max(self._wait, 0.005), remaining))
+
+    async def _lease(self, config: List[Dict], cost: int, now: float) -> Optional[str]:
+        """Аренда токенов у первой ноды config с квотой; cost сразу списывается из неё."""
+        if not config:
+            self._wait = 0.05
+            return None
+        expired = [url for url, lease in self._leases.items() if lease.expires_at <= now]
+        if expired:
+            await self._release(expired)
+        keys: List[str] = []
+        args: List[int] = []
+        for node in config:
+            keys += [f"node:{node['url']}:bucket", self._node_key(node["url"], 86400), self._cooldown_key(node["url"])]
+            args += [node.get("per_second", 0), node.get("per_day", 0), self._lease_amount(node, cost), cost]
+        self.lease_stats["round_trips"] += 1
+        index, wait_ms, granted = await self._acquire_script(keys=keys, args=args)
+        # У нод перед выданной квоты нет: пустая аренда исключает их из перебора ненадолго.
+        # Действующие аренды (остаток меньше cost) не трогаем, ими оплатятся следующие запросы
+        skipped = config[:int(index) - 1] if index else config
+        for node in skipped:
+            if node["url"] not in self._leases:
+                self._leases[node["url"]] = TokenLease(node, 0, now + self.lease_ttl / 10)
+        if not index:
+            self._wait = int(wait_ms) / 1000
+            return None
+        node = config[int(index) - 1]
+        # Истёкшие аренды уже возвращены, остаток действующей добавляется к новой
+        lease = self._leases.get(node["url"])
+        carried = lease.tokens if lease is not None else 0
+        unlimited = not node.get("per_second", 0) and not node.get("per_day", 0)
+        tokens = float("inf") if unlimited else carried + int(granted) - cost
+        self._leases[node["url"]] = TokenLease(node, tokens, now + self.lease_ttl)
+        self.lease_stats["leases"] += 1
+        return node["url"]
+
+    async def cooldown(self, node_url: str, seconds: float) -> None:
+        """Исключение ноды из acquire на seconds секунд (например, после HTTP 429)."""
+        self._cooldown_until[node_url] = time.monotonic() + seconds
+        await self._release([node_url])
+        await self.redis.set(self._cooldown_key(node_url), 1, px=max(1, int(seconds * 1000)))
+        self.stats.setdefault(node_url, {"requests": 0, "calls": 0, "cooldowns": 0})["cooldowns"] += 1
+        logger.warning(f"Node {node_url} on cooldown for {seconds:.1f}s")
 
     async def get_available_node(self, max_attempts: int = 3) -> str:
-        """Выбор доступной ноды."""
-        logger.debug(f"Selected node: ")
-        for attempt in range(max_attempts):
-            config = await self.get_node_config()
-            for node in config:
-                node_id = node["url"]
-                allowed_sec = await self._increment_and_check(node_id, node["per_second"], 1)
-                allowed_day = await self._increment_and_check(node_id, node["per_day"], 86400)
-                if allowed_sec and allowed_day:
-                    logger.debug(f"Selected node: {node_id}")
-                    return node_id
-            await asyncio.sleep(0.5)
-        raise Exception("No available nodes after max attempts")
-    
+        """Выбор доступной ноды (для клиентов, работающих с одной нодой)."""
+        try:
+            node_url = await self.acquire(1, timeout=0.5 * max_attempts)
+        except NoAvailableNodeError as e:
+            raise Exception("No available nodes after max attempts") from e
+        logger.debug(f"Selected node: {node_url}")
+        return node_url
+
 
 if __name__ == "__main__":
     node_limiter = NodeRateLimiter("redis://localhost:6380/0")
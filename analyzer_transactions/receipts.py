@@ -0,0 +1,216 @@
+# analyzer_transactions/receipts.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import List, Dict, Any, Optional, Iterable, NamedTuple, Tuple
+from eth_abi import decode
+from eth_utils import decode_hex, keccak
+from abis import uniswap_v2_pair_abi, uniswap_v3_pool_abi, pancake_pair_abi
+from analyzer_transactions import logger
+from analyzer_transactions.rpc_client import RpcError
+from analyzer_transactions.swap_record import SwapRecord, SwapBatch, NO_BLOCK
+
+# Pool ABIs whose Swap events are decoded; PancakeSwap pairs emit the Uniswap V2 event
+SWAP_EVENT_ABIS: Dict[str, List[Dict[str, Any]]] = {
+    "v2": uniswap_v2_pair_abi,
+    "v3": uniswap_v3_pool_abi,
+    "pancake": pancake_pair_abi,
+}
+# JSON-RPC "method not found"; other clients only say so in the message
+METHOD_NOT_FOUND: int = -32601
+
+
+class EventEntry(NamedTuple):
+    """Prepared decoder for a single ABI event."""
+    protocol: str
+    name: str
+    indexed: List[Tuple[str, str]]
+    data_names: List[str]
+    data_types: List[str]
+
+
+class SwapEventDecoder:
+    """Decodes pool ``Swap`` logs, keyed by topic0 (keccak of the event signature)."""
+
+    def __init__(self, abis: Optional[Dict[str, List[Dict[str, Any]]]] = None, events: Iterable[str] = ("Swap",)) -> None:
+        """Build the topic index from ABI definitions.
+
+        Args:
+            abis: Mapping of protocol label to ABI; the first label wins for identical events.
+            events: Names of the events to include.
+        """
+        self.entries: Dict[str, EventEntry] = {}
+        wanted = set(events)
+        for protocol, abi in (abis if abis is not None else SWAP_EVENT_ABIS).items():
+            for item in abi:
+                if not isinstance(item, dict) or item.get("type") != "event" or item.get("name") not in wanted:
+                    continue
+                inputs = item.get("inputs", [])
+                signature = f"{item['name']}({','.join(arg['type'] for arg in inputs)})"
+                topic = "0x" + keccak(text=signature).hex()
+                self.entries.setdefault(topic, EventEntry(
+                    protocol=protocol,
+                    name=item["name"],
+                    indexed=[(arg["name"], arg["type"]) for arg in inputs if arg.get("indexed")],
+                    data_names=[arg["name"] for arg in inputs if not arg.get("indexed")],
+                    data_types=[arg["type"] for arg in inputs if not arg.get("indexed")],
+                ))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def decode_log(self, log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Decode a raw JSON-RPC log if it is a known Swap event.
+
+        Args:
+            log: Log object of a receipt (hex strings, as returned by the node).
+
+        Returns:
+            Dictionary with the protocol, pool address, log index and event
+            arguments, or None for other events.
+        """
+        topics: List[str] = log.get("topics") or []
+        if not topics:
+            return None
+        entry = self.entries.get(topics[0].lower())
+        if entry is None or len(topics) != len(entry.indexed) + 1:
+            return None
+        try:
+            args: Dict[str, Any] = {}
+            for (name, type_), topic in zip(entry.indexed, topics[1:]):
+                args[name] = decode([type_], decode_hex(topic))[0]
+            args.update(zip(entry.data_names, decode(entry.data_types, decode_hex(log.get("data") or "0x"))))
+        except Exception as e:
+            logger.warning(f"Malformed {entry.name} log in tx {log.get('transactionHash')}: {e}")
+            return None
+        log_index = log.get("logIndex")
+        return {
+            "protocol": entry.protocol,
+            "pool": log.get("address"),
+            "log_index": int(log_index, 16) if isinstance(log_index, str) else log_index,
+            **args,
+        }
+
+
+class ReceiptFetcher:
+    """Fetches the receipts of decoded swaps and attaches what actually executed.
+
+    Receipts are requested per block with ``eth_getBlockReceipts`` (one call
+    regardless of the number of swaps in it). Nodes without the method are
+    remembered and asked with batched ``eth_getTransactionReceipt`` instead.
+    """
+
+    def __init__(self, rpc: Any, decoder: Optional[SwapEventDecoder] = None) -> None:
+        """Initialize the fetcher.
+
+        Args:
+            rpc: RpcClient used for the receipt calls.
+            decoder: Swap event decoder, built from SWAP_EVENT_ABIS by default.
+        """
+        self.rpc = rpc
+        self.decoder: SwapEventDecoder = decoder or SwapEventDecoder()
+        self.block_receipts_supported: Optional[bool] = None  # Unknown until the first call
+        self.stats: Dict[str, int] = {"block_calls": 0, "tx_calls": 0, "receipts": 0, "missing": 0}
+
+    @classmethod
+    def from_env(cls, rpc: Any) -> Optional["ReceiptFetcher"]:
+        """Build the fetcher from environment variables, None unless RECEIPTS is enabled."""
+        if os.getenv("RECEIPTS", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(rpc)
+
+    @staticmethod
+    def _unsupported(error: RpcError) -> bool:
+        message = error.message.lower()
+        return error.code == METHOD_NOT_FOUND or ("method" in message and (
+            "not found" in message or "not supported" in message or "does not exist" in message))
+
+    async def _block_receipts(self, hashes_by_block: Dict[int, List[str]]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Receipts of whole blocks; returns the wanted receipts and the hashes still missing."""
+        numbers = list(hashes_by_block)
+        results = await self.rpc.call_many([("eth_getBlockReceipts", [hex(number)]) for number in numbers])
+        self.stats["block_calls"] += len(numbers)
+        receipts: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for number, result in zip(numbers, results):
+            if isinstance(result, RpcError) and self._unsupported(result):
+                if self.block_receipts_supported is not False:
+                    logger.warning(f"eth_getBlockReceipts is not supported, falling back to per-tx receipts: {result}")
+                self.block_receipts_supported = False
+            if not isinstance(result, list):
+                missing.extend(hashes_by_block[number])
+                continue
+            self.block_receipts_supported = True
+            by_hash = {receipt.get("transactionHash", "").lower(): receipt for receipt in result if isinstance(receipt, dict)}
+            for tx_hash in hashes_by_block[number]:
+                receipt = by_hash.get(tx_hash)
+                if receipt is None:
+                    missing.append(tx_hash)
+                else:
+                    receipts[tx_hash] = receipt
+        return receipts, missing
+
+    async def _tx_receipts(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        results = await self.rpc.call_many([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])
+        self.stats["tx_calls"] += len(hashes)
+        return {tx_hash: result for tx_hash, result in zip(hashes, results) if isinstance(result, dict)}
+
+    async def fetch(self, hashes_by_block: Dict[int, List[str]]) -> Dict[str, Dict[str, Any]]:
+        """Fetch the receipts of the given transactions.
+
+        Args:
+            hashes_by_block: Lowercase 0x-prefixed transaction hashes grouped by block number.
+
+        Returns:
+            Mapping of transaction hash to the raw receipt; hashes the node did
+            not return are left out.
+        """
+        receipts: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = [tx_hash for hashes in hashes_by_block.values() for tx_hash in hashes]
+        if missing and self.block_receipts_supported is not False:
+            receipts, missing = await self._block_receipts(hashes_by_block)
+        if missing:
+            receipts.update(await self._tx_receipts(missing))
+        return receipts
+
+    def executed(self, receipt: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize a raw receipt: status, gas used and the decoded Swap events."""
+        status = receipt.get("status")
+        gas_used = receipt.get("gasUsed")
+        swaps = [event for event in (self.decoder.decode_log(log) for log in receipt.get("logs") or []) if event]
+        return {
+            "status": int(status, 16) if isinstance(status, str) else status,
+            "gas_used": int(gas_used, 16) if isinstance(gas_used, str) else gas_used,
+            "swaps": swaps,
+        }
+
+    async def enrich(self, batch: List[SwapRecord]) -> int:
+        """Set ``executed`` (see executed()) on every swap record of the batch.
+
+        Args:
+            batch: Swap records as produced by the analyzer.
+
+        Returns:
+            Number of records enriched.
+        """
+        columns = SwapBatch.from_records(batch)
+        hashes_by_block = columns.hashes_by_block()
+        if not hashes_by_block:
+            return 0
+
+        receipts = await self.fetch(hashes_by_block)
+        enriched = 0
+        for record, tx_hash, block_number in zip(batch, columns.hashes_hex(), columns.block_numbers):
+            receipt = receipts.get(tx_hash) if block_number != NO_BLOCK else None
+            if receipt is None:
+                continue
+            record.executed = self.executed(receipt)
+            enriched += 1
+        self.stats["receipts"] += enriched
+        self.stats["missing"] += len(batch) - enriched
+        if enriched < len(batch):
+            logger.warning(f"No receipt for {len(batch) - enriched} of {len(batch)} swaps")
+        return enriched
@@ -0,0 +1,145 @@
+# analyzer_transactions/router_registry.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+from typing import List, Dict, Any, Optional, Iterable, FrozenSet
+from redis.asyncio import Redis
+from analyzer_transactions import logger
+from config.router_config import known_routers
+
+REDIS_ROUTERS_KEY: str = "routers:config"
+
+
+def _to_bytes(address: str) -> bytes:
+    address = address.lower()
+    if address.startswith("0x"):
+        address = address[2:]
+    value = bytes.fromhex(address)
+    if len(value) != 20:
+        raise ValueError(f"Invalid address length: {address}")
+    return value
+
+
+class RouterRegistry:
+    """Set of known router/aggregator addresses used as the first-stage transaction filter.
+
+    The set is seeded from ``config.router_config`` and the ``ROUTER_ADDRESSES``
+    environment variable (comma-separated), extended with the JSON list stored
+    under ``routers:config`` in Redis, and hot-reloaded from Redis every
+    ``reload_interval`` seconds. Lookups are against an immutable frozenset of
+    20-byte addresses that is swapped atomically on reload. The filter is off
+    unless ROUTER_FILTER is set: swaps through routers missing from the list
+    would otherwise be dropped.
+    """
+
+    def __init__(self, addresses: Iterable[str] = (), enabled: bool = True, reload_interval: float = 60) -> None:
+        """Initialize the registry.
+
+        Args:
+            addresses: Seed addresses (hex strings).
+            enabled: If False (the ROUTER_FILTER default), every address passes the filter.
+            reload_interval: Seconds between reloads from Redis.
+        """
+        self.enabled: bool = enabled
+        self.reload_interval: float = reload_interval
+        self._seed: List[str] = list(addresses)
+        self._last_reload: Optional[float] = None
+        self.addresses: FrozenSet[bytes] = frozenset()
+        self._set(self._seed)
+
+    @classmethod
+    def from_config(cls) -> "RouterRegistry":
+        """Build the registry from config and environment variables."""
+        addresses: List[str] = [router["address"] for router in known_routers]
+        addresses.extend(a.strip() for a in os.getenv("ROUTER_ADDRESSES", "").split(",") if a.strip())
+        return cls(
+            addresses,
+            enabled=os.getenv("ROUTER_FILTER", "0").lower() in ("1", "true", "yes"),
+            reload_interval=float(os.getenv("ROUTER_RELOAD_INTERVAL", 60)),
+        )
+
+    def _set(self, addresses: Iterable[str]) -> None:
+        parsed = set()
+        for address in addresses:
+            try:
+                parsed.add(_to_bytes(address))
+            except ValueError as e:
+                logger.warning(f"Skipped router address {address!r}: {e}")
+        self.addresses = frozenset(parsed)
+
+    @property
+    def active(self) -> bool:
+        """Whether the filter rejects transactions (enabled and non-empty)."""
+        return self.enabled and bool(self.addresses)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __contains__(self, address: bytes) -> bool:
+        return address in self.addresses
+
+    def allows(self, to: Optional[str]) -> bool:
+        """Check a checksummed or lowercase ``to`` address against the set.
+
+        Args:
+            to: Destination address as a 0x-prefixed hex string.
+
+        Returns:
+            True if the filter is inactive or the address is a known router.
+        """
+        if not self.active:
+            return True
+        if not to:
+            return False
+        try:
+            # bytes.fromhex accepts both cases, no lower() copy of the string
+            return bytes.fromhex(to[2:]) in self.addresses
+        except ValueError:
+            return False
+
+    async def refresh(self, redis: Redis) -> None:
+        """Reload the set: seed addresses plus the list stored in Redis.
+
+        Args:
+            redis: Redis client.
+        """
+        self._last_reload = time.monotonic()
+        try:
+            raw = await redis.get(REDIS_ROUTERS_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to reload routers from Redis: {e}")
+            return
+        extra: List[str] = []
+        if raw:
+            try:
+                extra = [item["address"] if isinstance(item, dict) else item for item in json.loads(raw)]
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(f"Invalid {REDIS_ROUTERS_KEY} value: {e}")
+        previous = len(self.addresses)
+        self._set(self._seed + extra)
+        if len(self.addresses) != previous:
+            logger.info(f"Router registry reloaded: {len(self.addresses)} addresses")
+
+    async def maybe_refresh(self, redis: Optional[Redis]) -> None:
+        """Reload from Redis if ``reload_interval`` has passed since the last reload."""
+        if redis is None:
+            return
+        if self._last_reload is None or time.monotonic() - self._last_reload >= self.reload_interval:
+            await self.refresh(redis)
+
+    @staticmethod
+    async def publish(redis: Redis, addresses: List[Dict[str, Any]]) -> None:
+        """Store additional router addresses in Redis for all analyzers to pick up.
+
+        Args:
+            redis: Redis client.
+            addresses: List of {"name": ..., "address": ...} items.
+        """
+        for item in addresses:
+            _to_bytes(item["address"])
+        await redis.set(REDIS_ROUTERS_KEY, json.dumps(addresses))
@@ -0,0 +1,335 @@
+# analyzer_transactions/rpc_client.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import itertools
+import time
+from typing import List, Dict, Any, Optional, Tuple, Union
+import aiohttp
+from analyzer_transactions import logger
+
+# HTTP statuses some nodes/proxies answer with when JSON-RPC batches are disabled
+BATCH_REJECT_STATUSES = {400, 404, 405, 413, 415, 501}
+
+
+class RpcError(Exception):
+    """JSON-RPC error returned for a single call."""
+
+    def __init__(self, code: int, message: str, data: Any = None) -> None:
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class RpcHttpError(Exception):
+    """Non-200 HTTP response from the node."""
+
+    def __init__(self, status: int, body: str = "", retry_after: Optional[float] = None) -> None:
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class BatchNotSupportedError(Exception):
+    """The node rejected a JSON-RPC batch request."""
+
+
+class RpcClient:
+    """Minimal JSON-RPC client over a shared aiohttp session with batch support.
+
+    Calls are packed into batch POSTs of ``batch_size`` items. If the node rejects
+    batches, the client remembers it and falls back to single requests.
+    """
+
+    def __init__(self, rpc_url: str, batch_size: int = 20, timeout: float = 30) -> None:
+        """Initialize the client.
+
+        Args:
+            rpc_url: HTTP URL of the node.
+            batch_size: Maximum calls per batch POST (1 disables batching).
+            timeout: Total timeout of a single HTTP request in seconds.
+        """
+        self.rpc_url: str = rpc_url
+        self.batch_size: int = max(1, batch_size)
+        self.timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(total=timeout)
+        self.batch_supported: Optional[bool] = None  # Unknown until the first batch
+        self.stats: Dict[str, int] = {"http_requests": 0, "rpc_calls": 0, "batches": 0, "fallbacks": 0}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ids = itertools.count(1)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _post(self, payload: Any) -> Any:
+        """POST a JSON-RPC payload and return the decoded JSON body."""
+        return await self._post_to(self.rpc_url, payload)
+
+    async def _post_to(self, url: str, payload: Any) -> Any:
+        session = await self._get_session()
+        self.stats["http_requests"] += 1
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                retry_after = response.headers.get("Retry-After")
+                raise RpcHttpError(
+                    response.status,
+                    await response.text(),
+                    float(retry_after) if retry_after and retry_after.isdigit() else None,
+                )
+            return await response.json(content_type=None)
+
+    def _request(self, method: str, params: List[Any]) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+
+    @staticmethod
+    def _unwrap(item: Dict[str, Any]) -> Any:
+        """Return the result of a response item or an RpcError instance."""
+        error = item.get("error")
+        if error is not None:
+            return RpcError(error.get("code", -32603), error.get("message", "unknown error"), error.get("data"))
+        return item.get("result")
+
+    async def call(self, method: str, params: Optional[List[Any]] = None) -> Any:
+        """Send a single JSON-RPC call.
+
+        Args:
+            method: JSON-RPC method name.
+            params: Method parameters.
+
+        Returns:
+            The call result.
+
+        Raises:
+            RpcError: If the node returned an error for the call.
+            RpcHttpError: If the node answered with a non-200 status.
+        """
+        self.stats["rpc_calls"] += 1
+        result = self._unwrap(await self._post(self._request(method, params or [])))
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    async def call_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Union[Any, RpcError]]:
+        """Send calls as one JSON-RPC batch POST.
+
+        Args:
+            calls: List of (method, params) tuples.
+
+        Returns:
+            Results in the order of ``calls``; failed items are RpcError instances.
+
+        Raises:
+            BatchNotSupportedError: If the node rejected the batch.
+            RpcHttpError: If the node answered with a non-200 status.
+        """
+        requests = [self._request(method, params) for method, params in calls]
+        try:
+            body = await self._post(requests)
+        except RpcHttpError as e:
+            if e.status in BATCH_REJECT_STATUSES:
+                raise BatchNotSupportedError(str(e)) from e
+            raise
+        if not isinstance(body, list):
+            raise BatchNotSupportedError(f"Unexpected batch response: {str(body)[:200]}")
+
+        self.stats["batches"] += 1
+        self.stats["rpc_calls"] += len(calls)
+        by_id: Dict[Any, Dict[str, Any]] = {item.get("id"): item for item in body if isinstance(item, dict)}
+        results: List[Union[Any, RpcError]] = []
+        for request in requests:
+            item = by_id.get(request["id"])
+            results.append(self._unwrap(item) if item is not None else RpcError(-32603, "missing response in batch"))
+        return results
+
+    async def _call_single_safe(self, method: str, params: List[Any]) -> Union[Any, RpcError]:
+        try:
+            return await self.call(method, params)
+        except RpcError as e:
+            return e
+
+    async def call_many(self, calls: List[Tuple[str, List[Any]]]) -> List[Union[Any, RpcError]]:
+        """Send calls in batches of ``batch_size``, falling back to single requests.
+
+        Args:
+            calls: List of (method, params) tuples.
+
+        Returns:
+            Results in the order of ``calls``; failed items are RpcError instances.
+        """
+        results: List[Union[Any, RpcError]] = []
+        for offset in range(0, len(calls), self.batch_size):
+            chunk = calls[offset:offset + self.batch_size]
+            if self.batch_size > 1 and len(chunk) > 1 and self.batch_supported is not False:
+                try:
+                    results.extend(await self.call_batch(chunk))
+                    self.batch_supported = True
+                    continue
+                except BatchNotSupportedError as e:
+                    logger.warning(f"Node {self.rpc_url} rejected batch request, falling back to single calls: {e}")
+                    self.batch_supported = False
+                    self.stats["fallbacks"] += 1
+            results.extend(await asyncio.gather(*[self._call_single_safe(m, p) for m, p in chunk]))
+        return results
+
+    async def get_blocks(self, block_numbers: List[int], full_transactions: bool = True) -> Dict[int, Union[Dict[str, Any], RpcError]]:
+        """Fetch raw blocks by number.
+
+        Args:
+            block_numbers: Block numbers to fetch.
+            full_transactions: Whether to include full transaction objects.
+
+        Returns:
+            Mapping of block number to the raw JSON block or the RpcError for that block.
+        """
+        calls = [("eth_getBlockByNumber", [hex(number), full_transactions]) for number in block_numbers]
+        results = await self.call_many(calls)
+        blocks: Dict[int, Union[Dict[str, Any], RpcError]] = {}
+        for number, result in zip(block_numbers, results):
+            if result is None:
+                result = RpcError(-32000, f"block {number} not found")
+            blocks[number] = result
+        return blocks
+
+
+class ScheduledRpcClient(RpcClient):
+    """RpcClient that sends every HTTP request to a node granted by NodeRateLimiter.acquire.
+
+    A request costs as many tokens as it carries calls, so the throughput is the
+    sum of the node quotas. Latency, errors and the reported chain head of every
+    request feed the node ranking of the limiter. HTTP 429/5xx answers and
+    connection errors put the node on cooldown and the request is repeated on
+    another node. With ``hedge`` a request still unanswered after the p95
+    latency of its node is sent to a second node as well; the first answer wins.
+    Batch support is tracked per node: a batch granted to a node that rejects
+    batches is sent to it as single requests, other nodes keep batching.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, limiter: Any, batch_size: int = 20, timeout: float = 30, cooldown: float = 5.0,
+                 max_attempts: int = 4, acquire_timeout: float = 30.0, hedge: bool = False) -> None:
+        """Initialize the client.
+
+        Args:
+            limiter: NodeRateLimiter granting a node per request.
+            batch_size: Maximum calls per batch POST (1 disables batching).
+            timeout: Total timeout of a single HTTP request in seconds.
+            cooldown: Cooldown of a failing node without a Retry-After header, in seconds.
+            max_attempts: Nodes tried per request before the error is raised.
+            acquire_timeout: Maximum wait for node quota in seconds.
+            hedge: Duplicate slow requests to a second node after its p95 latency.
+        """
+        # Не URL ноды: каждый запрос уходит на ноду, выданную limiter, и в логах указывается она
+        super().__init__("scheduled", batch_size=batch_size, timeout=timeout)
+        self.limiter = limiter
+        self.batch_support: Dict[str, bool] = {}
+        self.cooldown: float = cooldown
+        self.max_attempts: int = max(1, max_attempts)
+        self.acquire_timeout: float = acquire_timeout
+        self.hedge: bool = hedge
+        self.stats.update(retries=0, hedged=0, hedge_wins=0)
+
+    async def _timed_post(self, node_url: str, payload: Any) -> Any:
+        """POST to a node and report the latency and outcome to the limiter."""
+        started = time.monotonic()
+        try:
+            body = await self._post_to(node_url, payload)
+        except asyncio.CancelledError:
+            raise
+        except RpcHttpError as e:
+            if isinstance(payload, list) and e.status in BATCH_REJECT_STATUSES:
+                self.limiter.observe(node_url, time.monotonic() - started)
+                self._reject_batches(node_url, e)
+            self.limiter.observe(node_url, time.monotonic() - started, error=True)
+            raise
+        except Exception:
+            self.limiter.observe(node_url, time.monotonic() - started, error=True)
+            raise
+        self.limiter.observe(node_url, time.monotonic() - started)
+        if isinstance(payload, list):
+            if not isinstance(body, list):
+                self._reject_batches(node_url, f"Unexpected batch response: {str(body)[:200]}")
+            self.batch_support[node_url] = True
+        if isinstance(payload, dict) and payload.get("method") == "eth_blockNumber" and isinstance(body, dict):
+            result = body.get("result")
+            if isinstance(result, str):
+                self.limiter.observe_head(node_url, int(result, 16))
+        return body
+
+    def _reject_batches(self, node_url: str, reason: Any) -> None:
+        """Remember that node_url rejects batches and raise BatchNotSupportedError."""
+        logger.warning(f"Node {node_url} rejected batch request, sending its batches as single calls: {reason}")
+        self.batch_support[node_url] = False
+        self.stats["fallbacks"] += 1
+        raise BatchNotSupportedError(f"Node {node_url}: {reason}")
+
+    async def _post_singles(self, node_url: str, payload: List[Dict[str, Any]]) -> List[Any]:
+        """Send the calls of a batch to node_url one by one; the quota is already paid."""
+        return list(await asyncio.gather(*[self._timed_post(node_url, request) for request in payload]))
+
+    async def _hedged_post(self, node_url: str, payload: Any, cost: int) -> Any:
+        """POST to node_url; after its p95 latency also to another node and return the first answer."""
+        delay = self.limiter.hedge_delay(node_url)
+        primary = asyncio.ensure_future(self._timed_post(node_url, payload))
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        try:
+            # Дублирующий запрос только если у другой ноды есть квота прямо сейчас
+            backup_url = await self.limiter.acquire(cost, timeout=0, exclude=[node_url])
+        except Exception:
+            return await primary
+        self.stats["hedged"] += 1
+        backup = asyncio.ensure_future(self._timed_post(backup_url, payload))
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+            # Both failed: report the error of the primary node
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _post(self, payload: Any) -> Any:
+        cost = len(payload) if isinstance(payload, list) else 1
+        for attempt in range(self.max_attempts):
+            node_url = await self.limiter.acquire(cost, timeout=self.acquire_timeout)
+            try:
+                if isinstance(payload, list) and self.batch_support.get(node_url) is False:
+                    return await self._post_singles(node_url, payload)
+                try:
+                    if self.hedge:
+                        return await self._hedged_post(node_url, payload, cost)
+                    return await self._timed_post(node_url, payload)
+                except BatchNotSupportedError:
+                    return await self._post_singles(node_url, payload)
+            except RpcHttpError as e:
+                if e.status not in self.RETRY_STATUSES or attempt == self.max_attempts - 1:
+                    raise
+                await self.limiter.cooldown(node_url, e.retry_after or self.cooldown)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                logger.warning(f"Request to {node_url} failed: {e!r}")
+                await self.limiter.cooldown(node_url, self.cooldown)
+            self.stats["retries"] += 1
@@ -0,0 +1,66 @@
+# analyzer_transactions/staging.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+from typing import List, Dict, Any, AsyncIterator, Optional
+from redis.asyncio import Redis
+from analyzer_transactions import codec
+
+STAGING_KEY_PREFIX: str = "staging:swaps:"
+# Staged rows outlive the retries of the save task, then expire if it never ran
+STAGING_TTL: int = int(os.getenv("STAGING_TTL", 24 * 3600))
+
+
+class StagedRowsMissingError(Exception):
+    """The staging list holds fewer rows than the analyze stage appended (expired or evicted)."""
+
+
+def staging_key(name: Optional[str] = None) -> str:
+    """Key of a new staging list, ``name`` (e.g. the task ID) or a random one."""
+    return STAGING_KEY_PREFIX + (name or uuid.uuid4().hex)
+
+
+class SwapStaging:
+    """Rows handed from the analyze stage to the save stage through Redis.
+
+    The analyze task appends its rows to a Redis list, one swapbin-encoded
+    element per batch, and sends only ``{"key": ..., "count": ...}`` to the
+    save task. The save task reads the list back batch by batch and deletes it
+    once everything is stored, so neither the broker nor the result backend
+    carries the rows, and memory is bounded by one batch.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = STAGING_TTL) -> None:
+        self.redis: Redis = redis
+        self.ttl: int = ttl
+
+    async def append(self, key: str, rows: List[Dict[str, Any]]) -> int:
+        """Append a batch of rows to the staging list.
+
+        Returns:
+            Number of rows appended.
+        """
+        if not rows:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(key, codec.encode(rows))
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+        return len(rows)
+
+    async def batches(self, key: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the staged batches in the order they were appended (the list is kept)."""
+        position = 0
+        while True:
+            items = await self.redis.lrange(key, position, position)
+            if not items:
+                return
+            position += 1
+            yield codec.decode(items[0])
+
+    async def delete(self, key: str) -> None:
+        await self.redis.delete(key)
@@ -0,0 +1,241 @@
+# analyzer_transactions/swap_record.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from array import array
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Mapping, Union
+from eth_utils import decode_hex
+
+HASH_SIZE: int = 32
+METHOD_ID_SIZE: int = 4
+# Stored for a swap without a block (e.g. decoded from a pending transaction)
+NO_BLOCK: int = -1
+
+
+def _to_bytes(value: Union[bytes, str, None]) -> bytes:
+    if value is None:
+        return b""
+    if isinstance(value, str):
+        return decode_hex(value)
+    return bytes(value)
+
+
+def json_safe(value: Any) -> Any:
+    """Copy of a decoded input with only JSON types: bytes become 0x-hex, tuples lists.
+
+    eth_abi returns tuples for structs and bytes for calldata, V3 paths and
+    Universal Router inputs, which neither json.dumps nor the JSON column accept.
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + value.hex()
+    return value
+
+
+class SwapRecord:
+    """Decoded swap transaction with only the fields the analyzer keeps.
+
+    Replaces the copy of the full web3 transaction (signature, gas fields,
+    access list, ...) that used to travel to Redis, the database and Celery
+    results. Values can also be read under the former dictionary keys
+    (``record["hash"]``, ``record.get("blockNumber")``), so batch callbacks
+    written against the dictionaries keep working.
+    """
+
+    __slots__ = ("hash", "block_number", "transaction_index", "sender", "to", "method_id", "decoded_input", "executed")
+
+    # Former dictionary key -> attribute
+    KEYS: Dict[str, str] = {
+        "hash": "hash",
+        "blockNumber": "block_number",
+        "transactionIndex": "transaction_index",
+        "from": "sender",
+        "to": "to",
+        "methodId": "method_id",
+        "decoded_input": "decoded_input",
+        "executed": "executed",
+    }
+
+    def __init__(self, hash: bytes, block_number: Optional[int] = None, transaction_index: Optional[int] = None,
+                 sender: Optional[str] = None, to: Optional[str] = None, method_id: bytes = b"",
+                 decoded_input: Optional[Dict[str, Any]] = None, executed: Optional[Dict[str, Any]] = None) -> None:
+        """Initialize the record.
+
+        Args:
+            hash: 32-byte transaction hash.
+            block_number: Block number, None for pending transactions.
+            transaction_index: Position in the block.
+            sender: ``from`` address.
+            to: Router address.
+            method_id: 4-byte selector of the calldata.
+            decoded_input: Result of SelectorIndex.decode.
+            executed: Receipt data, see analyzer_transactions.receipts.
+        """
+        self.hash: bytes = hash
+        self.block_number: Optional[int] = block_number
+        self.transaction_index: Optional[int] = transaction_index
+        self.sender: Optional[str] = sender
+        self.to: Optional[str] = to
+        self.method_id: bytes = method_id
+        self.decoded_input: Optional[Dict[str, Any]] = decoded_input
+        self.executed: Optional[Dict[str, Any]] = executed
+
+    @classmethod
+    def from_tx(cls, tx: Mapping[str, Any], decoded_input: Optional[Dict[str, Any]] = None) -> "SwapRecord":
+        """Build a record from a web3-formatted (or raw JSON-RPC) transaction."""
+        block_number = tx.get("blockNumber")
+        transaction_index = tx.get("transactionIndex")
+        return cls(
+            hash=_to_bytes(tx.get("hash")),
+            block_number=int(block_number, 16) if isinstance(block_number, str) else block_number,
+            transaction_index=int(transaction_index, 16) if isinstance(transaction_index, str) else transaction_index,
+            sender=tx.get("from"),
+            to=tx.get("to"),
+            method_id=_to_bytes(tx.get("input"))[:METHOD_ID_SIZE],
+            decoded_input=decoded_input,
+        )
+
+    @property
+    def hash_hex(self) -> str:
+        return "0x" + self.hash.hex()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dictionary under the former keys with JSON types only (hash, selector and bytes as 0x-hex)."""
+        data: Dict[str, Any] = {
+            "hash": self.hash_hex,
+            "blockNumber": self.block_number,
+            "transactionIndex": self.transaction_index,
+            "from": self.sender,
+            "to": self.to,
+            "methodId": "0x" + self.method_id.hex(),
+            "decoded_input": json_safe(self.decoded_input),
+        }
+        if self.executed is not None:
+            data["executed"] = json_safe(self.executed)
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, self.KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attribute = self.KEYS.get(key)
+        return getattr(self, attribute) if attribute is not None else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.KEYS
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SwapRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        method = self.decoded_input.get("method") if self.decoded_input else None
+        return f"SwapRecord({self.hash_hex}, block={self.block_number}, method={method})"
+
+
+class SwapBatch:
+    """Columnar container of swaps for bulk operations.
+
+    Hashes and selectors are packed into one bytearray each, block numbers and
+    positions into typed arrays; only the addresses and decoded inputs stay
+    Python objects. Indexing yields SwapRecord views built on demand.
+    """
+
+    __slots__ = ("hashes", "block_numbers", "transaction_indexes", "senders", "recipients", "method_ids",
+                 "decoded_inputs", "executed")
+
+    def __init__(self) -> None:
+        self.hashes: bytearray = bytearray()
+        self.block_numbers: array = array("q")
+        self.transaction_indexes: array = array("l")
+        self.senders: List[Optional[str]] = []
+        self.recipients: List[Optional[str]] = []
+        self.method_ids: bytearray = bytearray()
+        self.decoded_inputs: List[Optional[Dict[str, Any]]] = []
+        self.executed: List[Optional[Dict[str, Any]]] = []
+
+    @classmethod
+    def from_records(cls, records: Iterable[SwapRecord]) -> "SwapBatch":
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def append(self, record: SwapRecord) -> None:
+        if len(record.hash) != HASH_SIZE:
+            raise ValueError(f"Invalid transaction hash length: {len(record.hash)}")
+        self.hashes += record.hash
+        self.block_numbers.append(NO_BLOCK if record.block_number is None else record.block_number)
+        self.transaction_indexes.append(NO_BLOCK if record.transaction_index is None else record.transaction_index)
+        self.senders.append(record.sender)
+        self.recipients.append(record.to)
+        self.method_ids += record.method_id.ljust(METHOD_ID_SIZE, b"\x00")[:METHOD_ID_SIZE]
+        self.decoded_inputs.append(record.decoded_input)
+        self.executed.append(record.executed)
+
+    def __len__(self) -> int:
+        return len(self.decoded_inputs)
+
+    def hash_at(self, position: int) -> bytes:
+        return bytes(self.hashes[position * HASH_SIZE:(position + 1) * HASH_SIZE])
+
+    def hashes_hex(self) -> List[str]:
+        """0x-prefixed hashes of all swaps (one hex conversion for the whole column)."""
+        packed = self.hashes.hex()
+        step = HASH_SIZE * 2
+        return ["0x" + packed[offset:offset + step] for offset in range(0, len(packed), step)]
+
+    def __getitem__(self, position: int) -> SwapRecord:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        block_number = self.block_numbers[position]
+        transaction_index = self.transaction_indexes[position]
+        return SwapRecord(
+            hash=self.hash_at(position),
+            block_number=None if block_number == NO_BLOCK else block_number,
+            transaction_index=None if transaction_index == NO_BLOCK else transaction_index,
+            sender=self.senders[position],
+            to=self.recipients[position],
+            method_id=bytes(self.method_ids[position * METHOD_ID_SIZE:(position + 1) * METHOD_ID_SIZE]),
+            decoded_input=self.decoded_inputs[position],
+            executed=self.executed[position],
+        )
+
+    def __iter__(self) -> Iterator[SwapRecord]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def hashes_by_block(self) -> Dict[int, List[str]]:
+        """Lowercase 0x-hashes grouped by block number; swaps without a block are left out."""
+        grouped: Dict[int, List[str]] = {}
+        for block_number, tx_hash in zip(self.block_numbers, self.hashes_hex()):
+            if block_number != NO_BLOCK:
+                grouped.setdefault(block_number, []).append(tx_hash)
+        return grouped
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Rows for DatabaseWorker.save_transactions; receipt data goes under decoded_input["executed"].
+
+        decoded_input is converted with json_safe for the JSON column and the Redis copy.
+        """
+        return [
+            {
+                "tx_hash": tx_hash,
+                "block_number": None if block_number == NO_BLOCK else block_number,
+                "decoded_input": json_safe(decoded if executed is None else {**(decoded or {}), "executed": executed}),
+            }
+            for tx_hash, block_number, decoded, executed
+            in zip(self.hashes_hex(), self.block_numbers, self.decoded_inputs, self.executed)
+        ]
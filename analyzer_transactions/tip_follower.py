@@ -0,0 +1,338 @@
+# analyzer_transactions/tip_follower.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from redis.asyncio import Redis
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions, _open_analyzer
+from analyzer_transactions.node_limiter import NodeRateLimiter
+from analyzer_transactions.head_subscriber import HeadSubscriber
+
+
+class TipFollower:
+    """Process only the blocks the chain head gained since the last step.
+
+    The last processed block number (the cursor) and the hashes of the last
+    ``reorg_depth`` processed blocks are kept in Redis, so any worker can
+    continue where the previous one stopped. Every step fetches
+    ``cursor+1..head``. When the first new block does not build on the stored
+    hash of the cursor block, the cursor is moved one block back (and
+    ``on_reorg`` called) until the chains agree again.
+    """
+
+    def __init__(
+        self,
+        analyzer: AnalyzerTransactions,
+        redis: Redis,
+        name: str = "default",
+        max_blocks_per_step: int = 100,
+        reorg_depth: int = 64,
+        start_depth: int = 1,
+        poll_interval: float = 2.0,
+        on_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        on_reorg: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> None:
+        """Initialize the follower.
+
+        Args:
+            analyzer: Initialized analyzer (fetcher, filters, decoder).
+            redis: Redis client for the cursor, the block hashes and the lock.
+            name: Follower name, separates the Redis keys of several followers.
+            max_blocks_per_step: Upper bound of blocks fetched by one step (catch-up).
+            reorg_depth: Number of processed block hashes kept for reorg detection.
+            start_depth: Blocks below the head processed when no cursor exists yet.
+            poll_interval: Seconds between steps once the follower has caught up.
+            on_batch: Optional coroutine called with every stored batch of swaps.
+            on_reorg: Optional coroutine called with the first orphaned block number.
+        """
+        self.analyzer: AnalyzerTransactions = analyzer
+        self.redis: Redis = redis
+        self.name: str = name
+        self.max_blocks_per_step: int = max_blocks_per_step
+        self.reorg_depth: int = reorg_depth
+        self.start_depth: int = start_depth
+        self.poll_interval: float = poll_interval
+        self.on_batch = on_batch
+        self.on_reorg = on_reorg
+        self.cursor_key: str = f"follower:{name}:cursor"
+        self.hashes_key: str = f"follower:{name}:hashes"
+        self.lock_key: str = f"follower:{name}:lock"
+        self.totals: Dict[str, int] = {"steps": 0, "blocks": 0, "swaps": 0, "reorgs": 0}
+
+    @classmethod
+    def from_env(cls, analyzer: AnalyzerTransactions, redis: Redis, **kwargs: Any) -> "TipFollower":
+        """Build the follower with settings from environment variables."""
+        settings: Dict[str, Any] = {
+            "name": os.getenv("FOLLOWER_NAME", "default"),
+            "max_blocks_per_step": int(os.getenv("FOLLOWER_MAX_BLOCKS_PER_STEP", 100)),
+            "reorg_depth": int(os.getenv("FINALITY_DEPTH", 64)),
+            "start_depth": int(os.getenv("FOLLOWER_START_DEPTH", 1)),
+            "poll_interval": float(os.getenv("FOLLOWER_POLL_INTERVAL", 2.0)),
+        }
+        settings.update(kwargs)
+        return cls(analyzer, redis, **settings)
+
+    async def get_cursor(self) -> Optional[int]:
+        """Last processed block number, None before the first step."""
+        value = await self.redis.get(self.cursor_key)
+        return int(value) if value is not None else None
+
+    async def reset(self, cursor: Optional[int] = None) -> None:
+        """Move the cursor (None: start again from the head) and forget the stored hashes."""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.hashes_key)
+        if cursor is None:
+            pipe.delete(self.cursor_key)
+        else:
+            pipe.set(self.cursor_key, cursor)
+        await pipe.execute()
+
+    async def _stored_hash(self, number: int) -> Optional[str]:
+        value = await self.redis.hget(self.hashes_key, number)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    async def _rewind(self, cursor: int) -> None:
+        """Drop the cursor block, which the canonical chain no longer contains."""
+        logger.warning(f"Reorg at block {cursor}: rewinding follower '{self.name}' to {cursor - 1}")
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(self.cursor_key, cursor - 1)
+        pipe.hdel(self.hashes_key, cursor)
+        await pipe.execute()
+        if self.analyzer.block_cache is not None:
+            await self.analyzer.block_cache.invalidate([cursor])
+        if self.on_reorg is not None:
+            await self.on_reorg(cursor)
+
+    async def _commit(self, first: int, blocks: List[Dict[str, Any]]) -> None:
+        """Advance the cursor to the last processed block and remember the new hashes."""
+        last = int(blocks[-1]["number"], 16)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(self.cursor_key, last)
+        pipe.hset(self.hashes_key, mapping={int(block["number"], 16): block["hash"] for block in blocks})
+        expired = list(range(max(first - self.reorg_depth, 0), last - self.reorg_depth + 1))
+        if expired:
+            pipe.hdel(self.hashes_key, *expired)
+        await pipe.execute()
+
+    async def _store(self, swaps: List[Dict[str, Any]]) -> int:
+        batches = 0
+        size = self.analyzer.STORAGE_BATCH_SIZE
+        for offset in range(0, len(swaps), size):
+            await self.analyzer.store_batch(swaps[offset:offset + size], self.on_batch)
+            batches += 1
+        return batches
+
+    async def step(self, head: Optional[int] = None) -> Dict[str, Any]:
+        """Process the blocks between the cursor and the current head.
+
+        Args:
+            head: Head announced by a newHeads subscription, looked up if None.
+
+        Returns:
+            Summary with head, processed range, blocks, swaps and reorgs.
+        """
+        if head is None:
+            head = int(await self.analyzer.rpc.call("eth_blockNumber"), 16)
+        cursor = await self.get_cursor()
+        if cursor is None:
+            cursor = head - self.start_depth
+        summary: Dict[str, Any] = {"head": head, "from": None, "to": cursor, "blocks": 0, "swaps": 0, "reorgs": 0}
+        self.totals["steps"] += 1
+        if cursor >= head:
+            return summary
+
+        numbers = list(range(cursor + 1, min(head, cursor + self.max_blocks_per_step) + 1))
+        raw_blocks: Dict[int, Any] = {}
+        async for number, raw_block in self.analyzer.fetcher.fetch(numbers, head=head):
+            raw_blocks[number] = raw_block
+
+        # Blocks are accepted in order while each one builds on the previous
+        expected: Optional[str] = await self._stored_hash(cursor)
+        accepted: List[Dict[str, Any]] = []
+        for number in numbers:
+            raw_block = raw_blocks.get(number)
+            if raw_block is None or isinstance(raw_block, BaseException):
+                logger.error(f"Error fetching block {number}: {raw_block}")
+                break
+            if expected is not None and raw_block["parentHash"] != expected:
+                if number == cursor + 1:
+                    await self._rewind(cursor)
+                    summary["reorgs"] += 1
+                    self.totals["reorgs"] += 1
+                elif self.analyzer.block_cache is not None:
+                    # The node switched branches between responses: retry on the next step
+                    await self.analyzer.block_cache.invalidate([number - 1, number])
+                break
+            accepted.append(raw_block)
+            expected = raw_block["hash"]
+
+        if not accepted:
+            return summary
+
+        swaps: List[Dict[str, Any]] = []
+        for raw_block in accepted:
+            swaps.extend(await self.analyzer.get_transactions_data(self.analyzer.select_raw_swaps(raw_block)))
+        await self._store(swaps)
+        await self._commit(cursor + 1, accepted)
+        await self.analyzer.flush_cache_stats()
+
+        summary.update({"from": cursor + 1, "to": int(accepted[-1]["number"], 16), "blocks": len(accepted), "swaps": len(swaps)})
+        self.totals["blocks"] += len(accepted)
+        self.totals["swaps"] += len(swaps)
+        logger.info(f"Follower '{self.name}': blocks {summary['from']} — {summary['to']} (head {head}), {len(swaps)} swaps")
+        return summary
+
+    async def acquire_lock(self, owner: str, ttl: int) -> bool:
+        """Take (or extend) the follower lock, so that one follower runs per name."""
+        if await self.redis.set(self.lock_key, owner, nx=True, ex=ttl):
+            return True
+        current = await self.redis.get(self.lock_key)
+        if isinstance(current, bytes):
+            current = current.decode()
+        if current == owner:
+            await self.redis.expire(self.lock_key, ttl)
+            return True
+        return False
+
+    async def release_lock(self, owner: str) -> None:
+        current = await self.redis.get(self.lock_key)
+        if isinstance(current, bytes):
+            current = current.decode()
+        if current == owner:
+            await self.redis.delete(self.lock_key)
+
+    async def run(self, duration: Optional[float] = None, stop: Optional[asyncio.Event] = None,
+                  lock_ttl: int = 30, subscriber: Optional[HeadSubscriber] = None,
+                  fallback_interval: float = 15.0) -> Dict[str, Any]:
+        """Follow the head until ``duration`` elapses or ``stop`` is set.
+
+        Steps run back to back while the follower is behind. Once it has caught
+        up, the next step starts on a newHeads notification of ``subscriber``
+        (the announced head saves the eth_blockNumber call), or after
+        ``poll_interval`` seconds without a subscriber. With a subscriber the
+        head is still polled every ``fallback_interval`` seconds in case the
+        WebSocket goes quiet.
+
+        Args:
+            duration: Maximum running time in seconds, None to run until stopped.
+            stop: Optional event that ends the loop.
+            lock_ttl: Lock expiry in seconds, extended on every step.
+            subscriber: Optional newHeads subscriber, started and stopped by the loop.
+            fallback_interval: Polling interval while a subscriber is used.
+
+        Returns:
+            Totals of the run, or {"status": "locked"} if another follower is running.
+        """
+        owner = uuid.uuid4().hex
+        if not await self.acquire_lock(owner, lock_ttl):
+            logger.info(f"Follower '{self.name}' is already running elsewhere")
+            return {"status": "locked"}
+        stop = stop or asyncio.Event()
+        deadline = time.monotonic() + duration if duration is not None else None
+        subscription: Optional[asyncio.Task] = None
+        if subscriber is not None:
+            subscription = asyncio.create_task(subscriber.run(stop))
+        try:
+            while not stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                if not await self.acquire_lock(owner, lock_ttl):
+                    logger.warning(f"Follower '{self.name}' lost its lock")
+                    break
+                head: Optional[int] = None
+                announced_at: Optional[float] = None
+                if subscriber is not None and subscriber.event.is_set():
+                    subscriber.event.clear()
+                    head, announced_at = subscriber.latest, subscriber.received_at
+                try:
+                    summary = await self.step(head)
+                    caught_up = summary["to"] >= summary["head"] or (summary["blocks"] == 0 and not summary["reorgs"])
+                    if announced_at is not None and summary["blocks"]:
+                        self._record_latency(time.monotonic() - announced_at)
+                except Exception as e:
+                    logger.error(f"Follower '{self.name}' step failed: {e!r}")
+                    caught_up = True
+                if caught_up:
+                    await self._wait_for_head(stop, subscriber, deadline, fallback_interval)
+        finally:
+            if subscription is not None:
+                subscription.cancel()
+                try:
+                    await subscription
+                except asyncio.CancelledError:
+                    pass
+            await self.release_lock(owner)
+        return {"status": "completed", **self.totals}
+
+    def _record_latency(self, latency: float) -> None:
+        """Time from the newHeads notification to the stored swaps of that block."""
+        latency_ms = int(latency * 1000)
+        self.totals["last_latency_ms"] = latency_ms
+        self.totals["max_latency_ms"] = max(self.totals.get("max_latency_ms", 0), latency_ms)
+
+    async def _wait_for_head(self, stop: asyncio.Event, subscriber: Optional[HeadSubscriber],
+                             deadline: Optional[float], fallback_interval: float) -> None:
+        timeout = self.poll_interval if subscriber is None else fallback_interval
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+        waiters = {asyncio.ensure_future(stop.wait())}
+        if subscriber is not None:
+            waiters.add(asyncio.ensure_future(subscriber.event.wait()))
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+
+async def follower_main(
+    redis_url: str = os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+    duration: Optional[float] = None,
+    on_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    on_reorg: Optional[Callable[[int], Awaitable[None]]] = None,
+    shared: bool = False,
+    stop: Optional[asyncio.Event] = None,
+    ws_url: Optional[str] = os.getenv('NODE_WS_URL'),
+) -> Dict[str, Any]:
+    """Run the tip follower on a node chosen by NodeRateLimiter.
+
+    Args:
+        redis_url: Redis URL of the node configuration.
+        duration: Maximum running time in seconds, None to run until stopped.
+        on_batch: Optional coroutine called with every stored batch of swaps.
+        on_reorg: Optional coroutine called with the first orphaned block number.
+        shared: Reuse the analyzer kept open for the running event loop.
+        stop: Optional event that ends the loop.
+        ws_url: WebSocket URL for newHeads notifications, polling only if None.
+
+    Returns:
+        Totals of the run.
+    """
+    limiter = NodeRateLimiter(redis_url)
+    try:
+        node_url = await limiter.get_available_node()
+    finally:
+        await limiter.close()
+    logger.info(f"NodeRateLimiter initialized. Using {node_url}")
+
+    async with _open_analyzer(node_url, shared) as analyzer:
+        follower = TipFollower.from_env(analyzer, analyzer.redis, on_batch=on_batch, on_reorg=on_reorg)
+        subscriber = HeadSubscriber(ws_url) if ws_url else None
+        return await follower.run(
+            duration=duration,
+            stop=stop,
+            subscriber=subscriber,
+            fallback_interval=float(os.getenv("FOLLOWER_WS_FALLBACK_INTERVAL", 15)),
+        )
+
+
+if __name__ == "__main__":
+    # Standalone service: swaps are stored in Redis, see tasks.analyzer_tasks.follow_tip for the DB variant
+    asyncio.run(follower_main())
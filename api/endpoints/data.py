@@ -12,6 +12,8 @@ from pydantic import BaseModel
 from redis.asyncio import Redis
 
 from analyzer_transactions.db_worker import DatabaseWorker
+from analyzer_transactions.db_engine import pool_stats
+from analyzer_transactions.block_cache import BlockCache
 from tasks.data_tasks import fetch_data
 from config.settings import REDIS_URL
 
@@ -60,3 +62,53 @@ async def get_transaction(tx_hash: str) -> Dict[str, Any]:
         "status": "completed",
         "transaction": transactions[0]
     }
+
+
+@router.get("/pool_stats")
+async def get_pool_stats() -> Dict[str, Any]:
+    """
+    Connection pool statistics of the database engines shared by this process.
+
+    Output:
+        {
+            "engines": [
+                {
+                    "url": "postgresql+asyncpg://postgres:***@db:5432/analyzer",
+                    "pid": 1,
+                    "loop_id": 140000000000000,
+                    "size": 20,
+                    "checked_in": 2,
+                    "checked_out": 0,
+                    "overflow": -18
+                }
+            ]
+        }
+    """
+    return {"engines": pool_stats()}
+
+
+@router.get("/block_cache_stats")
+async def get_block_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss totals of the block cache, aggregated over all analyzers.
+
+    Output:
+        {
+            "block": {
+                "hits": 950,
+                "local_hits": 400,
+                "misses": 50,
+                "stored": 50,
+                "invalidated": 2,
+                "bytes_stored": 1500000,
+                "evicted": 0,
+                "rpc_saved": 950,
+                "hit_ratio": 0.95
+            }
+        }
+    """
+    redis: Redis = Redis.from_url(REDIS_URL)
+    try:
+        return await BlockCache.read_stats(redis)
+    finally:
+        await redis.close()
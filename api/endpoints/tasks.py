@@ -3,12 +3,13 @@
 import json
 import os
 import redis
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from celery.result import AsyncResult
 from tasks.analyzer_tasks import analyze_blocks
+from analyzer_transactions.backfill import summarize
 
 # Create API router
 router = APIRouter()
@@ -25,6 +26,20 @@ class TaskRequest(BaseModel):
     data: dict
 
 
+def _backfill_progress(task_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of an analyze_block_range job from its checkpoints in Redis, if any."""
+    try:
+        job = redis_client.hgetall(f"backfill:{task_id}")
+        if not isinstance(job, dict) or not job:
+            return None
+        shards = redis_client.hgetall(f"backfill:{task_id}:shards")
+        chunks = redis_client.hgetall(f"backfill:{task_id}:chunks")
+        return summarize(job, shards, chunks)
+    except Exception:
+        # Progress is optional, the task status is returned without it
+        return None
+
+
 @router.get("/status/{task_id}")
 async def get_task_status(task_id: str) -> Dict[str, Any]:
     """
@@ -39,6 +54,10 @@ async def get_task_status(task_id: str) -> Dict[str, Any]:
                 "task_id": "<task_id>",
                 "status": "processing"
             }
+        - Backfill jobs (analyze_block_range) additionally include
+            "progress": {"blocks_done", "blocks_total", "percent", "swaps",
+                         "blocks_per_second", "shards_by_status", ...}
+          computed from the checkpoints stored in Redis.
         - If successful:
             {
                 "task_id": "<task_id>",
@@ -53,10 +72,10 @@ async def get_task_status(task_id: str) -> Dict[str, Any]:
             }
     """
     task_result = AsyncResult(task_id)
-    
+
     if task_result.ready():
         if task_result.successful():
-            return {
+            response = {
                 "task_id": task_id,
                 "status": "completed",
                 "result": task_result.result
@@ -66,13 +85,18 @@ async def get_task_status(task_id: str) -> Dict[str, Any]:
                 error_msg = str(task_result.get(propagate=False))
             except Exception as e:
                 error_msg = str(e)
-            return {
+            response = {
                 "task_id": task_id,
                 "status": "failed",
                 "error": error_msg
             }
-    
-    return {"task_id": task_id, "status": "processing"}
+    else:
+        response = {"task_id": task_id, "status": "processing"}
+
+    progress = _backfill_progress(task_id)
+    if progress is not None:
+        response["progress"] = progress
+    return response
 
 
 @router.get("/all")
@@ -6,15 +6,30 @@ import os
 # Add the root directory to sys.path to allow absolute imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
-from typing import Dict
+from typing import Dict, AsyncIterator
 
 # Import routers from submodules
 from api.endpoints import analysis, data, tasks
+from analyzer_transactions.db_engine import get_engine, dispose_engines
+from config.settings import DATABASE_URL
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Create the shared database engine on startup and dispose of it on shutdown.
+    """
+    if DATABASE_URL:
+        get_engine(DATABASE_URL)
+    yield
+    await dispose_engines()
+
 
 # Initialize FastAPI app with metadata
-app = FastAPI(title="Transaction Analyzer API")
+app = FastAPI(title="Transaction Analyzer API", lifespan=lifespan)
 
 # Register route groups with prefixes and tags
 app.include_router(analysis.router, prefix="/analyze", tags=["Analysis"])
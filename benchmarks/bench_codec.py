@@ -0,0 +1,87 @@
+# benchmarks/bench_codec.py
+"""Encode/decode time and payload bytes: JSON vs the swapbin codec.
+
+Two payloads are measured on swaps decoded from recorded (BLOCK_FIXTURES_DIR)
+or synthetic blocks:
+
+* Redis values: one ``tx:{hash}`` value per swap, ``_serialize_tx``
+  (deep_serialize + json.dumps) vs ``_encode_tx``;
+* Celery arguments: the DB rows of the whole range as one
+  save_transactions_to_db message, through kombu's json and swapbin serializers.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_codec.py [block_count]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+from typing import Any, Callable, List
+
+from kombu.serialization import dumps, loads
+
+from analyzer_transactions import codec, logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.db_worker import to_tx_rows
+from analyzer_transactions.swap_record import SwapRecord
+from benchmarks.fixtures import build_index, load_raw_blocks
+
+
+def timed(function: Callable[[], Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, count: int, size: int, encode_time: float, decode_time: float) -> None:
+    print(f"  {name:<8} {size / count:8.0f} bytes/swap  encode {encode_time / count * 1e6:6.2f} us/swap  "
+          f"decode {decode_time / count * 1e6:6.2f} us/swap")
+
+
+def run(block_count: int = 50) -> None:
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()
+    codec.register_kombu_serializer()
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    index = build_index()
+    records: List[SwapRecord] = []
+    for raw_block in load_raw_blocks(block_count, wrapped_ratio=0.5):
+        records.extend(SwapRecord.from_tx(tx, index.decode(bytes(tx["input"])))
+                       for tx in analyzer.select_raw_swaps(raw_block))
+    count = len(records)
+    print(f"swaps: {count}")
+
+    print("Redis values:")
+    values = [AnalyzerTransactions._serialize_tx(record)[1] for record in records]
+    report("json", count, sum(len(value.encode()) for value in values),
+           timed(lambda: [AnalyzerTransactions._serialize_tx(record) for record in records]),
+           timed(lambda: [json.loads(value) for value in values]))
+    encoded = [AnalyzerTransactions._encode_tx(record)[1] for record in records]
+    report("swapbin", count, sum(len(value) for value in encoded),
+           timed(lambda: [AnalyzerTransactions._encode_tx(record) for record in records]),
+           timed(lambda: [codec.decode(value) for value in encoded]))
+
+    print("Celery message (save_transactions_to_db arguments):")
+    rows = to_tx_rows(records)
+    message = ((rows,), {}, {})
+    for serializer in ("json", codec.SERIALIZER_NAME):
+        try:
+            content_type, content_encoding, body = dumps(message, serializer=serializer)
+        except Exception as e:
+            # bytes in decoded inputs (e.g. V3 paths) cannot go through JSON
+            print(f"  {serializer:<8} cannot encode the rows: {e.__class__.__name__}: {e}")
+            continue
+        report(serializer, count, len(body),
+               timed(lambda: dumps(message, serializer=serializer)),
+               timed(lambda: loads(body, content_type, content_encoding, accept=[content_type])))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,82 @@
+# benchmarks/bench_decode_executor.py
+"""Decoded swaps per second with the inline, thread-pool and process-pool decode executor.
+
+The fixture is ~100k swap calldatas (half of them wrapped in multicall or
+Universal Router execute). Each block of calldatas is decoded with
+DecodeExecutor.decode_many while a ticker measures how long the event loop
+is blocked (the delay other I/O would see).
+
+Usage:
+    python benchmarks/bench_decode_executor.py [calldata_count] [block_size]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.decode_executor import DecodeExecutor
+from benchmarks.fixtures import build_index, make_swap_calldata
+
+ABIS = [uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi]
+
+
+def make_calldatas(count: int, wrapped_ratio: float = 0.5, seed: int = 3) -> List[bytes]:
+    rng = random.Random(seed)
+    index = build_index()
+    return [make_swap_calldata(index, rng, rng.random() < wrapped_ratio) for _ in range(count)]
+
+
+async def measure(executor: DecodeExecutor, calldatas: List[bytes], block_size: int) -> Tuple[float, float]:
+    """Return (decoded swaps per second, worst event-loop stall in ms)."""
+    await executor.decode_many(calldatas[:block_size])  # Start the pool outside the measurement
+    stall = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal stall
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - before - 0.001)
+
+    tick = asyncio.ensure_future(ticker())
+    started = time.perf_counter()
+    blocks = [calldatas[offset:offset + block_size] for offset in range(0, len(calldatas), block_size)]
+    # A few blocks in flight, as the streaming pipeline has
+    for offset in range(0, len(blocks), 4):
+        await asyncio.gather(*[executor.decode_many(block) for block in blocks[offset:offset + 4]])
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    return len(calldatas) / elapsed, stall * 1000
+
+
+async def run(count: int = 100_000, block_size: int = 250) -> None:
+    logger.remove()
+    calldatas = make_calldatas(count)
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus})
+    variants = [("inline", 1)] + [("thread", workers) for workers in (cpus,)] + \
+               [("process", workers) for workers in worker_counts]
+    print(f"calldatas: {len(calldatas)}, block size: {block_size}, CPUs: {cpus}")
+    for mode, workers in variants:
+        executor = DecodeExecutor(build_index(), mode=mode, workers=workers, batch_size=max(1, block_size // 2),
+                                  abis=ABIS, methods=AnalyzerTransactions.SWAP_METHODS)
+        try:
+            rate, stall = await measure(executor, calldatas, block_size)
+        finally:
+            executor.close()
+        print(f"{mode:<8} workers={workers:<3} {rate:10.0f} swaps/s  worst loop stall {stall:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,86 @@
+# benchmarks/bench_mempool.py
+"""Single-core throughput of the pending-transaction swap detector.
+
+Each synthetic newPendingTransactions notification (full transaction, ~8%
+swaps to known routers) goes through the same steps as in production: JSON
+decoding of the WebSocket frame, the router/selector pre-filter and ABI
+decoding of the swaps. When REDIS_URL is reachable, the pipelined XADD write
+path is measured as well.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_mempool.py [tx_count]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+from redis.asyncio import Redis
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.mempool import PendingSwapStream
+from benchmarks.fixtures import build_index, make_raw_transaction
+
+
+def make_messages(count: int, swap_ratio: float = 0.08) -> List[str]:
+    rng = random.Random(7)
+    index = build_index()
+    messages: List[str] = []
+    for position in range(count):
+        tx = make_raw_transaction(index, rng, 0, position, swap_ratio)
+        tx.update(blockHash=None, blockNumber=None, transactionIndex=None)
+        messages.append(json.dumps({"jsonrpc": "2.0", "method": "eth_subscription",
+                                    "params": {"subscription": "0x1", "result": tx}}))
+    return messages
+
+
+async def measure_writes(stream: PendingSwapStream, redis_url: str) -> None:
+    redis = Redis.from_url(redis_url)
+    try:
+        await redis.ping()
+    except Exception as e:
+        print(f"Redis write path skipped ({e})")
+        return
+    stream.redis = redis
+    stream.stream_key = "bench:swaps:pending"
+    swaps, stream.buffer = stream.buffer, []
+    try:
+        start = time.perf_counter()
+        for offset in range(0, len(swaps), stream.batch_size):
+            stream.buffer = swaps[offset:offset + stream.batch_size]
+            await stream.flush()
+        elapsed = time.perf_counter() - start
+        print(f"redis writes:   {len(swaps) / elapsed:10.0f} swaps/s ({stream.stats['round_trips']} pipelines)")
+    finally:
+        await redis.delete(stream.stream_key)
+        await redis.aclose()
+
+
+def run(tx_count: int = 50_000) -> None:
+    redis_url = os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()  # Per-tx debug logging would dominate the measurement
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    stream = PendingSwapStream(analyzer, None, batch_size=500)
+    messages = make_messages(tx_count)
+
+    start = time.process_time()
+    for message in messages:
+        # What the WebSocket reader does per frame
+        data = json.loads(message)
+        stream.handle(data["params"]["result"])
+    cpu = time.process_time() - start
+
+    print(f"notifications: {tx_count}, swaps: {stream.stats['swaps']}, decode errors: {stream.stats['decode_errors']}")
+    print(f"detect:         {tx_count / cpu:10.0f} tx/s on one core ({cpu / tx_count * 1e6:.1f} us/tx)")
+    asyncio.run(measure_writes(stream, redis_url))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,79 @@
+# benchmarks/bench_nested_decoding.py
+"""CPU time per block of swap decoding: flat index vs recursive wrapper decoding.
+
+Recorded blocks (raw eth_getBlockByNumber results, one JSON file per block) are
+read from BLOCK_FIXTURES_DIR; otherwise mainnet-like blocks are generated where
+most swaps go through multicall / Universal Router execute.
+
+    flat          former index: no multicall/execute entries, nothing expanded
+    nested        multicall/execute decoded recursively, V3 paths split into hops
+    nested+memo   the same with the inner-payload memo (the default)
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_nested_decoding.py [block_count] [wrapped_ratio]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+from typing import List, Dict, Any, Tuple
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.decoder import SelectorIndex
+from benchmarks.fixtures import load_raw_blocks
+
+ABIS = [uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi]
+
+
+def count_swaps(decoded: Dict[str, Any]) -> int:
+    """Swap calls in a decoded transaction, including the wrapped ones."""
+    if decoded is None:
+        return 0
+    nested = decoded.get("calls") or decoded.get("commands")
+    if nested is not None:
+        return sum(count_swaps(item) for item in nested)
+    name = decoded.get("method") or decoded.get("command", "")
+    return int("SWAP" in name or "swap" in name or name.startswith("exact"))
+
+
+def measure(index: SelectorIndex, inputs: List[str]) -> Tuple[float, int]:
+    start = time.process_time()
+    decoded = [index.decode(calldata) if index.matches_hex(calldata) else None for calldata in inputs]
+    elapsed = time.process_time() - start
+    return elapsed, sum(count_swaps(item) for item in decoded)
+
+
+def run(block_count: int = 50, wrapped_ratio: float = 0.6) -> None:
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    raw_blocks = load_raw_blocks(block_count, wrapped_ratio=wrapped_ratio)
+    # Router-filtered inputs, as select_raw_swaps sees them
+    inputs = [tx["input"] for block in raw_blocks for tx in block["transactions"]
+              if tx.get("to") and analyzer.routers.allows(tx["to"])]
+
+    flat = SelectorIndex(ABIS, [name for name in AnalyzerTransactions.SWAP_METHODS if name not in ("multicall", "execute")])
+    flat._expanders.clear()
+    variants = [
+        ("flat", flat),
+        ("nested", SelectorIndex(ABIS, AnalyzerTransactions.SWAP_METHODS, memo_size=0)),
+        ("nested+memo", SelectorIndex(ABIS, AnalyzerTransactions.SWAP_METHODS)),
+    ]
+    print(f"blocks: {len(raw_blocks)}, router transactions: {len(inputs)}, wrapped ratio: {wrapped_ratio}")
+    baseline = None
+    for name, index in variants:
+        elapsed, swaps = measure(index, inputs)
+        baseline = baseline or elapsed
+        print(f"{name:<12} {elapsed / len(raw_blocks) * 1e3:8.3f} ms CPU/block  "
+              f"{elapsed / max(1, len(inputs)) * 1e6:7.2f} us/tx  {elapsed / baseline:5.2f}x  "
+              f"swaps decoded: {swaps} ({elapsed / max(1, swaps) * 1e6:6.2f} us/swap)  "
+              f"memo hits: {index.stats['memo_hits']}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50, float(sys.argv[2]) if len(sys.argv) > 2 else 0.6)
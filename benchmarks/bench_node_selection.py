@@ -0,0 +1,104 @@
+# benchmarks/bench_node_selection.py
+"""Block request latency with first-fit, scored and hedged node selection.
+
+Three local stub nodes: a slow one (listed first, so first-fit always picks
+it) and two fast ones with a latency spike every 20th request.
+Every request goes through ScheduledRpcClient and NodeRateLimiter.acquire
+(quotas are unlimited, so only the selection differs):
+
+    first-fit  nodes tried in config order (the former behaviour)
+    scored     nodes ranked by EWMA latency, error rate and head lag
+    hedged     scored, plus a second request after the p95 of the chosen node
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_node_selection.py [requests] [concurrency]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests")))
+
+import asyncio
+import statistics
+import time
+from typing import List, Dict, Iterable
+
+from analyzer_transactions import logger
+from analyzer_transactions.node_limiter import NodeRateLimiter
+from analyzer_transactions.rpc_client import ScheduledRpcClient
+from stub_rpc_server import StubRpcServer
+
+
+class FirstFitLimiter(NodeRateLimiter):
+    """Config order, as before the nodes were ranked."""
+
+    def ranked(self, config: List[Dict], exclude: Iterable[str] = ()) -> List[Dict]:
+        excluded = set(exclude)
+        return [node for node in config if node["url"] not in excluded]
+
+
+async def measure(limiter: NodeRateLimiter, hedge: bool, requests: int, concurrency: int) -> Dict[str, float]:
+    client = ScheduledRpcClient(limiter, hedge=hedge)
+    latencies: List[float] = []
+    numbers = iter(range(requests))
+
+    async def worker() -> None:
+        for number in numbers:
+            started = time.perf_counter()
+            await client.call("eth_getBlockByNumber", [hex(900 + number % 100), True])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    finally:
+        await client.close()
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "p50": statistics.median(ordered) * 1000,
+        "p95": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "p99": ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+        "throughput": requests / elapsed,
+        "hedged": client.stats["hedged"],
+        "hedge_wins": client.stats["hedge_wins"],
+    }
+
+
+async def run(requests: int = 1000, concurrency: int = 8) -> None:
+    redis_url = os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()
+    nodes = [
+        StubRpcServer(latency=0.060),
+        StubRpcServer(latency=0.005, tail_latency=0.200, tail_every=20),
+        StubRpcServer(latency=0.008, tail_latency=0.200, tail_every=20),
+    ]
+    urls = [await node.start() for node in nodes]
+    try:
+        setup = NodeRateLimiter(redis_url)
+        try:
+            await setup.initialize_nodes([{"url": url, "per_second": 0, "per_day": 0} for url in urls])
+        finally:
+            await setup.close()
+
+        for name, limiter_class, hedge in (("first-fit", FirstFitLimiter, False),
+                                           ("scored", NodeRateLimiter, False),
+                                           ("scored + hedged", NodeRateLimiter, True)):
+            limiter = limiter_class(redis_url)
+            try:
+                result = await measure(limiter, hedge, requests, concurrency)
+            finally:
+                await limiter.close()
+            share = {url.split(":")[-1].rstrip("/"): stats["requests"] for url, stats in limiter.stats.items()}
+            print(f"{name:<16} p50={result['p50']:6.1f} ms  p95={result['p95']:6.1f} ms  "
+                  f"p99={result['p99']:6.1f} ms  {result['throughput']:6.0f} req/s  "
+                  f"hedged={result['hedged']} (won {result['hedge_wins']})  requests by port: {share}")
+    finally:
+        for node in nodes:
+            await node.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(*(int(arg) for arg in sys.argv[1:3])))
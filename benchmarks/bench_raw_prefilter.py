@@ -0,0 +1,63 @@
+# benchmarks/bench_raw_prefilter.py
+"""CPU time per block: web3-formatted block vs raw JSON pre-filter.
+
+Recorded blocks (raw eth_getBlockByNumber results, one JSON file per block) are
+read from BLOCK_FIXTURES_DIR; synthetic mainnet-like blocks are generated otherwise.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_raw_prefilter.py [block_count]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+from typing import List, Dict, Any
+
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from benchmarks.fixtures import load_raw_blocks
+
+
+async def formatted_path(analyzer: AnalyzerTransactions, raw_blocks: List[Dict[str, Any]]) -> List[Any]:
+    swaps: List[Any] = []
+    for raw_block in raw_blocks:
+        block = analyzer._format_block(raw_block)
+        swaps.extend([tx async for tx in analyzer.filter_transactions(block["transactions"])])
+    return swaps
+
+
+def raw_path(analyzer: AnalyzerTransactions, raw_blocks: List[Dict[str, Any]]) -> List[Any]:
+    swaps: List[Any] = []
+    for raw_block in raw_blocks:
+        swaps.extend(analyzer.select_raw_swaps(raw_block))
+    return swaps
+
+
+def run(block_count: int = 50) -> None:
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()  # Per-tx debug logging would dominate the measurement
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    raw_blocks = load_raw_blocks(block_count)
+    tx_count = sum(len(block["transactions"]) for block in raw_blocks)
+
+    start = time.process_time()
+    formatted = asyncio.run(formatted_path(analyzer, raw_blocks))
+    formatted_time = time.process_time() - start
+
+    start = time.process_time()
+    raw = raw_path(analyzer, raw_blocks)
+    raw_time = time.process_time() - start
+
+    assert [tx["hash"] for tx in formatted] == [tx["hash"] for tx in raw], "paths disagree"
+    print(f"blocks: {len(raw_blocks)}, transactions: {tx_count}, swaps: {len(raw)}")
+    print(f"web3-formatted: {formatted_time / len(raw_blocks) * 1e3:8.3f} ms CPU/block")
+    print(f"raw pre-filter: {raw_time / len(raw_blocks) * 1e3:8.3f} ms CPU/block")
+    print(f"speedup:        {formatted_time / raw_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
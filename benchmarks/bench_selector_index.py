@@ -0,0 +1,88 @@
+# benchmarks/bench_selector_index.py
+"""Per-transaction cost of swap detection + decoding: linear hex scan vs selector index.
+
+Usage:
+    python benchmarks/bench_selector_index.py [tx_count]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+from typing import List, Dict, Any, Optional
+from eth_abi import decode
+
+from benchmarks.fixtures import build_index, make_transactions
+
+
+def legacy_signatures(index) -> List[Dict[str, Any]]:
+    """Signature list in the format of the former SIGNATURES_SWAP."""
+    return [
+        {"signature": "0x" + selector.hex(), "types": entry.input_types, "abi_item": entry.abi_item}
+        for selector, entry in index.entries.items()
+    ]
+
+
+def legacy_process(tx: Dict[str, Any], signatures: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Former flow: hex round-trip, linear detect, then a second linear scan to decode."""
+    input_tx = "0x" + tx["input"].hex() if tx.get("input") else "0x"
+    if input_tx == "0x" or len(input_tx) < 10:
+        return None
+    if not any(item["signature"] == input_tx[:10] for item in signatures):
+        return None
+    for item in signatures:
+        if item["signature"] == input_tx[:10]:
+            values = decode(item["types"], bytes.fromhex(input_tx[10:]))
+            names = [param["name"] for param in item["abi_item"]["inputs"]]
+            return {"method": item["abi_item"]["name"], "params": dict(zip(names, values))}
+    return None
+
+
+def indexed_process(tx: Dict[str, Any], index) -> Optional[Dict[str, Any]]:
+    """Current flow: one dict lookup on the raw selector, prebuilt decoder."""
+    input_tx = tx.get("input") or b""
+    if input_tx[:4] not in index:
+        return None
+    return index.decode(input_tx)
+
+
+def run(tx_count: int = 50_000) -> None:
+    index = build_index()
+    signatures = legacy_signatures(index)
+    txs = make_transactions(tx_count)
+
+    start = time.perf_counter()
+    legacy = [legacy_process(tx, signatures) for tx in txs]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [indexed_process(tx, index) for tx in txs]
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tx in txs:
+        input_tx = "0x" + tx["input"].hex() if tx.get("input") else "0x"
+        len(input_tx) >= 10 and any(item["signature"] == input_tx[:10] for item in signatures)
+    legacy_detect = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tx in txs:
+        (tx.get("input") or b"")[:4] in index
+    indexed_detect = time.perf_counter() - start
+
+    # The index additionally expands V3 paths into hops
+    flat = [item and {"method": item["method"], "params": item["params"]} for item in indexed]
+    assert legacy == flat, "decoders disagree"
+    swaps = sum(1 for item in indexed if item)
+    print(f"transactions: {tx_count}, swaps: {swaps}")
+    print(f"linear scan:    {legacy_time / tx_count * 1e6:8.2f} us/tx")
+    print(f"selector index: {indexed_time / tx_count * 1e6:8.2f} us/tx")
+    print(f"speedup:        {legacy_time / indexed_time:8.2f}x")
+    print(f"detect only, linear scan:    {legacy_detect / tx_count * 1e6:8.2f} us/tx")
+    print(f"detect only, selector index: {indexed_detect / tx_count * 1e6:8.2f} us/tx")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
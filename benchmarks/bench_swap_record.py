@@ -0,0 +1,89 @@
+# benchmarks/bench_swap_record.py
+"""Bytes per swap and serialization time: full tx dict copies vs SwapRecord / SwapBatch.
+
+Swaps are selected from recorded (BLOCK_FIXTURES_DIR) or synthetic blocks and
+decoded once; the decoded inputs are shared by all variants, so the memory
+figures only count what each representation adds on top of them.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_swap_record.py [block_count]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pickle
+import time
+from typing import List, Dict, Any, Callable, Set
+
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.db_worker import to_tx_rows
+from analyzer_transactions.swap_record import SwapRecord, SwapBatch
+from benchmarks.fixtures import build_index, load_raw_blocks
+
+
+def deep_size(obj: Any, skip: Set[int], seen: Set[int]) -> int:
+    """Size of an object graph, without the objects in ``skip`` and counting shared objects once."""
+    if id(obj) in skip or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, skip, seen) + deep_size(value, skip, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, skip, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name, None), skip, seen) for name in obj.__slots__)
+    return size
+
+
+def timed(function: Callable[[], Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(block_count: int = 50) -> None:
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    index = build_index()
+    txs: List[Dict[str, Any]] = []
+    for raw_block in load_raw_blocks(block_count):
+        txs.extend(analyzer.select_raw_swaps(raw_block))
+    decoded = [index.decode(bytes(tx["input"])) for tx in txs]
+    shared = {id(item) for item in decoded}
+    count = len(txs)
+
+    dicts = [dict(tx, decoded_input=item) for tx, item in zip(txs, decoded)]
+    records = [SwapRecord.from_tx(tx, item) for tx, item in zip(txs, decoded)]
+    batch = SwapBatch.from_records(records)
+
+    print(f"swaps: {count}")
+    print("bytes per swap (in memory, decoded inputs excluded):")
+    for name, value in (("tx dict copies", dicts), ("SwapRecord", records), ("SwapBatch", batch)):
+        print(f"  {name:<15} {deep_size(value, shared, set()) / count:8.0f}")
+    print("bytes per swap (serialized):")
+    for name, value in (("tx dict copies", dicts), ("SwapRecord", records)):
+        payload = sum(len(AnalyzerTransactions._serialize_tx(tx)[1]) for tx in value)
+        print(f"  {name:<15} JSON {payload / count:8.0f}  pickle {len(pickle.dumps(value)) / count:8.0f}")
+
+    print("time per swap (us):")
+    for name, value in (("tx dict copies", dicts), ("SwapRecord", records)):
+        build = timed(lambda: [dict(tx, decoded_input=item) for tx, item in zip(txs, decoded)]) if value is dicts \
+            else timed(lambda: [SwapRecord.from_tx(tx, item) for tx, item in zip(txs, decoded)])
+        redis_json = timed(lambda: [AnalyzerTransactions._serialize_tx(tx) for tx in value])
+        rows = timed(lambda: to_tx_rows(value))
+        pickled = timed(lambda: pickle.loads(pickle.dumps(value)))
+        print(f"  {name:<15} build {build / count * 1e6:6.2f}  redis json {redis_json / count * 1e6:6.2f}  "
+              f"db rows {rows / count * 1e6:6.2f}  pickle round trip {pickled / count * 1e6:6.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
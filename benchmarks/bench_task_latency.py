@@ -0,0 +1,93 @@
+# benchmarks/bench_task_latency.py
+"""Latency of back-to-back analyze_blocks(depth_blocks=3) runs.
+
+Compares the former task body (a new event loop per task, analyzer, HTTP session
+and Redis pool created and torn down every time) with the persistent per-process
+runtime that keeps them open between tasks. The node is the local stub JSON-RPC
+server from tests/ with a fixed per-request latency.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_task_latency.py [runs] [latency_ms]
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests")))
+
+import asyncio
+import statistics
+import time
+from typing import List
+
+from analyzer_transactions import logger
+from analyzer_transactions.analyzer import analyzer_main
+from analyzer_transactions.node_limiter import NodeRateLimiter
+from stub_rpc_server import StubRpcServer
+from tasks.runtime import AsyncRuntime
+
+
+def report(name: str, timings: List[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[max(0, int(len(timings_ms) * 0.95) - 1)]
+    print(f"{name:<22} first={timings[0] * 1000:8.1f} ms  "
+          f"median={statistics.median(timings_ms):8.1f} ms  p95={p95:8.1f} ms")
+
+
+def run(runs: int = 20, latency: float = 0.005) -> None:
+    redis_url = os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    logger.remove()  # Per-tx debug logging would dominate the measurement
+
+    # The stub node lives on its own loop so that both variants can reach it
+    node_runtime = AsyncRuntime()
+    stub = StubRpcServer(head=20_000_000, latency=latency)
+    node_url = node_runtime.run(stub.start())
+
+    async def configure_nodes() -> None:
+        limiter = NodeRateLimiter(redis_url)
+        try:
+            await limiter.initialize_nodes([{"url": node_url, "per_second": 1_000_000, "per_day": 1_000_000_000}])
+        finally:
+            await limiter.close()
+
+    asyncio.run(configure_nodes())
+
+    try:
+        # Former task body: new loop and clients per task
+        per_task: List[float] = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(analyzer_main(3, redis_url))
+            finally:
+                loop.close()
+            per_task.append(time.perf_counter() - start)
+
+        # Persistent runtime: loop and clients reused between tasks
+        runtime = AsyncRuntime()
+        persistent: List[float] = []
+        try:
+            for _ in range(runs):
+                start = time.perf_counter()
+                runtime.run(analyzer_main(3, redis_url, shared=True))
+                persistent.append(time.perf_counter() - start)
+        finally:
+            runtime.stop()
+    finally:
+        node_runtime.run(stub.stop())
+        node_runtime.stop()
+
+    print(f"{runs} back-to-back runs, depth_blocks=3, node latency {latency * 1000:.1f} ms")
+    report("new loop per task", per_task)
+    report("persistent runtime", persistent)
+    print(f"Median speedup: {statistics.median(per_task) / statistics.median(persistent):.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005,
+    )
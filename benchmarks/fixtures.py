@@ -0,0 +1,241 @@
+# benchmarks/fixtures.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import glob
+import json
+import random
+from typing import List, Dict, Any, Optional
+from eth_abi import encode
+from web3.types import HexBytes
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.decoder import SelectorIndex
+
+ROUTER_V2: str = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+ROUTER_V3: str = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
+ROUTER_V3_02: str = "0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45"
+UNIVERSAL_ROUTER: str = "0x3fC91A3afd70395Cd496C647d5a6CC9D4B2b7FAD"
+# Universal Router recipient constants (ActionConstants.sol)
+MSG_SENDER: str = "0x0000000000000000000000000000000000000001"
+ADDRESS_THIS: str = "0x0000000000000000000000000000000000000002"
+WRAPPERS = ("multicall", "execute")
+
+
+def build_index() -> SelectorIndex:
+    """Selector index with the analyzer's default ABIs and swap methods."""
+    return SelectorIndex(
+        [uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi],
+        AnalyzerTransactions.SWAP_METHODS,
+    )
+
+
+def _address(rng: random.Random) -> str:
+    return "0x" + rng.randbytes(20).hex()
+
+
+def make_v3_path(rng: random.Random, hops: int = 1) -> bytes:
+    """Packed V3 path with random tokens and common fee tiers."""
+    path = rng.randbytes(20)
+    for _ in range(hops):
+        path += rng.choice((500, 3000, 10000)).to_bytes(3, "big") + rng.randbytes(20)
+    return path
+
+
+def _value(input_type: str, rng: random.Random) -> Any:
+    if input_type.startswith("("):
+        return tuple(_value(component, rng) for component in input_type[1:-1].split(","))
+    if input_type == "bytes":
+        return make_v3_path(rng, rng.randint(1, 2))
+    if input_type == "address[]":
+        return [_address(rng) for _ in range(rng.randint(2, 4))]
+    if input_type == "address":
+        return _address(rng)
+    if input_type == "uint24":
+        return 3000
+    if input_type == "uint160":
+        return 0
+    return rng.getrandbits(64)
+
+
+def make_swap_calldata(index: SelectorIndex, rng: random.Random, wrapped: bool = False) -> bytes:
+    """Encode calldata for a random swap method from the index.
+
+    With ``wrapped`` the swap is sent the way most router traffic is: a
+    SwapRouter02 ``multicall`` or a Universal Router ``execute`` with the
+    usual WRAP_ETH / UNWRAP_WETH / SWEEP companions.
+    """
+    entries = [(selector, entry) for selector, entry in index.entries.items() if entry.name not in WRAPPERS]
+    if wrapped and rng.random() < 0.5:
+        return make_multicall_calldata(index, rng, entries)
+    if wrapped:
+        return make_execute_calldata(index, rng)
+    selector, entry = rng.choice(entries)
+    return selector + encode(entry.input_types, [_value(input_type, rng) for input_type in entry.input_types])
+
+
+def _selector(index: SelectorIndex, name: str, input_types: List[str]) -> bytes:
+    return next(selector for selector, entry in index.entries.items()
+                if entry.name == name and entry.input_types == input_types)
+
+
+def make_multicall_calldata(index: SelectorIndex, rng: random.Random, entries: List[Any]) -> bytes:
+    """SwapRouter02 multicall(deadline, data): a swap, then unwrapWETH9/refundETH-like tails."""
+    selector, entry = rng.choice(entries)
+    calls = [selector + encode(entry.input_types, [_value(input_type, rng) for input_type in entry.input_types])]
+    # Router calls outside the index (unwrapWETH9(uint256,address), refundETH()) repeat across transactions
+    calls.append(bytes.fromhex("49404b7c") + encode(["uint256", "address"], [0, MSG_SENDER]))
+    if rng.random() < 0.5:
+        calls.append(bytes.fromhex("12210e8a"))
+    return _selector(index, "multicall", ["uint256", "bytes[]"]) + encode(
+        ["uint256", "bytes[]"], [1_700_000_000 + rng.randint(0, 3600), calls])
+
+
+def make_execute_calldata(index: SelectorIndex, rng: random.Random) -> bytes:
+    """Universal Router execute(commands, inputs, deadline) with a V2 or V3 swap."""
+    commands = b""
+    inputs: List[bytes] = []
+    if rng.random() < 0.4:
+        commands += bytes((0x0B,))  # WRAP_ETH
+        inputs.append(encode(["address", "uint256"], [ADDRESS_THIS, rng.getrandbits(60)]))
+    if rng.random() < 0.6:
+        commands += bytes((0x00,))  # V3_SWAP_EXACT_IN
+        inputs.append(encode(["address", "uint256", "uint256", "bytes", "bool"],
+                             [MSG_SENDER, rng.getrandbits(64), rng.getrandbits(64), make_v3_path(rng, rng.randint(1, 2)), True]))
+    else:
+        commands += bytes((0x08,))  # V2_SWAP_EXACT_IN
+        inputs.append(encode(["address", "uint256", "uint256", "address[]", "bool"],
+                             [MSG_SENDER, rng.getrandbits(64), rng.getrandbits(64), [_address(rng), _address(rng)], True]))
+    if rng.random() < 0.3:
+        commands += bytes((0x0C,))  # UNWRAP_WETH
+        inputs.append(encode(["address", "uint256"], [MSG_SENDER, 0]))
+    return _selector(index, "execute", ["bytes", "bytes[]", "uint256"]) + encode(
+        ["bytes", "bytes[]", "uint256"], [commands, inputs, 1_700_000_000 + rng.randint(0, 3600)])
+
+
+def make_other_calldata(rng: random.Random) -> bytes:
+    """Calldata of a non-swap call (e.g. ERC-20 transfer) or an empty input."""
+    if rng.random() < 0.3:
+        return b""
+    return bytes.fromhex("a9059cbb") + encode(["address", "uint256"], [_address(rng), rng.getrandbits(64)])
+
+
+def make_transactions(count: int, swap_ratio: float = 0.08, seed: int = 1) -> List[Dict[str, Any]]:
+    """Generate web3-formatted transactions with the given share of swaps."""
+    rng = random.Random(seed)
+    index = build_index()
+    txs: List[Dict[str, Any]] = []
+    for i in range(count):
+        is_swap = rng.random() < swap_ratio
+        txs.append({
+            "hash": HexBytes(rng.randbytes(32)),
+            "blockNumber": 22_000_000 + i // 200,
+            "transactionIndex": i % 200,
+            "from": _address(rng),
+            "to": rng.choice([ROUTER_V2, ROUTER_V3]) if is_swap else _address(rng),
+            "input": HexBytes(make_swap_calldata(index, rng) if is_swap else make_other_calldata(rng)),
+        })
+    return txs
+
+
+def _router(index: SelectorIndex, calldata: bytes, rng: random.Random) -> str:
+    """Router a swap with this calldata is sent to."""
+    name = index.get(calldata).name
+    if name == "execute":
+        return UNIVERSAL_ROUTER
+    if name == "multicall":
+        return ROUTER_V3_02
+    return rng.choice([ROUTER_V2, ROUTER_V3])
+
+
+def make_raw_transaction(index: SelectorIndex, rng: random.Random, number: int, position: int,
+                         swap_ratio: float, wrapped_ratio: float = 0.0) -> Dict[str, Any]:
+    """Generate a raw JSON-RPC transaction (EIP-1559) as returned by eth_getBlockByNumber.
+
+    ``wrapped_ratio`` of the swaps go through multicall / Universal Router execute.
+    """
+    is_swap = rng.random() < swap_ratio
+    wrapped = is_swap and rng.random() < wrapped_ratio
+    calldata = make_swap_calldata(index, rng, wrapped) if is_swap else make_other_calldata(rng)
+    return {
+        "accessList": [{"address": _address(rng), "storageKeys": ["0x" + rng.randbytes(32).hex()]}]
+        if rng.random() < 0.2 else [],
+        "blockHash": "0x" + rng.randbytes(32).hex(),
+        "blockNumber": hex(number),
+        "chainId": "0x1",
+        "from": _address(rng),
+        "gas": hex(rng.randint(21_000, 500_000)),
+        "gasPrice": hex(rng.getrandbits(36)),
+        "hash": "0x" + rng.randbytes(32).hex(),
+        "input": "0x" + calldata.hex(),
+        "maxFeePerGas": hex(rng.getrandbits(36)),
+        "maxPriorityFeePerGas": hex(rng.getrandbits(30)),
+        "nonce": hex(rng.getrandbits(16)),
+        "r": "0x" + rng.randbytes(32).hex(),
+        "s": "0x" + rng.randbytes(32).hex(),
+        "to": (_router(index, calldata, rng) if is_swap else _address(rng)).lower(),
+        "transactionIndex": hex(position),
+        "type": "0x2",
+        "v": "0x1",
+        "value": hex(rng.getrandbits(60)),
+        "yParity": "0x1",
+    }
+
+
+def make_raw_block(number: int, tx_count: int = 200, swap_ratio: float = 0.08, seed: Optional[int] = None,
+                   wrapped_ratio: float = 0.0) -> Dict[str, Any]:
+    """Generate a raw JSON-RPC block with full transactions."""
+    rng = random.Random(number if seed is None else seed)
+    index = build_index()
+    return {
+        "baseFeePerGas": hex(rng.getrandbits(34)),
+        "difficulty": "0x0",
+        "extraData": "0x",
+        "gasLimit": hex(30_000_000),
+        "gasUsed": hex(rng.randint(10_000_000, 30_000_000)),
+        "hash": "0x" + rng.randbytes(32).hex(),
+        "logsBloom": "0x" + rng.randbytes(256).hex(),
+        "miner": _address(rng),
+        "mixHash": "0x" + rng.randbytes(32).hex(),
+        "nonce": "0x0000000000000000",
+        "number": hex(number),
+        "parentHash": "0x" + rng.randbytes(32).hex(),
+        "receiptsRoot": "0x" + rng.randbytes(32).hex(),
+        "sha3Uncles": "0x" + rng.randbytes(32).hex(),
+        "size": hex(rng.randint(50_000, 200_000)),
+        "stateRoot": "0x" + rng.randbytes(32).hex(),
+        "timestamp": hex(1_700_000_000 + number * 12),
+        "transactions": [make_raw_transaction(index, rng, number, i, swap_ratio, wrapped_ratio) for i in range(tx_count)],
+        "transactionsRoot": "0x" + rng.randbytes(32).hex(),
+        "uncles": [],
+        "withdrawals": [],
+        "withdrawalsRoot": "0x" + rng.randbytes(32).hex(),
+    }
+
+
+def load_raw_blocks(count: int = 50, fixtures_dir: Optional[str] = None, wrapped_ratio: float = 0.0) -> List[Dict[str, Any]]:
+    """Load recorded raw blocks (JSON files with eth_getBlockByNumber results) or generate them.
+
+    Args:
+        count: Number of blocks to return.
+        fixtures_dir: Directory with recorded ``*.json`` blocks; defaults to BLOCK_FIXTURES_DIR.
+        wrapped_ratio: Share of wrapped swaps in generated blocks.
+
+    Returns:
+        List of raw JSON-RPC blocks.
+    """
+    fixtures_dir = fixtures_dir or os.getenv("BLOCK_FIXTURES_DIR")
+    if fixtures_dir:
+        blocks: List[Dict[str, Any]] = []
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.json")))[:count]:
+            with open(path, "r") as f:
+                data = json.load(f)
+            blocks.append(data.get("result", data))
+        if blocks:
+            return blocks
+    return [make_raw_block(22_000_000 + i, tx_count=random.Random(i).randint(150, 400), wrapped_ratio=wrapped_ratio)
+            for i in range(count)]
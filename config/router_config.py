@@ -0,0 +1,23 @@
+# config/router_config.py
+
+from typing import List, Dict
+
+# Known DEX router deployments on Ethereum mainnet whose calls the selector index
+# decodes, grouped by the ABI family in abis/ they belong to. Transactions to
+# other addresses are rejected before the selector lookup when the router filter
+# is enabled (ROUTER_FILTER=1). Routers without an ABI in the index are not
+# listed: none of their transactions could be decoded.
+known_routers: List[Dict[str, str]] = [
+    # uniswap_v2_router_abi / uniswap_v2_factory_abi
+    {"name": "Uniswap V2 Router02", "address": "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"},
+    # sushiswap_factory_abi
+    {"name": "SushiSwap Router", "address": "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"},
+    # pancakeswap_factory_abi
+    {"name": "PancakeSwap V2 Router (Ethereum)", "address": "0xEfF92A263d31888d860bD50809A8D171709b7b1c"},
+    # uniswap_v3_router_abi / uniswap_v3_factory_abi
+    {"name": "Uniswap V3 SwapRouter", "address": "0xE592427A0AEce92De3Edee1F18E0157C05861564"},
+    {"name": "Uniswap V3 SwapRouter02", "address": "0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45"},
+    # uniswap_universal_router_abi
+    {"name": "Uniswap Universal Router", "address": "0x3fC91A3afd70395Cd496C647d5a6CC9D4B2b7FAD"},
+    {"name": "Uniswap Universal Router V2", "address": "0x66a9893cC07D91D95644AEDD05D03f95e1dBA8Af"},
+]
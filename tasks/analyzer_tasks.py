@@ -1,14 +1,18 @@
 # tasks/analyzer_tasks.py
 import sys
 import os
+import uuid
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from celery import Celery, shared_task
+from celery import Celery, shared_task, chord
 from analyzer_transactions.analyzer import AnalyzerTransactions, analyzer_main, analyzer_slice_main
-from analyzer_transactions.db_worker import DatabaseWorker
+from analyzer_transactions.tip_follower import follower_main
+from analyzer_transactions.mempool import mempool_main
+from analyzer_transactions.db_worker import DatabaseWorker, to_tx_rows
+from analyzer_transactions.backfill import BackfillProgress, split_range, shard_id
+from analyzer_transactions.staging import SwapStaging, StagedRowsMissingError, staging_key
 from config.settings import REDIS_URL
-from redis.asyncio import Redis
-import asyncio
-from typing import Dict, Any
+from tasks.runtime import runtime
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 
 
@@ -16,144 +20,267 @@ from loguru import logger
 app = Celery('analyzer', broker=REDIS_URL, backend=REDIS_URL)
 app.config_from_object('tasks.celery_config')
 
+POSTGRES_DB = os.getenv("POSTGRES_DB", "analyser")
+POSTGRES_TABLE_SWAP = os.getenv("POSTGRES_TABLE_SWAP", "swap_txs")
+POSTGRES_COLUMNS_SWAP = [
+    ("id", "SERIAL PRIMARY KEY"),
+    ("tx_hash", "VARCHAR UNIQUE"),
+    ("block_number", "BIGINT"),
+    ("decoded_input", "JSONB")
+]
+POSTGRES_INDEXES_SWAP = [
+    {"name": "idx_tx_hash", "column": "tx_hash"},
+    {"name": "idx_block_number", "column": "block_number"}
+]
+
+# Диапазоны длиннее BACKFILL_SHARD_SIZE блоков делятся на шарды и обрабатываются параллельно
+BACKFILL_SHARD_SIZE = int(os.getenv("BACKFILL_SHARD_SIZE", 1000))
+BACKFILL_SHARD_RETRIES = int(os.getenv("BACKFILL_SHARD_RETRIES", 5))
+# Размер порции блоков между контрольными точками
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", 100))
+
+
+async def _ensure_swap_table(create_database: bool = False) -> None:
+    """Проверяем и создаём базу данных и таблицу."""
+    db_worker = DatabaseWorker()
+    if create_database:
+        await db_worker.create_database(POSTGRES_DB)
+    await db_worker.check_and_create_table(
+        POSTGRES_TABLE_SWAP,
+        columns=POSTGRES_COLUMNS_SWAP,
+        indexes=POSTGRES_INDEXES_SWAP
+    )
+
+
+async def _save_transactions(tx_data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    db_worker = DatabaseWorker()
+    return await db_worker.save_transactions(await runtime.redis(), tx_data_list)
+
+
+async def _save_staged_transactions(key: str, expected: Optional[int] = None) -> Dict[str, Any]:
+    """Сохраняем строки из staging-списка порциями и удаляем список после записи всех порций.
+
+    expected: число строк, записанных задачей анализа. Если в списке их меньше
+    (истёк STAGING_TTL или вытеснен), список не удаляется и задача падает.
+    """
+    redis = await runtime.redis()
+    staging = SwapStaging(redis)
+    db_worker = DatabaseWorker()
+    totals: Dict[str, Any] = {"provided": 0, "inserted": 0, "skipped": 0, "elapsed": 0.0, "batches": 0}
+    async for rows in staging.batches(key):
+        stats = await db_worker.save_transactions(redis, rows)
+        for name in ("provided", "inserted", "skipped", "elapsed"):
+            totals[name] += stats[name]
+        totals["batches"] += 1
+    if expected is not None and totals["provided"] != expected:
+        raise StagedRowsMissingError(
+            f"Staging list {key} returned {totals['provided']} of {expected} rows")
+    # При ошибке список остаётся для повтора; повторная вставка отсекается ON CONFLICT
+    await staging.delete(key)
+    totals["elapsed"] = round(totals["elapsed"], 4)
+    totals["rows_per_sec"] = round(totals["provided"] / totals["elapsed"], 1) if totals["elapsed"] > 0 else 0.0
+    return totals
+
+
+async def _stage_transactions(depth_blocks: int, key: str) -> int:
+    """Анализируем блоки, складывая строки каждой порции в staging-список Redis."""
+    staging = SwapStaging(await runtime.redis())
+    # Повтор задачи начинает список заново
+    await staging.delete(key)
+    count = 0
+
+    async def stage(batch: List[Any]) -> None:
+        nonlocal count
+        count += await staging.append(key, to_tx_rows(batch))
+
+    await analyzer_main(depth_blocks, on_batch=stage, shared=True)
+    return count
+
+
 @shared_task(bind=True, max_retries=3)
-def save_transactions_to_db(self, tx_data_list: list[dict]):
-    """Асинхронное сохранение транзакций в базу данных."""
+def save_transactions_to_db(self, staged: Dict[str, Any]):
+    """Асинхронное сохранение транзакций в базу данных.
+
+    staged: ссылка {"key": ..., "count": ...} на строки в Redis (см. SwapStaging);
+    список строк принимается для сообщений, поставленных до перехода на ссылки.
+    """
     try:
-        # Создаём новый событийный цикл для задачи
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        db_worker = DatabaseWorker()
-        redis = Redis.from_url(REDIS_URL)
-        loop.run_until_complete(db_worker.save_transactions(redis, tx_data_list))
-        logger.info(f"Saved {len(tx_data_list)} transactions to database via save_transactions_to_db")
+        if isinstance(staged, list):
+            stats = runtime.run(_save_transactions(staged))
+        else:
+            stats = runtime.run(_save_staged_transactions(staged["key"], staged.get("count")))
+        logger.info(f"save_transactions_to_db: {stats}")
+        return stats
     except Exception as exc:
         logger.error(f"Error saving transactions: {exc}")
         raise self.retry(exc=exc, countdown=60)
-    finally:
-        if not loop.is_closed():
-            loop.close()
 
 @shared_task(bind=True, max_retries=3)
 def analyze_blocks(self, depth_blocks: int = 3) -> Dict[str, Any]:
-    """Анализ последних блоков с асинхронным сохранением транзакций."""
+    """Анализ последних блоков с асинхронным сохранением транзакций.
+
+    Строки передаются задаче сохранения через Redis: в брокер и в результат
+    попадают только ключ и количество, а не сами транзакции и их хэши.
+    """
     try:
-        # Создаём новый событийный цикл
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Выполняем анализ транзакций
-        transactions = loop.run_until_complete(analyzer_main(depth_blocks))
-        
-        # Извлекаем хэши и данные транзакций
-        tx_data_list = [
-            {
-                "tx_hash": "0x" + tx["hash"].hex() if isinstance(tx["hash"], bytes) else tx["hash"],
-                "block_number": tx.get("blockNumber"),
-                "decoded_input": tx.get("decoded_input")
-            }
-            for tx in transactions if isinstance(tx, dict) and "hash" in tx
-        ]
-        
-        # Проверяем и создаём таблицу
-        db_worker = DatabaseWorker()
-        POSTGRES_DB = os.getenv("POSTGRES_DB", "analyser")
-
-        loop.run_until_complete(db_worker.create_database(
-                                                        POSTGRES_DB,
-                                                    ))
-        POSTGRES_TABLE_SWAP = os.getenv("POSTGRES_TABLE_SWAP", "swap_txs")
-        POSTGRES_COLUMNS_SWAP = [
-            ("id", "SERIAL PRIMARY KEY"),
-            ("tx_hash", "VARCHAR UNIQUE"),
-            ("block_number", "BIGINT"),
-            ("decoded_input", "JSONB")
-        ]
-        POSTGRES_INDEXES_SWAP = [
-            {"name": "idx_tx_hash", "column": "tx_hash"},
-            {"name": "idx_block_number", "column": "block_number"}
-        ]
-
-        loop.run_until_complete(db_worker.check_and_create_table(
-            POSTGRES_TABLE_SWAP,
-            columns=POSTGRES_COLUMNS_SWAP,
-            indexes=POSTGRES_INDEXES_SWAP
-        ))
+        # Выполняем анализ транзакций на общем событийном цикле процесса
+        key = staging_key(self.request.id)
+        count = runtime.run(_stage_transactions(depth_blocks, key))
+
+        runtime.run(_ensure_swap_table(create_database=True))
 
         # Запускаем асинхронное сохранение транзакций
-        save_task = save_transactions_to_db.delay(tx_data_list)
-        
-        # Возвращаем хэши транзакций и ID задачи сохранения
-        tx_hashes = [tx["tx_hash"] for tx in tx_data_list]
+        save_task = save_transactions_to_db.delay({"key": key, "count": count})
+
         return {
             "status": "completed",
-            "tx_hashes": tx_hashes,
-            "count": len(tx_hashes),
+            "count": count,
+            "staging_key": key,
             "save_task_id": save_task.id
         }
     except Exception as exc:
         logger.error(f"Error in analyze_blocks: {exc}")
         raise self.retry(exc=exc, countdown=60)
-    finally:
-        if not loop.is_closed():
-            loop.close()
 
 @shared_task(bind=True, max_retries=3)
 def analyze_block_range(self, start_block: int, end_block: int) -> Dict[str, Any]:
-    """Анализ транзакций в диапазоне блоков с сохранением в REDIS."""
+    """Анализ транзакций в диапазоне блоков с сохранением в БД.
+
+    Блоки обрабатываются порциями по BACKFILL_CHUNK_SIZE с контрольными точками
+    в Redis (job_id = ID задачи), поэтому повтор продолжает с последней
+    завершённой порции. Диапазон длиннее BACKFILL_SHARD_SIZE блоков делится на
+    выровненные шарды, которые выполняются группой analyze_block_shard; итог
+    собирает aggregate_block_range.
+    """
+    job_id = self.request.id or uuid.uuid4().hex
     try:
-        # Создаём новый событийный цикл
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Выполняем анализ транзакций
-        transactions = loop.run_until_complete(analyzer_slice_main(start_block, end_block))
-        
-        # Извлекаем хэши и данные транзакций
-        tx_data_list = [
-            {
-                "tx_hash": "0x" + tx["hash"].hex() if isinstance(tx["hash"], bytes) else tx["hash"],
-                "block_number": tx.get("blockNumber"),
-                "decoded_input": tx.get("decoded_input")
-            }
-            for tx in transactions if isinstance(tx, dict) and "hash" in tx
-        ]
-        
-        # Проверяем и создаём таблицу
-        db_worker = DatabaseWorker()
-        POSTGRES_TABLE_SWAP = os.getenv("POSTGRES_TABLE_SWAP", "swap_txs")
-        POSTGRES_COLUMNS_SWAP = [
-            ("id", "SERIAL PRIMARY KEY"),
-            ("tx_hash", "VARCHAR UNIQUE"),
-            ("block_number", "BIGINT"),
-            ("decoded_input", "JSONB")
-        ]
-        POSTGRES_INDEXES_SWAP = [
-            {"name": "idx_tx_hash", "column": "tx_hash"},
-            {"name": "idx_block_number", "column": "block_number"}
-        ]
-
-        loop.run_until_complete(db_worker.check_and_create_table(
-            POSTGRES_TABLE_SWAP,
-            columns=POSTGRES_COLUMNS_SWAP,
-            indexes=POSTGRES_INDEXES_SWAP
-        ))
+        shards = split_range(start_block, end_block, BACKFILL_SHARD_SIZE)
+        runtime.run(_create_job(job_id, start_block, end_block, shards))
+        if len(shards) > 1:
+            return _fan_out_block_range(job_id, start_block, end_block, shards)
 
-        # Запускаем асинхронное сохранение транзакций
-        save_task = save_transactions_to_db.delay(tx_data_list)
-        
-        # Возвращаем хэши транзакций и ID задачи сохранения
-        tx_hashes = [tx["tx_hash"] for tx in tx_data_list]
-        return {
-            "status": "completed",
-            "tx_hashes": tx_hashes,
-            "count": len(tx_hashes),
-            "save_task_id": save_task.id
-        }
+        # Выполняем анализ на общем событийном цикле процесса
+        shard_result = runtime.run(_analyze_shard(job_id, start_block, end_block))
+        return _aggregate(job_id, start_block, end_block, [shard_result])
     except Exception as exc:
-        logger.error(f"Error in analyze_blocks: {exc}")
+        logger.error(f"Error in analyze_block_range: {exc}")
         raise self.retry(exc=exc, countdown=60)
-    finally:
-        if not loop.is_closed():
-            loop.close()
+
+async def _progress(job_id: str) -> BackfillProgress:
+    return BackfillProgress(await runtime.redis(), job_id)
+
+async def _create_job(job_id: str, start_block: int, end_block: int, shards: List[Tuple[int, int]]) -> None:
+    await _ensure_swap_table()
+    # При повторе задачи задание уже существует и контрольные точки сохраняются
+    await (await _progress(job_id)).create(start_block, end_block, shards)
+
+def _fan_out_block_range(job_id: str, start_block: int, end_block: int,
+                         shards: List[Tuple[int, int]]) -> Dict[str, Any]:
+    header = [analyze_block_shard.s(job_id, start, end) for start, end in shards]
+    result = chord(header)(aggregate_block_range.s(job_id, start_block, end_block))
+    logger.info(f"analyze_block_range {start_block}-{end_block}: {len(shards)} shards, job {job_id}")
+    return {
+        "status": "sharded",
+        "job_id": job_id,
+        "shards": len(shards),
+        "aggregate_task_id": result.id
+    }
+
+async def _analyze_shard(job_id: str, start_block: int, end_block: int) -> Dict[str, Any]:
+    progress = await _progress(job_id)
+    state = await progress.get_shard(start_block, end_block)
+    if state["status"] == "done":
+        # Повторная доставка уже обработанного шарда
+        return {"start_block": start_block, "end_block": end_block, "swaps": state["swaps"], "skipped": True}
+    await progress.start_shard(start_block, end_block)
+    db_worker = DatabaseWorker()
+    completed = await progress.completed_chunks()
+    swaps = 0
+    resumed = 0
+    try:
+        for chunk_start, chunk_end in split_range(start_block, end_block, BACKFILL_CHUNK_SIZE):
+            chunk = shard_id(chunk_start, chunk_end)
+            if chunk in completed:
+                swaps += completed[chunk]
+                resumed += 1
+                continue
+            # Порция с непрочитанными блоками падает (FailedBlocksError) без контрольной точки,
+            # повтор шарда запросит её заново
+            transactions = await analyzer_slice_main(chunk_start, chunk_end, shared=True, strict=True)
+            # Контрольная точка ставится только после записи в БД
+            await db_worker.save_transactions(await runtime.redis(), to_tx_rows(transactions))
+            await progress.checkpoint(chunk_start, chunk_end, len(transactions))
+            swaps += len(transactions)
+    except Exception as exc:
+        await progress.update_shard(start_block, end_block, status="failed", error=repr(exc))
+        raise
+    await progress.update_shard(start_block, end_block, status="done", swaps=swaps)
+    return {"start_block": start_block, "end_block": end_block, "swaps": swaps, "resumed_chunks": resumed}
+
+@shared_task(bind=True, max_retries=BACKFILL_SHARD_RETRIES)
+def analyze_block_shard(self, job_id: str, start_block: int, end_block: int) -> Dict[str, Any]:
+    """Анализ одного шарда диапазона; при ошибке повторяется только этот шард."""
+    try:
+        return runtime.run(_analyze_shard(job_id, start_block, end_block))
+    except Exception as exc:
+        logger.error(f"Error in analyze_block_shard {start_block}-{end_block} (job {job_id}): {exc}")
+        raise self.retry(exc=exc, countdown=min(60, 5 * 2 ** self.request.retries))
+
+def _aggregate(job_id: str, start_block: int, end_block: int,
+               shard_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {
+        "status": "completed",
+        "job_id": job_id,
+        "start_block": start_block,
+        "end_block": end_block,
+        "blocks": end_block - start_block + 1,
+        "shards": len(shard_results),
+        "count": sum(result["swaps"] for result in shard_results),
+    }
+    runtime.run(_finish_job(job_id, totals))
+    logger.info(f"analyze_block_range job {job_id}: {totals}")
+    return totals
+
+async def _finish_job(job_id: str, totals: Dict[str, Any]) -> None:
+    await (await _progress(job_id)).finish(totals)
+
+@shared_task
+def aggregate_block_range(shard_results: List[Dict[str, Any]], job_id: str,
+                          start_block: int, end_block: int) -> Dict[str, Any]:
+    """Сводка по всем шардам диапазона (callback chord)."""
+    return _aggregate(job_id, start_block, end_block, shard_results)
+
+async def _follow_tip(duration: float) -> Dict[str, Any]:
+    await _ensure_swap_table()
+    db_worker = DatabaseWorker()
+    redis = await runtime.redis()
+
+    async def save_batch(batch: List[Dict[str, Any]]) -> None:
+        # Курсор сдвигается только после записи в БД
+        await db_worker.save_transactions(redis, to_tx_rows(batch))
+
+    return await follower_main(
+        duration=duration,
+        on_batch=save_batch,
+        on_reorg=db_worker.delete_from_block,
+        shared=True,
+    )
+
+@shared_task(bind=True, max_retries=3)
+def follow_tip(self, duration: float = 55.0) -> Dict[str, Any]:
+    """Обработка только новых блоков от курсора в Redis до головы цепи в течение duration секунд."""
+    try:
+        return runtime.run(_follow_tip(duration))
+    except Exception as exc:
+        logger.error(f"Error in follow_tip: {exc}")
+        raise self.retry(exc=exc, countdown=10)
+
+@shared_task(bind=True, max_retries=3)
+def watch_mempool(self, duration: float = 55.0) -> Dict[str, Any]:
+    """Поток свопов из мемпула (newPendingTransactions) в Redis stream в течение duration секунд."""
+    try:
+        return runtime.run(mempool_main(duration=duration, shared=True))
+    except Exception as exc:
+        logger.error(f"Error in watch_mempool: {exc}")
+        raise self.retry(exc=exc, countdown=10)
+
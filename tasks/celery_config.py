@@ -6,12 +6,19 @@ from typing import List, Dict, Any, Optional, AsyncGenerator
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from config.settings import REDIS_URL
 from kombu import Queue, Exchange
+from analyzer_transactions.codec import SERIALIZER_NAME, register_kombu_serializer
 
 broker_url = REDIS_URL
 result_backend = REDIS_URL
-task_serializer = 'json'
-result_serializer = 'json'
-accept_content = ['json']
+
+# CELERY_SERIALIZER=swapbin: аргументы задач и результаты в бинарном формате analyzer_transactions.codec
+# (большие int и bytes без преобразования в строки). Оба формата принимаются всегда, чтобы воркеры
+# разных версий понимали сообщения друг друга во время выкатки.
+register_kombu_serializer()
+task_serializer = os.getenv("CELERY_SERIALIZER", "json")
+result_serializer = task_serializer
+accept_content = ['json', SERIALIZER_NAME]
+result_accept_content = accept_content
 timezone = 'UTC'
 enable_utc = True
 task_default_queue = 'default'
@@ -21,4 +28,16 @@ task_track_started = True
 task_queues = (
     Queue('default', Exchange('default'), routing_key='default'),
     Queue('high_priority', Exchange('high_priority'), routing_key='high_priority')
-)
\ No newline at end of file
+)
+
+# Периодический запуск follow_tip через celery beat (FOLLOW_TIP=1).
+# Задача работает FOLLOW_TIP_DURATION секунд; параллельный запуск отсекается блокировкой в Redis.
+FOLLOW_TIP_DURATION = float(os.getenv("FOLLOW_TIP_DURATION", 55))
+beat_schedule = {}
+if os.getenv("FOLLOW_TIP", "0").lower() in ("1", "true", "yes"):
+    beat_schedule["follow-tip"] = {
+        "task": "tasks.analyzer_tasks.follow_tip",
+        "schedule": FOLLOW_TIP_DURATION + 5,
+        "kwargs": {"duration": FOLLOW_TIP_DURATION},
+    }
+
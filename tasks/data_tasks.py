@@ -2,14 +2,12 @@
 
 import sys
 import os
-import asyncio
 import logging
 from typing import Optional, List, Dict
 
 from celery import Celery
 from analyzer_transactions.db_worker import DatabaseWorker
-from config.settings import REDIS_URL
-from redis.asyncio import Redis
+from tasks.runtime import runtime
 
 # Add parent directory to system path to enable module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -38,19 +36,12 @@ def fetch_data(self, tx_hash: Optional[str] = None) -> List[Dict]:
     """
     try:
         async def run_fetch() -> List[Dict]:
-            # Establish Redis connection
-            redis = Redis.from_url(REDIS_URL)
+            # Redis pool and database engine are shared by the worker process runtime
             db_worker = DatabaseWorker()
+            return await db_worker.fetch_transactions(await runtime.redis(), tx_hash)
 
-            # Fetch data from the database
-            data = await db_worker.fetch_transactions(redis, tx_hash)
-
-            # Close Redis connection
-            await redis.close()
-            return data
-
-        # Run the async function in a synchronous context
-        return asyncio.run(run_fetch())
+        # Run the async function on the worker process event loop
+        return runtime.run(run_fetch())
     except Exception as exc:
         logger.error(f"Task failed: {exc}")
         raise self.retry(exc=exc, countdown=60)
@@ -0,0 +1,117 @@
+# tasks/runtime.py
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+from loguru import logger
+from redis.asyncio import Redis
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from config.settings import REDIS_URL
+from analyzer_transactions.analyzer import close_shared_analyzers
+from analyzer_transactions.db_engine import dispose_engines
+
+T = TypeVar("T")
+
+
+class AsyncRuntime:
+    """One long-lived event loop per worker process, running in a background thread.
+
+    Tasks submit coroutines with ``run()``. Because the loop outlives the
+    tasks, the pooled clients built on it (aiohttp sessions of shared analyzers,
+    the Redis pool, SQLAlchemy engines) are reused by the next task.
+    """
+
+    def __init__(self) -> None:
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._redis: Optional[Redis] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self._pid == os.getpid() and self.loop.is_running()
+
+    def start(self) -> None:
+        """Start the loop thread (no-op if it already runs in this process)."""
+        with self._lock:
+            if self.running:
+                return
+            # After fork the parent's loop and thread are unusable: start anew
+            self.loop = asyncio.new_event_loop()
+            self._pid = os.getpid()
+            self._redis = None
+            started = threading.Event()
+
+            def run_loop() -> None:
+                asyncio.set_event_loop(self.loop)
+                self.loop.call_soon(started.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="async-runtime", daemon=True)
+            self._thread.start()
+            started.wait()
+            logger.info(f"Async runtime started in pid {self._pid}")
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the runtime loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run.
+            timeout: Optional timeout in seconds.
+
+        Returns:
+            The coroutine result.
+        """
+        if not self.running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def redis(self) -> Redis:
+        """Shared Redis client of the runtime loop (must be awaited on that loop)."""
+        if self._redis is None:
+            self._redis = Redis.from_url(REDIS_URL)
+        return self._redis
+
+    async def _shutdown(self) -> None:
+        await close_shared_analyzers()
+        await dispose_engines()
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def stop(self, timeout: float = 30) -> None:
+        """Close the pooled clients and stop the loop thread."""
+        with self._lock:
+            if not self.running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+            except Exception as e:
+                logger.error(f"Error while closing async runtime clients: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self.loop.close()
+            self.loop = None
+            logger.info(f"Async runtime stopped in pid {self._pid}")
+
+
+runtime = AsyncRuntime()
+
+
+@worker_process_init.connect
+def start_runtime(**kwargs) -> None:
+    """Start the worker process event loop."""
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_runtime(**kwargs) -> None:
+    """Close pooled clients and stop the worker process event loop."""
+    runtime.stop()
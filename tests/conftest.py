@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 from fastapi import FastAPI
 
 from api.endpoints import analysis, data, tasks
+from stub_rpc_server import StubRpcServer
 
 app = FastAPI()
 app.include_router(analysis.router, prefix="/analysis")
@@ -17,4 +18,12 @@ app.include_router(tasks.router, prefix="/tasks")
 async def client():
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
\ No newline at end of file
+        yield ac
+
+
+@pytest_asyncio.fixture
+async def stub_rpc():
+    server = StubRpcServer()
+    await server.start()
+    yield server
+    await server.stop()
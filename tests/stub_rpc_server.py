@@ -0,0 +1,269 @@
+# tests/stub_rpc_server.py
+"""Local stub Ethereum JSON-RPC node serving deterministic blocks."""
+
+import asyncio
+import random
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from aiohttp import web
+from eth_abi import encode, decode
+from eth_utils import keccak
+
+SWAP_SELECTOR: bytes = keccak(text="swapExactTokensForTokens(uint256,uint256,address[],address,uint256)")[:4]
+TRANSFER_SELECTOR: bytes = bytes.fromhex("a9059cbb")
+ROUTER_V2: str = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+SWAP_V2_TOPIC: str = "0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex()
+
+
+class StubRpcServer:
+    """aiohttp JSON-RPC server emulating the subset of eth_* methods used by the analyzer.
+
+    Attributes:
+        head: Current chain head number.
+        latency: Delay added to every HTTP request, in seconds.
+        reject_batches: Answer batch POSTs with a JSON-RPC error object.
+        max_concurrency: Answer HTTP 429 when more requests than this are in flight.
+        tail_latency / tail_every: Every tail_every-th request takes tail_latency instead of latency.
+        missing_blocks: Block numbers answered with a per-item error.
+        block_receipts: Serve eth_getBlockReceipts (method not found otherwise).
+        http_requests / rpc_calls / throttled: Request counters.
+    """
+
+    def __init__(self, head: int = 1000, txs_per_block: int = 20, swap_every: int = 5,
+                 latency: float = 0.0, reject_batches: bool = False,
+                 max_concurrency: Optional[int] = None, tail_latency: float = 0.0, tail_every: int = 0,
+                 block_receipts: bool = True) -> None:
+        self.head = head
+        self.txs_per_block = txs_per_block
+        self.swap_every = swap_every
+        self.latency = latency
+        self.reject_batches = reject_batches
+        self.max_concurrency = max_concurrency
+        self.tail_latency = tail_latency
+        self.tail_every = tail_every
+        self.block_receipts = block_receipts
+        self.missing_blocks: Set[int] = set()
+        self.fork_block: Optional[int] = None
+        self.subscribers: Set[web.WebSocketResponse] = set()
+        self.pending_subscribers: Dict[web.WebSocketResponse, bool] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.ws_connections: int = 0
+        self.fork_id: int = 0
+        self.tx_positions: Dict[str, Tuple[int, int]] = {}  # hash -> (block, index) of served txs
+        self.http_requests = 0
+        self.rpc_calls = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def block_hash(self, number: int) -> str:
+        # Blocks at or above fork_block belong to the branch selected by fork_id
+        branch = self.fork_id if self.fork_block is not None and number >= self.fork_block else 0
+        return "0x" + keccak(number.to_bytes(32, "big") + branch.to_bytes(4, "big")).hex()
+
+    def reorg(self, from_block: int) -> None:
+        """Replace the chain from from_block on with a new branch."""
+        self.fork_id += 1
+        self.fork_block = from_block
+
+    def make_transaction(self, number: int, index: int) -> Dict[str, Any]:
+        rng = random.Random(number * 100_000 + index)
+        sender = "0x" + rng.randbytes(20).hex()
+        if index % self.swap_every == 0:
+            path = ["0x" + rng.randbytes(20).hex() for _ in range(2)]
+            to = ROUTER_V2
+            calldata = SWAP_SELECTOR + encode(
+                ["uint256", "uint256", "address[]", "address", "uint256"],
+                [rng.getrandbits(64), rng.getrandbits(32), path, sender, 1_700_000_000],
+            )
+        else:
+            to = "0x" + rng.randbytes(20).hex()
+            calldata = TRANSFER_SELECTOR + encode(["address", "uint256"], [to, rng.getrandbits(64)])
+        tx_hash = "0x" + keccak(f"{number}:{index}".encode()).hex()
+        self.tx_positions[tx_hash] = (number, index)
+        return {
+            "blockHash": self.block_hash(number),
+            "blockNumber": hex(number),
+            "from": sender,
+            "gas": hex(200_000),
+            "gasPrice": hex(30 * 10**9),
+            "hash": tx_hash,
+            "input": "0x" + calldata.hex(),
+            "nonce": hex(rng.getrandbits(16)),
+            "to": to,
+            "transactionIndex": hex(index),
+            "value": hex(0),
+            "type": "0x2",
+            "chainId": "0x1",
+            "v": "0x1",
+            "r": "0x" + rng.randbytes(32).hex(),
+            "s": "0x" + rng.randbytes(32).hex(),
+        }
+
+    def make_receipt(self, number: int, index: int) -> Dict[str, Any]:
+        """Receipt of a served transaction; swaps emit a V2 Swap log paying amountOutMin + 1."""
+        tx = self.make_transaction(number, index)
+        logs: List[Dict[str, Any]] = []
+        if tx["to"] == ROUTER_V2:
+            amount_in, amount_out_min, path, recipient, _ = decode(
+                ["uint256", "uint256", "address[]", "address", "uint256"], bytes.fromhex(tx["input"][10:]))
+            logs.append({
+                "address": "0x" + keccak(("".join(path)).encode())[:20].hex(),
+                "topics": [SWAP_V2_TOPIC, "0x" + "00" * 12 + ROUTER_V2[2:], "0x" + "00" * 12 + recipient[2:]],
+                "data": "0x" + encode(["uint256"] * 4, [amount_in, 0, 0, amount_out_min + 1]).hex(),
+                "logIndex": hex(index),
+                "transactionHash": tx["hash"],
+                "blockNumber": tx["blockNumber"],
+            })
+        return {
+            "transactionHash": tx["hash"],
+            "blockNumber": tx["blockNumber"],
+            "transactionIndex": tx["transactionIndex"],
+            "status": "0x1",
+            "gasUsed": hex(120_000 if logs else 21_000),
+            "logs": logs,
+        }
+
+    def make_block(self, number: int, full_transactions: bool = True) -> Dict[str, Any]:
+        transactions = [self.make_transaction(number, index) for index in range(self.txs_per_block)]
+        return {
+            "number": hex(number),
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1),
+            "timestamp": hex(1_700_000_000 + number * 12),
+            "gasUsed": hex(15_000_000),
+            "gasLimit": hex(30_000_000),
+            "miner": "0x" + "00" * 20,
+            "transactions": transactions if full_transactions else [tx["hash"] for tx in transactions],
+        }
+
+    def handle_call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.rpc_calls += 1
+        method = request.get("method")
+        params: List[Any] = request.get("params") or []
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        if method == "web3_clientVersion":
+            response["result"] = "stub/v1"
+        elif method == "eth_chainId":
+            response["result"] = "0x1"
+        elif method == "eth_blockNumber":
+            response["result"] = hex(self.head)
+        elif method == "eth_getTransactionByHash":
+            response["result"] = self.pending.get(params[0])
+        elif method == "eth_getBlockByNumber":
+            tag = params[0]
+            number = self.head if tag == "latest" else int(tag, 16)
+            if number in self.missing_blocks:
+                response["error"] = {"code": -32000, "message": "header not found"}
+            elif number > self.head:
+                response["result"] = None
+            else:
+                response["result"] = self.make_block(number, bool(params[1]) if len(params) > 1 else False)
+        elif method == "eth_getBlockReceipts" and self.block_receipts:
+            number = int(params[0], 16)
+            response["result"] = [self.make_receipt(number, index) for index in range(self.txs_per_block)]
+        elif method == "eth_getTransactionReceipt":
+            position = self.tx_positions.get(params[0])
+            response["result"] = self.make_receipt(*position) if position is not None else None
+        else:
+            response["error"] = {"code": -32601, "message": f"method {method} not found"}
+        return response
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.http_requests += 1
+        if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+            self.throttled += 1
+            return web.json_response({"error": "too many requests"}, status=429)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.tail_every and self.http_requests % self.tail_every == 0:
+                await asyncio.sleep(self.tail_latency)
+            elif self.latency:
+                await asyncio.sleep(self.latency)
+            return await self._respond(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _respond(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if isinstance(payload, list):
+            if self.reject_batches:
+                return web.json_response({"jsonrpc": "2.0", "id": None,
+                                          "error": {"code": -32600, "message": "batch requests are not supported"}})
+            return web.json_response([self.handle_call(item) for item in payload])
+        return web.json_response(self.handle_call(payload))
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        """JSON-RPC over WebSocket with eth_subscribe("newHeads") support."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.ws_connections += 1
+        try:
+            async for message in ws:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                call = message.json()
+                if call.get("method") == "eth_subscribe" and call.get("params") == ["newHeads"]:
+                    await ws.send_json({"jsonrpc": "2.0", "id": call.get("id"), "result": "0xsub1"})
+                    self.subscribers.add(ws)
+                elif call.get("method") == "eth_subscribe" and call.get("params", [None])[0] == "newPendingTransactions":
+                    await ws.send_json({"jsonrpc": "2.0", "id": call.get("id"), "result": "0xsub2"})
+                    # ["newPendingTransactions", true] streams full transactions, hashes otherwise
+                    self.pending_subscribers[ws] = call["params"][1:] == [True]
+                else:
+                    await ws.send_json(self.handle_call(call))
+        finally:
+            self.subscribers.discard(ws)
+            self.pending_subscribers.pop(ws, None)
+        return ws
+
+    async def push_pending(self, transactions: List[Dict[str, Any]]) -> None:
+        """Announce pending transactions to the newPendingTransactions subscribers."""
+        for tx in transactions:
+            self.pending[tx["hash"]] = dict(tx, blockHash=None, blockNumber=None, transactionIndex=None)
+        for ws, full in list(self.pending_subscribers.items()):
+            for tx in transactions:
+                result = self.pending[tx["hash"]] if full else tx["hash"]
+                await ws.send_json({"jsonrpc": "2.0", "method": "eth_subscription",
+                                    "params": {"subscription": "0xsub2", "result": result}})
+
+    async def push_head(self, number: int) -> None:
+        """Advance the head and notify the newHeads subscribers."""
+        self.head = max(self.head, number)
+        block = self.make_block(number, full_transactions=False)
+        header = {key: value for key, value in block.items() if key != "transactions"}
+        for ws in list(self.subscribers):
+            await ws.send_json({"jsonrpc": "2.0", "method": "eth_subscription",
+                                "params": {"subscription": "0xsub1", "result": header}})
+
+    async def drop_subscribers(self) -> None:
+        """Close every WebSocket connection (simulates a node restart)."""
+        for ws in list(self.subscribers) + list(self.pending_subscribers):
+            await ws.close()
+        self.subscribers.clear()
+        self.pending_subscribers.clear()
+
+    @property
+    def ws_url(self) -> str:
+        return self.url.replace("http://", "ws://") + "ws"
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        app.router.add_get("/ws", self.handle_ws)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/"
+        return self.url
+
+    async def stop(self) -> None:
+        await self.drop_subscribers()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,57 @@
+# tests/test_analyzer_redis.py
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from web3.types import HexBytes
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("TRANSACTION_TTL", "120")
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, True, True])
+    analyzer.redis = MagicMock()
+    analyzer.redis.pipeline.return_value = pipe
+    return analyzer
+
+
+@pytest.mark.asyncio
+async def test_save_batch_uses_single_pipeline(analyzer):
+    txs = [
+        {"hash": HexBytes(bytes([i]) * 32), "blockNumber": 100 + i, "decoded_input": {"method": "exactInput"}}
+        for i in range(3)
+    ]
+
+    saved = await analyzer.save_batch_to_redis(txs)
+
+    pipe = analyzer.redis.pipeline.return_value
+    assert saved == 3
+    analyzer.redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.execute.assert_awaited_once()
+    assert pipe.setex.call_count == 3
+    key, ttl, payload = pipe.setex.call_args_list[0].args
+    assert key == "tx:0x" + "00" * 32
+    assert ttl == 120
+    assert json.loads(payload)["blockNumber"] == "100"
+    assert analyzer.redis_stats["round_trips"] == 1
+    assert analyzer.redis_stats["round_trips_saved"] == 3 * AnalyzerTransactions.LEGACY_REDIS_ROUND_TRIPS_PER_TX - 1
+
+
+@pytest.mark.asyncio
+async def test_save_batch_empty_is_noop(analyzer):
+    assert await analyzer.save_batch_to_redis([]) == 0
+    analyzer.redis.pipeline.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_transaction_data_does_not_touch_redis(analyzer):
+    tx = {"hash": HexBytes(b"\x01" * 32), "input": HexBytes(b"\xde\xad\xbe\xef")}
+
+    tx_data = await analyzer.get_transaction_data(tx)
+
+    assert tx_data["decoded_input"] is None
+    analyzer.redis.pipeline.assert_not_called()
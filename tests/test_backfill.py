@@ -0,0 +1,137 @@
+# tests/test_backfill.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from analyzer_transactions.analyzer import AnalyzerTransactions, FailedBlocksError, analyzer_slice_main
+from analyzer_transactions.backfill import BackfillProgress, split_range
+from tasks import analyzer_tasks
+from tasks.runtime import AsyncRuntime
+from tests.test_tip_follower import MemoryRedis
+
+
+def test_split_range_aligns_shards():
+    assert split_range(1500, 4200, 1000) == [(1500, 1999), (2000, 2999), (3000, 3999), (4000, 4200)]
+    assert split_range(2000, 2999, 1000) == [(2000, 2999)]
+    assert split_range(7, 7, 1000) == [(7, 7)]
+    with pytest.raises(ValueError):
+        split_range(10, 9, 1000)
+
+
+@pytest.fixture
+def memory_runtime():
+    redis = MemoryRedis()
+    runtime = AsyncRuntime()
+    runtime.redis = AsyncMock(return_value=redis)
+    with patch.object(analyzer_tasks, "runtime", runtime):
+        yield runtime, redis
+    runtime.stop()
+
+
+def test_large_range_fans_out_as_chord(memory_runtime):
+    runtime, redis = memory_runtime
+    with patch.object(analyzer_tasks, "_ensure_swap_table", AsyncMock()), \
+            patch.object(analyzer_tasks, "chord") as chord, \
+            patch.object(analyzer_tasks, "BACKFILL_SHARD_SIZE", 1000):
+        chord.return_value.return_value.id = "aggregate-id"
+        result = analyzer_tasks.analyze_block_range.apply(args=(1500, 3200), task_id="job-1").get()
+
+    assert result == {"status": "sharded", "job_id": "job-1", "shards": 3, "aggregate_task_id": "aggregate-id"}
+    header = chord.call_args.args[0]
+    assert [signature.args for signature in header] == [
+        ("job-1", 1500, 1999), ("job-1", 2000, 2999), ("job-1", 3000, 3200)
+    ]
+    summary = runtime.run(BackfillProgress(redis, "job-1").summary())
+    assert summary["shards_by_status"] == {"pending": 3}
+
+
+def test_failed_shard_is_retried_alone_and_aggregated(memory_runtime):
+    runtime, redis = memory_runtime
+    progress = BackfillProgress(redis, "job-2")
+    runtime.run(progress.create(0, 1999, [(0, 999), (1000, 1999)]))
+
+    slice_main = AsyncMock(side_effect=[ConnectionError("node down"), [{"hash": "0x1"}, {"hash": "0x2"}],
+                                        [{"hash": "0x3"}]])
+    db_worker = MagicMock()
+    db_worker.return_value.save_transactions = AsyncMock(return_value={"inserted": 1})
+    with patch.object(analyzer_tasks, "analyzer_slice_main", slice_main), \
+            patch.object(analyzer_tasks, "DatabaseWorker", db_worker), \
+            patch.object(analyzer_tasks, "to_tx_rows", lambda txs: txs), \
+            patch.object(analyzer_tasks, "BACKFILL_CHUNK_SIZE", 1000):
+        first = analyzer_tasks.analyze_block_shard.apply(args=("job-2", 0, 999)).get()
+        second = analyzer_tasks.analyze_block_shard.apply(args=("job-2", 1000, 1999)).get()
+        # Повторная доставка выполненного шарда не анализирует блоки заново
+        again = analyzer_tasks.analyze_block_shard.apply(args=("job-2", 0, 999)).get()
+
+    assert slice_main.await_count == 3
+    assert (first["swaps"], second["swaps"], again["skipped"]) == (2, 1, True)
+    assert runtime.run(progress.get_shard(0, 999))["attempts"] == 2
+
+    totals = analyzer_tasks.aggregate_block_range.apply(args=([first, second], "job-2", 0, 1999)).get()
+    assert (totals["blocks"], totals["shards"], totals["count"]) == (2000, 2, 3)
+    summary = runtime.run(progress.summary())
+    assert summary["status"] == "completed"
+    assert summary["shards_by_status"] == {"done": 2}
+    assert summary["result"]["count"] == 3
+
+
+def test_retry_resumes_from_last_checkpoint(memory_runtime):
+    runtime, redis = memory_runtime
+    calls = []
+
+    async def slice_main(start, end, shared=False, strict=False):
+        calls.append((start, end))
+        if (start, end) == (200, 299) and calls.count((start, end)) == 1:
+            raise ConnectionError("node down")
+        return [{"hash": f"0x{start}"}]
+
+    db_worker = MagicMock()
+    db_worker.return_value.save_transactions = AsyncMock(return_value={"inserted": 1})
+    with patch.object(analyzer_tasks, "analyzer_slice_main", slice_main), \
+            patch.object(analyzer_tasks, "DatabaseWorker", db_worker), \
+            patch.object(analyzer_tasks, "_ensure_swap_table", AsyncMock()), \
+            patch.object(analyzer_tasks, "to_tx_rows", lambda txs: txs), \
+            patch.object(analyzer_tasks, "BACKFILL_CHUNK_SIZE", 100):
+        result = analyzer_tasks.analyze_block_range.apply(args=(0, 399), task_id="job-3").get()
+
+    # Порции до сбоя не обрабатываются повторно
+    assert calls == [(0, 99), (100, 199), (200, 299), (200, 299), (300, 399)]
+    assert (result["status"], result["count"], result["blocks"]) == ("completed", 4, 400)
+    summary = runtime.run(BackfillProgress(redis, "job-3").summary())
+    assert (summary["blocks_done"], summary["swaps"], summary["status"]) == (400, 4, "completed")
+
+
+def test_chunk_with_failed_blocks_is_not_checkpointed(memory_runtime, monkeypatch):
+    runtime, redis = memory_runtime
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    failures = iter([{150: "timeout"}, {}])
+
+    async def process_blocks(block_numbers, on_batch=None):
+        analyzer.failed_blocks = next(failures) if block_numbers[0] == 100 else {}
+        await on_batch([{"hash": f"0x{block_numbers[0]}"}])
+        return {"blocks": len(block_numbers), "failed_blocks": len(analyzer.failed_blocks), "swaps": 1,
+                "batches": 1}
+
+    analyzer.process_blocks = process_blocks
+    limiter = MagicMock()
+    limiter.get_available_node = AsyncMock(return_value="http://node")
+    limiter.close = AsyncMock()
+    db_worker = MagicMock()
+    db_worker.return_value.save_transactions = AsyncMock(return_value={"inserted": 1})
+    progress = BackfillProgress(redis, "job-4")
+    runtime.run(progress.create(0, 199, [(0, 199)]))
+    with patch("analyzer_transactions.analyzer.NodeRateLimiter", return_value=limiter), \
+            patch("analyzer_transactions.analyzer.get_shared_analyzer", AsyncMock(return_value=analyzer)), \
+            patch.object(analyzer_tasks, "DatabaseWorker", db_worker), \
+            patch.object(analyzer_tasks, "to_tx_rows", lambda txs: txs), \
+            patch.object(analyzer_tasks, "BACKFILL_CHUNK_SIZE", 100):
+        with pytest.raises(FailedBlocksError) as failed:
+            runtime.run(analyzer_tasks._analyze_shard("job-4", 0, 199))
+        assert failed.value.failed == {150: "timeout"}
+        assert list(runtime.run(progress.completed_chunks())) == ["0-99"]
+        assert runtime.run(progress.get_shard(0, 199))["status"] == "failed"
+        # Повтор шарда запрашивает порцию заново
+        result = runtime.run(analyzer_tasks._analyze_shard("job-4", 0, 199))
+
+    assert (result["swaps"], result["resumed_chunks"]) == (2, 1)
+    assert db_worker.return_value.save_transactions.await_count == 2
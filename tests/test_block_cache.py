@@ -0,0 +1,179 @@
+# tests/test_block_cache.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from analyzer_transactions.block_cache import BlockCache, REDIS_CACHE_STATS_KEY
+from analyzer_transactions.block_fetcher import AdaptiveWindow, BlockFetcher
+from analyzer_transactions.rpc_client import RpcClient
+
+
+def block(number, parent_hash=None, block_hash=None):
+    return {
+        "number": hex(number),
+        "hash": block_hash or f"0x{number:064x}",
+        "parentHash": parent_hash or f"0x{number - 1:064x}",
+        "transactions": [],
+    }
+
+
+def mock_redis(values=None):
+    redis = MagicMock()
+    redis.mget = AsyncMock(side_effect=lambda keys: [(values or {}).get(key) for key in keys])
+    redis.delete = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis.pipeline.return_value = pipe
+    return redis, pipe
+
+
+@pytest.mark.asyncio
+async def test_local_hits_and_misses():
+    cache = BlockCache()
+    await cache.put_many({1: block(1), 2: block(2)})
+
+    found = await cache.get_many([1, 2, 3])
+
+    assert found == {1: block(1), 2: block(2)}
+    assert cache.stats["hits"] == 2
+    assert cache.stats["local_hits"] == 2
+    assert cache.stats["misses"] == 1
+    assert cache.rpc_saved == 2
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_size_bounded():
+    cache = BlockCache()
+    entry_size = len(cache.encode(block(1)))
+    cache.local_max_bytes = entry_size * 2
+    await cache.put_many({1: block(1), 2: block(2)})
+    await cache.get_many([1])  # 1 becomes the most recently used
+    await cache.put_many({3: block(3)})
+
+    assert sorted(cache._local) == [1, 3]
+    assert cache._local_bytes <= cache.local_max_bytes
+
+
+@pytest.mark.asyncio
+async def test_finalized_blocks_are_indexed_with_a_ttl():
+    redis, pipe = mock_redis()
+    pipe.execute.return_value = [True, True, 1, 1]
+    redis.zpopmin = AsyncMock()
+    cache = BlockCache(redis, finality_depth=64, tip_ttl=30, final_ttl=3600)
+    cache.observe_head(1000)
+
+    await cache.put_many({900: block(900), 990: block(990)})
+
+    assert pipe.setex.call_args_list[0].args == ("block:900", 3600, cache.encode(block(900)))
+    assert pipe.setex.call_args_list[1].args == ("block:990", 30, cache.encode(block(990)))
+    pipe.zadd.assert_called_once_with("block:index", {"900": 900})
+    pipe.execute.assert_awaited_once()
+    redis.zpopmin.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_lowest_finalized_blocks_are_evicted():
+    redis, pipe = mock_redis()
+    pipe.execute.return_value = [True] * 3 + [3, 5]
+    redis.zpopmin = AsyncMock(return_value=[(b"100", 100.0), (b"101", 101.0)])
+    cache = BlockCache(redis, finality_depth=10, max_final_blocks=3)
+    cache.observe_head(1000)
+
+    await cache.put_many({500: block(500), 501: block(501), 502: block(502)})
+
+    redis.zpopmin.assert_awaited_once_with("block:index", 2)
+    redis.delete.assert_awaited_once_with("block:100", "block:101")
+    assert cache.stats["evicted"] == 2
+
+
+def test_cache_tiers_are_opt_in(monkeypatch):
+    monkeypatch.delenv("BLOCK_CACHE", raising=False)
+    monkeypatch.delenv("BLOCK_CACHE_REDIS_URL", raising=False)
+    monkeypatch.delenv("BLOCK_CACHE_LOCAL_MB", raising=False)
+    assert BlockCache.from_env() is None
+
+    monkeypatch.setenv("BLOCK_CACHE_LOCAL_MB", "16")
+    local = BlockCache.from_env()
+    assert (local.redis_url, local.local_max_bytes) == (None, 16 * 1024 * 1024)
+
+    monkeypatch.setenv("BLOCK_CACHE_REDIS_URL", "redis://block_cache:6379/0")
+    monkeypatch.setenv("BLOCK_CACHE_MAX_BLOCKS", "500")
+    monkeypatch.setenv("BLOCK_CACHE_LOCAL_MB", "0")
+    cache = BlockCache.from_env()
+    assert (cache.redis_url, cache.max_final_blocks, cache.redis) == ("redis://block_cache:6379/0", 500, None)
+    assert cache.local_max_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_hits_fill_the_local_tier():
+    source = BlockCache()
+    redis, _ = mock_redis({"block:7": source.encode(block(7))})
+    cache = BlockCache(redis)
+
+    assert await cache.get_many([7]) == {7: block(7)}
+    assert 7 in cache._local
+    assert cache.stats["local_hits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reorg_invalidates_tip_blocks():
+    redis, _ = mock_redis()
+    cache = BlockCache(redis, finality_depth=10)
+    cache.observe_head(100)
+    await cache.put_many({99: block(99, block_hash="0x" + "aa" * 32)})
+
+    # The new block 100 builds on a different block 99
+    await cache.put_many({100: block(100, parent_hash="0x" + "bb" * 32)})
+
+    assert 99 not in cache._local
+    assert 100 in cache._local
+    deleted = redis.delete.await_args.args
+    assert "block:99" in deleted and "block:91" in deleted and "block:90" not in deleted
+
+
+@pytest.mark.asyncio
+async def test_unlinked_cached_tip_blocks_are_misses():
+    cache = BlockCache(finality_depth=10)
+    cache.observe_head(100)
+    # Entries written by workers that saw different branches
+    cache._local_put(98, cache.encode(block(98)))
+    cache._local_put(99, cache.encode(block(99, parent_hash="0x" + "cc" * 32)))
+
+    assert await cache.get_many([98, 99]) == {}
+    assert cache.stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetcher_serves_repeated_ranges_from_cache(stub_rpc):
+    rpc = RpcClient(stub_rpc.url, batch_size=10)
+    cache = BlockCache()
+    fetcher = BlockFetcher(rpc, AdaptiveWindow(initial=2, maximum=2), cache=cache)
+    try:
+        first = {number: raw async for number, raw in fetcher.fetch(list(range(1, 31)))}
+        requests = stub_rpc.http_requests
+        second = {number: raw async for number, raw in fetcher.fetch(list(range(1, 31)))}
+    finally:
+        await rpc.close()
+
+    assert first == second
+    # Only the head lookup reaches the node the second time
+    assert stub_rpc.http_requests == requests + 1
+    assert cache.head == stub_rpc.head
+    assert cache.rpc_saved == 30
+
+
+@pytest.mark.asyncio
+async def test_stats_are_aggregated_in_redis():
+    redis, pipe = mock_redis()
+    cache = BlockCache(MagicMock())
+    cache.stats.update(hits=3, misses=1)
+
+    # Totals go to the main Redis read by the API, not to the cache instance
+    await cache.flush_stats(redis)
+
+    pipe.hincrby.assert_any_call(REDIS_CACHE_STATS_KEY, "block:hits", 3)
+    assert cache.stats["hits"] == 0
+
+    redis.hgetall = AsyncMock(return_value={b"block:hits": b"3", b"block:misses": b"1"})
+    totals = await BlockCache.read_stats(redis)
+    assert totals["block"]["rpc_saved"] == 3
+    assert totals["block"]["hit_ratio"] == 0.75
@@ -0,0 +1,103 @@
+# tests/test_block_fetcher.py
+import asyncio
+import pytest
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.block_fetcher import AdaptiveWindow, BlockFetcher
+from analyzer_transactions.rpc_client import RpcClient, RpcHttpError
+
+
+def test_window_grows_while_latency_is_flat():
+    window = AdaptiveWindow(initial=2, maximum=8)
+    for _ in range(50):
+        window.on_success(0.01)
+    assert window.size == 8
+
+
+def test_window_shrinks_on_congestion_and_latency_growth():
+    window = AdaptiveWindow(initial=16, maximum=16)
+    window.on_congestion()
+    assert window.size == 8
+
+    window = AdaptiveWindow(initial=16, maximum=16)
+    window.on_success(0.01)
+    for _ in range(40):
+        window.on_success(0.5)
+    assert window.size < 16
+
+
+@pytest.mark.asyncio
+async def test_fetcher_backs_off_on_429(stub_rpc):
+    stub_rpc.max_concurrency = 3
+    stub_rpc.latency = 0.01
+    rpc = RpcClient(stub_rpc.url, batch_size=2)
+    window = AdaptiveWindow(initial=16, maximum=16)
+    fetcher = BlockFetcher(rpc, window, max_retries=10, backoff=0.01)
+    try:
+        results = {number: block async for number, block in fetcher.fetch(list(range(1, 301)))}
+    finally:
+        await rpc.close()
+
+    assert sorted(results) == list(range(1, 301))
+    assert not any(isinstance(block, BaseException) for block in results.values())
+    assert stub_rpc.throttled > 0
+    assert window.congestion_events > 0
+    assert window.size < 16
+    assert window.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fetcher_reports_error_after_retries(stub_rpc):
+    stub_rpc.max_concurrency = 0
+    rpc = RpcClient(stub_rpc.url, batch_size=5)
+    fetcher = BlockFetcher(rpc, AdaptiveWindow(initial=2), max_retries=1, backoff=0.001)
+    try:
+        results = {number: block async for number, block in fetcher.fetch([1, 2, 3])}
+    finally:
+        await rpc.close()
+
+    assert all(isinstance(error, RpcHttpError) and error.status == 429 for error in results.values())
+
+
+class CountingRpc:
+    """get_blocks without a node, counting the blocks returned."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.fetched = 0
+
+    async def get_blocks(self, numbers, full_transactions=True):
+        await asyncio.sleep(0)
+        self.fetched += len(numbers)
+        return {number: {"number": hex(number), "transactions": []} for number in numbers}
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_holds_back_fetching():
+    rpc = CountingRpc(batch_size=10)
+    fetcher = BlockFetcher(rpc, AdaptiveWindow(initial=4, maximum=4))
+    bound = 4 * 10
+    consumed = 0
+    ahead = 0
+    async for number, block in fetcher.fetch(range(10_000)):
+        consumed += 1
+        ahead = max(ahead, rpc.fetched - consumed)
+        await asyncio.sleep(0)  # Slow consumer: the fetch tasks run between items
+
+    assert consumed == rpc.fetched == 10_000
+    assert ahead <= bound
+
+
+@pytest.mark.asyncio
+async def test_analyzer_fetches_ranges_above_former_cap(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("RPC_MAX_CONCURRENCY", "4")
+    stub_rpc.txs_per_block = 2
+    analyzer = AnalyzerTransactions(stub_rpc.url)
+    try:
+        data_blocks = await analyzer.get_slice_blocks(1, 450)
+    finally:
+        await analyzer.close()
+
+    assert [block["number"] for block in data_blocks] == list(range(1, 451))
+    assert analyzer.window.peak_in_flight <= 4
@@ -0,0 +1,104 @@
+# tests/test_codec.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from kombu.serialization import dumps, loads
+from web3.types import HexBytes
+
+from analyzer_transactions import codec
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.db_worker import to_tx_rows
+from analyzer_transactions.swap_record import SwapRecord
+from tests.test_db_worker import db_worker, make_result
+
+
+def test_round_trip_keeps_types():
+    value = {
+        "amounts": [0, -1, 127, -129, 2**31, -2**63, 2**64, 2**256 - 1, -2**255],
+        "path": HexBytes("0x" + "11" * 43),
+        "large": b"\x00" * 300,
+        "text": "é" * 200,
+        "flags": (True, False, None),
+        "price": 1.5,
+        5: "int key",
+    }
+
+    decoded = codec.decode(codec.encode(value))
+
+    assert decoded == {**value, "path": bytes.fromhex("11" * 43), "flags": [True, False, None]}
+    assert type(decoded["path"]) is bytes and type(decoded["amounts"][-2]) is int
+
+
+def test_swap_record_round_trip():
+    record = SwapRecord(hash=b"\xab" * 32, block_number=900, transaction_index=3, sender="0x" + "11" * 20,
+                        to="0x" + "22" * 20, method_id=b"\x38\xed\x17\x39",
+                        decoded_input={"method": "exactInput", "params": {"amountIn": 2**200}})
+
+    encoded = codec.encode([record])
+
+    assert codec.decode(encoded) == [record]
+    assert len(encoded) < len(AnalyzerTransactions._serialize_tx(record)[1])
+
+
+def test_header_is_checked():
+    payload = codec.encode({"a": 1})
+    assert payload[:codec.HEADER_SIZE] == codec.MAGIC + bytes([codec.FORMAT_VERSION])
+
+    with pytest.raises(codec.CodecError, match="version"):
+        codec.decode(codec.MAGIC + b"\x63" + payload[codec.HEADER_SIZE:])
+    with pytest.raises(codec.CodecError, match="header"):
+        codec.decode(b'{"a": 1}')
+    with pytest.raises(codec.CodecError):
+        codec.decode(payload[:-1])
+    with pytest.raises(codec.CodecError):
+        codec.encode({"a": object()})
+
+
+def test_kombu_serializer():
+    codec.register_kombu_serializer()
+    args = ([{"tx_hash": "0x" + "ab" * 32, "block_number": 900, "decoded_input": {"amountIn": 2**255}}], {}, {})
+
+    content_type, content_encoding, body = dumps(args, serializer=codec.SERIALIZER_NAME)
+
+    assert (content_type, content_encoding) == (codec.CONTENT_TYPE, "binary")
+    assert loads(body, content_type, content_encoding, accept=[codec.CONTENT_TYPE]) == [list(args[0]), {}, {}]
+
+
+@pytest.mark.asyncio
+async def test_save_batch_with_binary_codec(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("REDIS_CODEC", "swapbin")
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    analyzer.redis = MagicMock()
+    analyzer.redis.pipeline.return_value = pipe
+    record = SwapRecord(hash=b"\x01" * 32, block_number=100, decoded_input={"method": "exactInput"})
+
+    await analyzer.save_batch_to_redis([record, {"hash": HexBytes(b"\x02" * 32), "blockNumber": 101}])
+
+    (key, _, payload), (dict_key, _, dict_payload) = [call.args for call in pipe.setex.call_args_list]
+    assert (key, codec.decode(payload)) == ("tx:0x" + "01" * 32, record)
+    assert (dict_key, codec.decode(dict_payload)["blockNumber"]) == ("tx:0x" + "02" * 32, 101)
+
+
+@pytest.mark.asyncio
+async def test_saving_to_db_keeps_the_binary_value(db_worker, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("REDIS_CODEC", "swapbin")
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    stored = {}
+    pipe = MagicMock()
+    pipe.setex.side_effect = lambda key, ttl, value: stored.__setitem__(key, value)
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    analyzer.redis = redis
+    record = SwapRecord(hash=b"\x01" * 32, block_number=100, decoded_input={"amountIn": 2**200})
+    db_worker.conn.execute = AsyncMock(return_value=make_result([record.hash_hex]))
+
+    await analyzer.save_batch_to_redis([record])
+    await db_worker.save_transactions(redis, to_tx_rows([record]))
+
+    # The save stage sets only the flag; readers of tx:{hash} keep getting swapbin
+    assert codec.decode(stored[f"tx:{record.hash_hex}"]) == record
+    assert stored[f"tx:{record.hash_hex}:saved_to_db"] == "true"
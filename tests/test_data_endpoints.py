@@ -30,3 +30,29 @@ async def test_get_transaction_not_found(mock_redis, mock_dbworker, client):
     print("RESPONSE:", response.status_code, response.json())
 
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@patch("api.endpoints.data.pool_stats")
+async def test_get_pool_stats(mock_pool_stats, client):
+    mock_pool_stats.return_value = [{"url": "postgresql+asyncpg://postgres:***@db/analyzer", "size": 20}]
+
+    response = await client.get("/data/pool_stats")
+
+    assert response.status_code == 200
+    assert response.json()["engines"][0]["size"] == 20
+
+
+@pytest.mark.asyncio
+@patch("api.endpoints.data.Redis.from_url")
+async def test_get_block_cache_stats(mock_redis, client):
+    redis = AsyncMock()
+    redis.hgetall.return_value = {b"block:hits": b"9", b"block:misses": b"1"}
+    mock_redis.return_value = redis
+
+    response = await client.get("/data/block_cache_stats")
+
+    assert response.status_code == 200
+    assert response.json()["block"]["rpc_saved"] == 9
+    assert response.json()["block"]["hit_ratio"] == 0.9
+
@@ -0,0 +1,142 @@
+# tests/test_db_worker.py
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from eth_abi import encode
+from eth_utils import keccak
+from sqlalchemy.dialects import postgresql
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions.db_worker import DatabaseWorker, Transaction, to_tx_rows
+from analyzer_transactions.decoder import SelectorIndex
+from analyzer_transactions.swap_record import SwapRecord
+
+RECIPIENT = "0x" + "33" * 20
+
+
+@pytest.fixture
+def db_worker():
+    with patch("analyzer_transactions.db_worker.get_engine") as mock_engine:
+        worker = DatabaseWorker()
+    conn = MagicMock()
+    begin = MagicMock()
+    begin.__aenter__ = AsyncMock(return_value=conn)
+    begin.__aexit__ = AsyncMock(return_value=False)
+    worker.engine = mock_engine.return_value
+    worker.engine.begin.return_value = begin
+    worker.conn = conn
+    return worker
+
+
+def make_result(hashes):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = hashes
+    return result
+
+
+def test_bulk_insert_statement(db_worker):
+    stmt = db_worker._build_insert([{"tx_hash": "0x01", "block_number": 1, "decoded_input": None}])
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (tx_hash) DO NOTHING" in sql
+    assert "RETURNING" in sql and "tx_hash" in sql.split("RETURNING")[1]
+
+
+@pytest.mark.asyncio
+async def test_save_transactions_chunks_and_pipelines(db_worker):
+    txs = [{"tx_hash": f"0x{i:02x}", "block_number": i, "decoded_input": {"method": "m"}} for i in range(5)]
+    txs.append(dict(txs[0]))  # duplicate inside the batch
+    txs.append({"block_number": 9})  # missing hash
+    db_worker.conn.execute = AsyncMock(side_effect=[make_result(["0x00", "0x01"]), make_result(["0x04"])])
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+
+    stats = await db_worker.save_transactions(redis, txs, chunk_size=3)
+
+    assert db_worker.conn.execute.await_count == 2
+    assert stats["provided"] == 7
+    assert stats["inserted"] == 3
+    assert stats["skipped"] == 4
+    assert stats["rows_per_sec"] > 0
+    pipe.execute.assert_awaited_once()
+    keys = [call.args[0] for call in pipe.setex.call_args_list]
+    # tx:{hash} is written by the analyzer in the REDIS_CODEC format, only the flags are set here
+    assert keys == ["tx:0x00:saved_to_db", "tx:0x01:saved_to_db", "tx:0x04:saved_to_db"]
+
+
+@pytest.mark.asyncio
+async def test_save_transactions_nothing_new(db_worker):
+    db_worker.conn.execute = AsyncMock(return_value=make_result([]))
+    redis = MagicMock()
+
+    stats = await db_worker.save_transactions(redis, [{"tx_hash": "0x01"}])
+
+    assert stats["inserted"] == 0 and stats["skipped"] == 1
+    redis.pipeline.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_delete_from_block(db_worker):
+    result = MagicMock(rowcount=3)
+    db_worker.conn.execute = AsyncMock(return_value=result)
+
+    assert await db_worker.delete_from_block(1000) == 3
+    sql = str(db_worker.conn.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM") and "block_number >=" in sql
+
+
+def nested_calldatas():
+    path = bytes.fromhex("11" * 20) + (500).to_bytes(3, "big") + bytes.fromhex("22" * 20)
+    exact_input = keccak(text="exactInput((bytes,address,uint256,uint256))")[:4] + encode(
+        ["(bytes,address,uint256,uint256)"], [(path, RECIPIENT, 10, 9)])
+    multicall = keccak(text="multicall(uint256,bytes[])")[:4] + encode(["uint256", "bytes[]"], [1, [exact_input]])
+    v3_swap = encode(["address", "uint256", "uint256", "bytes", "bool"], [RECIPIENT, 2**200, 5, path, True])
+    execute = keccak(text="execute(bytes,bytes[],uint256)")[:4] + encode(
+        ["bytes", "bytes[]", "uint256"], [bytes([0x00]), [v3_swap], 1])
+    return multicall, execute
+
+
+def executes_like_postgres():
+    """conn.execute side effect that binds the JSON column as the PostgreSQL driver would; every row is new."""
+    dialect = postgresql.dialect()
+    to_json = Transaction.__table__.c.decoded_input.type.bind_processor(dialect)
+    bound = []
+
+    async def execute(stmt):
+        params = stmt.compile(dialect=dialect).params
+        bound.extend(json.loads(to_json(value)) for name, value in params.items() if name.startswith("decoded_input"))
+        return make_result([value for name, value in params.items() if name.startswith("tx_hash")])
+
+    return execute, bound
+
+
+@pytest.mark.asyncio
+async def test_save_transactions_with_decoded_payloads(db_worker):
+    index = SelectorIndex([uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi,
+                           uniswap_universal_router_abi], ["exactInput", "multicall", "execute"])
+    multicall, execute = nested_calldatas()
+    exact_input = bytes(index.decode(multicall)["params"]["data"][0])
+    records = [SwapRecord(hash=bytes([i]) * 32, block_number=900, decoded_input=index.decode(calldata))
+               for i, calldata in enumerate((exact_input, multicall, execute))]
+    records[2].executed = {"status": 1, "gas_used": 150_000, "swaps": [{"protocol": "v3", "amount0": -2**200}]}
+    # The legacy dictionaries take the same path
+    rows = to_tx_rows(records[:2]) + to_tx_rows([{"hash": records[2].hash, "blockNumber": 900,
+                                                   "decoded_input": records[2].decoded_input,
+                                                   "executed": records[2].executed}])
+    execute_stmt, bound = executes_like_postgres()
+    db_worker.conn.execute = AsyncMock(side_effect=execute_stmt)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+
+    stats = await db_worker.save_transactions(redis, rows, chunk_size=2)
+
+    assert (stats["inserted"], db_worker.conn.execute.await_count) == (3, 2)
+    assert bound == [row["decoded_input"] for row in rows]
+    assert bound[0]["params"]["params"][0] == "0x" + "11" * 20 + "0001f4" + "22" * 20
+    assert bound[1]["calls"][0]["hops"][0]["fee"] == 500
+    assert bound[2]["commands"][0]["params"]["path"].startswith("0x")
+    assert bound[2]["executed"]["swaps"][0]["amount0"] == -2**200
@@ -0,0 +1,56 @@
+# tests/test_decode_executor.py
+import pytest
+from eth_abi import encode
+from eth_utils import keccak
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions.decode_executor import DecodeExecutor
+from analyzer_transactions.decoder import SelectorIndex
+
+ABIS = [uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi]
+METHODS = ["swapExactTokensForTokens", "exactInput", "multicall", "execute"]
+TOKEN_A = "0x" + "11" * 20
+TOKEN_B = "0x" + "22" * 20
+
+
+def calldatas():
+    v2 = keccak(text="swapExactTokensForTokens(uint256,uint256,address[],address,uint256)")[:4] + encode(
+        ["uint256", "uint256", "address[]", "address", "uint256"], [10, 9, [TOKEN_A, TOKEN_B], TOKEN_A, 1])
+    path = bytes.fromhex(TOKEN_A[2:]) + (500).to_bytes(3, "big") + bytes.fromhex(TOKEN_B[2:])
+    v3 = keccak(text="exactInput((bytes,address,uint256,uint256))")[:4] + encode(
+        ["(bytes,address,uint256,uint256)"], [(path, TOKEN_B, 5, 4)])
+    multicall = keccak(text="multicall(uint256,bytes[])")[:4] + encode(["uint256", "bytes[]"], [1, [v3, v2]])
+    malformed = v2[:40]
+    unknown = bytes.fromhex("a9059cbb") + encode(["address", "uint256"], [TOKEN_A, 1])
+    return [v2, v3, multicall, malformed, unknown]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+async def test_modes_return_the_same_decoded_inputs(mode):
+    expected_index = SelectorIndex(ABIS, METHODS)
+    expected = []
+    for calldata in calldatas():
+        try:
+            expected.append(expected_index.decode(calldata))
+        except Exception:
+            expected.append(None)
+
+    executor = DecodeExecutor(SelectorIndex(ABIS, METHODS), mode=mode, workers=2, batch_size=2,
+                              abis=ABIS, methods=METHODS)
+    try:
+        decoded = await executor.decode_many(calldatas())
+    finally:
+        executor.close()
+
+    assert decoded == expected
+    assert decoded[2]["calls"][0]["hops"] == [{"token_in": TOKEN_A, "fee": 500, "token_out": TOKEN_B}]
+    assert (executor.stats["decoded"], executor.stats["errors"], executor.stats["unknown"]) == (3, 1, 1)
+    assert executor.stats["batches"] == (0 if mode == "inline" else 3)
+
+
+def test_process_mode_needs_the_index_sources():
+    with pytest.raises(ValueError):
+        DecodeExecutor(SelectorIndex(ABIS, METHODS), mode="process")
+    with pytest.raises(ValueError):
+        DecodeExecutor(SelectorIndex(ABIS, METHODS), mode="gpu")
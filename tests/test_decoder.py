@@ -0,0 +1,169 @@
+# tests/test_decoder.py
+import pytest
+from eth_abi import encode
+from eth_utils import keccak
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions.decoder import SelectorIndex, decode_v3_path
+
+SWAP_METHODS = [
+    "swapExactETHForTokens",
+    "swapExactTokensForETH",
+    "swapExactTokensForTokens",
+    "exactInputSingle",
+    "exactInput",
+    "exactOutputSingle",
+    "exactOutput",
+]
+
+TOKEN_A = "0x" + "11" * 20
+TOKEN_B = "0x" + "22" * 20
+RECIPIENT = "0x" + "33" * 20
+
+
+@pytest.fixture
+def index():
+    return SelectorIndex([uniswap_v2_router_abi, uniswap_v3_router_abi], SWAP_METHODS)
+
+
+def test_index_contains_only_requested_methods(index):
+    names = {entry.name for entry in index.entries.values()}
+    assert names == set(SWAP_METHODS)
+    assert all(isinstance(selector, bytes) and len(selector) == 4 for selector in index.entries)
+
+
+def test_selectors_use_canonical_tuple_types(index):
+    selector = keccak(text="exactInputSingle((address,address,uint24,address,uint256,uint256,uint256,uint160))")[:4]
+    assert index.entries[selector].name == "exactInputSingle"
+
+
+def test_decode_v2_swap(index):
+    selector = keccak(text="swapExactTokensForTokens(uint256,uint256,address[],address,uint256)")[:4]
+    calldata = selector + encode(
+        ["uint256", "uint256", "address[]", "address", "uint256"],
+        [10**18, 5, [TOKEN_A, TOKEN_B], RECIPIENT, 1700000000],
+    )
+
+    decoded = index.decode(calldata)
+
+    assert decoded["method"] == "swapExactTokensForTokens"
+    assert decoded["params"]["amountIn"] == 10**18
+    assert decoded["params"]["path"] == (TOKEN_A, TOKEN_B)
+    assert index.decode("0x" + calldata.hex()) == decoded
+
+
+def test_decode_v3_swap(index):
+    selector = keccak(text="exactInput((bytes,address,uint256,uint256,uint256))")[:4]
+    path = bytes.fromhex(TOKEN_A[2:]) + (3000).to_bytes(3, "big") + bytes.fromhex(TOKEN_B[2:])
+    calldata = selector + encode(["(bytes,address,uint256,uint256,uint256)"], [(path, RECIPIENT, 1, 2, 3)])
+
+    decoded = index.decode(calldata)
+
+    assert decoded["method"] == "exactInput"
+    assert decoded["params"]["params"] == (path, RECIPIENT, 1, 2, 3)
+
+
+def test_unknown_selector(index):
+    assert index.get(b"\xde\xad\xbe\xef" + b"\x00" * 32) is None
+    assert index.decode(b"\xde\xad\xbe\xef") is None
+    assert b"" not in index
+
+
+@pytest.fixture
+def nested_index():
+    return SelectorIndex([uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi,
+                          uniswap_universal_router_abi], SWAP_METHODS + ["multicall", "execute"])
+
+
+def v3_path(*hops):
+    path = bytes.fromhex(hops[0][2:])
+    for fee, token in zip(hops[1::2], hops[2::2]):
+        path += fee.to_bytes(3, "big") + bytes.fromhex(token[2:])
+    return path
+
+
+def test_decode_v3_path_hops():
+    path = v3_path(TOKEN_A, 500, TOKEN_B, 3000, RECIPIENT)
+    assert decode_v3_path(path) == [
+        {"token_in": TOKEN_A, "fee": 500, "token_out": TOKEN_B},
+        {"token_in": TOKEN_B, "fee": 3000, "token_out": RECIPIENT},
+    ]
+    # exactOutput paths are encoded from the output token back
+    assert decode_v3_path(path, exact_output=True)[0] == {"token_in": RECIPIENT, "fee": 3000, "token_out": TOKEN_B}
+    with pytest.raises(ValueError):
+        decode_v3_path(path[:-1])
+
+
+def test_multicall_inner_calls_decoded_and_memoized(nested_index):
+    exact_input = keccak(text="exactInput((bytes,address,uint256,uint256))")[:4] + encode(
+        ["(bytes,address,uint256,uint256)"], [(v3_path(TOKEN_A, 500, TOKEN_B), RECIPIENT, 10, 9)])
+    unwrap = keccak(text="unwrapWETH9(uint256,address)")[:4] + encode(["uint256", "address"], [0, RECIPIENT])
+    multicall = keccak(text="multicall(uint256,bytes[])")[:4] + encode(["uint256", "bytes[]"], [1, [exact_input, unwrap]])
+
+    decoded = nested_index.decode(multicall)
+    again = nested_index.decode(multicall)
+
+    assert decoded["method"] == "multicall"
+    inner, unknown = decoded["calls"]
+    assert inner["method"] == "exactInput"
+    assert inner["hops"] == [{"token_in": TOKEN_A, "fee": 500, "token_out": TOKEN_B}]
+    assert unknown is None
+    assert again["calls"][0] is inner
+    assert nested_index.stats["memo_hits"] == 2
+
+
+def test_universal_router_commands(nested_index):
+    v3_swap = encode(["address", "uint256", "uint256", "bytes", "bool"],
+                     [RECIPIENT, 10**18, 5, v3_path(TOKEN_A, 3000, TOKEN_B), True])
+    v2_swap = encode(["address", "uint256", "uint256", "address[]", "bool"], [RECIPIENT, 7, 6, [TOKEN_B, TOKEN_A], False])
+    sub_plan = encode(["bytes", "bytes[]"], [bytes([0x08]), [v2_swap]])
+    unwrap = encode(["address", "uint256"], [RECIPIENT, 0])
+    calldata = keccak(text="execute(bytes,bytes[],uint256)")[:4] + encode(
+        ["bytes", "bytes[]", "uint256"], [bytes([0x00, 0xA1, 0x0C, 0x1F]), [v3_swap, sub_plan, unwrap, b""], 1])
+
+    commands = nested_index.decode(calldata)["commands"]
+
+    assert [command["command"] for command in commands] == ["V3_SWAP_EXACT_IN", "EXECUTE_SUB_PLAN", "UNWRAP_WETH", "0x1f"]
+    assert commands[0]["params"]["amountIn"] == 10**18
+    assert commands[0]["hops"] == [{"token_in": TOKEN_A, "fee": 3000, "token_out": TOKEN_B}]
+    assert commands[1]["allow_revert"] is True
+    assert commands[1]["commands"][0]["params"]["path"] == (TOKEN_B, TOKEN_A)
+
+
+def test_nesting_depth_is_limited(nested_index):
+    selector = keccak(text="multicall(bytes[])")[:4]
+    calldata = selector + encode(["bytes[]"], [[b""]])
+    for _ in range(5):
+        calldata = selector + encode(["bytes[]"], [[calldata]])
+
+    decoded = nested_index.decode(calldata)
+
+    depth = 0
+    while decoded is not None:
+        decoded = decoded["calls"][0]
+        depth += 1
+    assert depth == nested_index.max_depth + 1
+    assert nested_index.stats["too_deep"] == 1
+
+
+def test_memoized_payload_is_not_reused_at_a_shallower_depth():
+    index = SelectorIndex([uniswap_v3_router_abi], ["multicall"], max_depth=3)
+    selector = keccak(text="multicall(bytes[])")[:4]
+    inner = selector + encode(["bytes[]"], [[b""]])
+    for _ in range(2):
+        inner = selector + encode(["bytes[]"], [[inner]])
+
+    def depth_of(decoded):
+        depth = 0
+        while decoded is not None:
+            decoded = decoded["calls"][0]
+            depth += 1
+        return depth
+
+    # Deep first: the copy of ``inner`` at depth 2 is cut at max_depth
+    deep = index.decode(selector + encode(["bytes[]"], [[selector + encode(["bytes[]"], [[inner]])]]))
+    shallow = index.decode(selector + encode(["bytes[]"], [[inner]]))
+
+    assert depth_of(deep) == index.max_depth + 1
+    assert depth_of(shallow) == index.max_depth + 1
+    assert depth_of(shallow["calls"][0]) == index.max_depth
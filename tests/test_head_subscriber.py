@@ -0,0 +1,78 @@
+# tests/test_head_subscriber.py
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.head_subscriber import HeadSubscriber
+from analyzer_transactions.tip_follower import TipFollower
+from test_tip_follower import MemoryRedis
+
+
+async def wait_until(condition, timeout=5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_subscriber_receives_heads_and_reconnects(stub_rpc):
+    subscriber = HeadSubscriber(stub_rpc.ws_url, backoff=0.05)
+    stop = asyncio.Event()
+    task = asyncio.create_task(subscriber.run(stop))
+    try:
+        await asyncio.wait_for(subscriber.connected.wait(), 5)
+        await stub_rpc.push_head(1001)
+        await wait_until(lambda: subscriber.latest == 1001)
+        assert subscriber.event.is_set()
+
+        await stub_rpc.drop_subscribers()
+        await wait_until(lambda: subscriber.stats["connects"] == 2)
+        assert subscriber.stats["disconnects"] == 1
+        await stub_rpc.push_head(1002)
+        await wait_until(lambda: subscriber.latest == 1002)
+    finally:
+        stop.set()
+        await asyncio.wait_for(task, 5)
+
+    assert subscriber.stats["notifications"] == 2
+
+
+@pytest.mark.asyncio
+async def test_follower_reacts_to_new_heads_and_backfills_gaps(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    analyzer = AnalyzerTransactions(stub_rpc.url)
+    analyzer.save_batch_to_redis = AsyncMock(side_effect=lambda batch: len(batch))
+    processed = []
+
+    async def on_batch(batch):
+        processed.extend(tx["blockNumber"] for tx in batch)
+
+    follower = TipFollower(analyzer, MemoryRedis(), on_batch=on_batch)
+    subscriber = HeadSubscriber(stub_rpc.ws_url, backoff=0.05)
+    stop = asyncio.Event()
+    # Polling would take a minute: everything below is driven by notifications
+    run = asyncio.create_task(follower.run(stop=stop, subscriber=subscriber, fallback_interval=60))
+    try:
+        await asyncio.wait_for(subscriber.connected.wait(), 5)
+        await wait_until(lambda: 1000 in processed)
+        requests = stub_rpc.http_requests
+
+        await stub_rpc.push_head(1001)
+        await wait_until(lambda: 1001 in processed)
+        # The announced head replaces eth_blockNumber: one block request only
+        assert stub_rpc.http_requests == requests + 1
+
+        # Heads produced while the WebSocket is down are backfilled after the reconnect
+        await stub_rpc.drop_subscribers()
+        stub_rpc.head = 1004
+        await wait_until(lambda: 1004 in processed)
+    finally:
+        stop.set()
+        result = await asyncio.wait_for(run, 5)
+        await analyzer.rpc.close()
+
+    assert sorted(set(processed)) == [1000, 1001, 1002, 1003, 1004]
+    assert result["blocks"] == 5
+    assert result["max_latency_ms"] < 1000
@@ -0,0 +1,108 @@
+# tests/test_mempool.py
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.mempool import PendingSwapStream, PendingTxSubscriber, PENDING_STREAM_KEY
+from test_head_subscriber import wait_until
+
+
+@pytest.fixture
+def make_stream(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+
+    def factory(**kwargs):
+        analyzer = AnalyzerTransactions(stub_rpc.url)
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        redis = MagicMock()
+        redis.pipeline.return_value = pipe
+        return PendingSwapStream(analyzer, redis, **kwargs)
+
+    return factory
+
+
+def pending_transactions(stub_rpc, count):
+    # 20 txs per stub block, every 5th is a swap
+    return [stub_rpc.make_transaction(5000 + i // 20, i % 20) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_full_transactions_are_filtered_decoded_and_deduplicated(stub_rpc, make_stream):
+    stream = make_stream()
+    txs = pending_transactions(stub_rpc, 40)
+    try:
+        for tx in txs + txs[:10]:
+            stream.handle(tx)
+        written = await stream.flush()
+    finally:
+        await stream.analyzer.rpc.close()
+
+    assert written == 8
+    assert stream.stats["duplicates"] == 10
+    pipe = stream.redis.pipeline.return_value
+    assert pipe.xadd.call_count == 8
+    key, fields = pipe.xadd.call_args_list[0].args
+    assert key == PENDING_STREAM_KEY
+    assert pipe.xadd.call_args_list[0].kwargs == {"maxlen": 100_000, "approximate": True}
+    assert fields["method"] == "swapExactTokensForTokens"
+    assert len(json.loads(fields["params"])["path"]) == 2
+    marker, ttl, _ = pipe.setex.call_args_list[0].args
+    assert marker == f"pending:tx:{fields['hash']}" and ttl == 900
+
+
+@pytest.mark.asyncio
+async def test_hash_notifications_are_fetched_in_batches(stub_rpc, make_stream):
+    stream = make_stream(fetch_batch_size=25)
+    txs = pending_transactions(stub_rpc, 50)
+    await stub_rpc.push_pending(txs)  # registers the transactions on the node
+    try:
+        for tx in txs:
+            stream.handle(tx["hash"])
+        stream.handle("0x" + "ee" * 32)  # dropped from the pool meanwhile
+        assert stream.ready.is_set()
+        written = await stream.flush()
+    finally:
+        await stream.analyzer.rpc.close()
+
+    assert written == 10
+    assert stream.stats["fetched"] == 50
+    assert stream.stats["not_found"] == 1
+    # 51 hashes in JSON-RPC batches of RPC_BATCH_SIZE (20)
+    assert stub_rpc.http_requests == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("full_transactions", [True, False])
+async def test_stream_consumes_subscription(stub_rpc, make_stream, full_transactions):
+    stream = make_stream(flush_interval=0.01)
+    subscriber = PendingTxSubscriber(stream, stub_rpc.ws_url, full_transactions=full_transactions, backoff=0.05)
+    stop = asyncio.Event()
+    run = asyncio.create_task(stream.run(subscriber, stop=stop))
+    try:
+        await asyncio.wait_for(subscriber.connected.wait(), 5)
+        await stub_rpc.push_pending(pending_transactions(stub_rpc, 100))
+        await wait_until(lambda: stream.stats["written"] == 20)
+    finally:
+        stop.set()
+        stats = await asyncio.wait_for(run, 5)
+        await stream.analyzer.rpc.close()
+
+    assert stats["received"] == 100
+    assert stats["swaps"] == 20
+
+
+@pytest.mark.asyncio
+async def test_mined_swaps_clear_pending_markers(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    analyzer = AnalyzerTransactions("http://localhost:8545")
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    analyzer.redis = MagicMock()
+    analyzer.redis.pipeline.return_value = pipe
+
+    await analyzer.save_batch_to_redis([{"hash": "0x" + "ab" * 32, "decoded_input": None}])
+
+    pipe.delete.assert_called_once_with("pending:tx:0x" + "ab" * 32)
@@ -0,0 +1,193 @@
+# tests/test_node_limiter.py
+import os
+import time
+import uuid
+import pytest
+import pytest_asyncio
+import redis.asyncio as aioredis
+from unittest.mock import AsyncMock
+
+from analyzer_transactions.node_limiter import NodeHealth, NodeRateLimiter, NoAvailableNodeError
+
+# Тесты Lua-скриптов идут на настоящем Redis и пропускаются, если он недоступен
+LIMITER_REDIS_URL = os.getenv("LIMITER_TEST_REDIS_URL", "redis://localhost:6379/15")
+
+CONFIG = [
+    {"url": "http://slow", "per_second": 10, "per_day": 0},
+    {"url": "http://fast", "per_second": 10, "per_day": 0},
+    {"url": "http://lagging", "per_second": 10, "per_day": 0},
+]
+
+
+def make_limiter():
+    # Клиент Redis создаётся лениво, соединение в этих тестах не открывается
+    return NodeRateLimiter("redis://localhost:6379/0")
+
+
+def test_health_tracks_ewma_and_percentile():
+    health = NodeHealth(alpha=0.5, min_samples=4)
+    for latency in (0.1, 0.1, 0.1):
+        health.observe(latency)
+    assert health.percentile() is None
+    health.observe(1.0)
+    health.observe(0.2, error=True)
+
+    assert health.percentile() == 0.1
+    assert health.error_rate == 0.5
+    assert health.score() > health.latency
+
+
+def test_ranking_prefers_fast_reliable_nodes_at_the_head():
+    limiter = make_limiter()
+    for _ in range(10):
+        limiter.observe("http://slow", 0.5)
+        limiter.observe("http://fast", 0.05)
+        limiter.observe("http://lagging", 0.01)
+    limiter.observe_head("http://slow", 1000)
+    limiter.observe_head("http://fast", 1000)
+    limiter.observe_head("http://lagging", 990)
+
+    assert [node["url"] for node in limiter.ranked(CONFIG)] == ["http://fast", "http://slow", "http://lagging"]
+    assert [node["url"] for node in limiter.ranked(CONFIG, exclude=["http://fast"])] == ["http://slow", "http://lagging"]
+
+    # Ошибки отодвигают ноду назад
+    for _ in range(10):
+        limiter.observe("http://fast", 0.05, error=True)
+    assert limiter.ranked(CONFIG)[0]["url"] == "http://slow"
+
+
+def test_unmeasured_nodes_are_rotated_first():
+    limiter = make_limiter()
+    limiter.observe("http://slow", 0.5)
+    firsts = {limiter.ranked(CONFIG)[0]["url"] for _ in range(4)}
+    assert firsts == {"http://fast", "http://lagging"}
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paid_from_local_leases():
+    limiter = NodeRateLimiter("redis://localhost:6379/0", lease_size=50, lease_ttl=60)
+    limiter._config = [{"url": "http://node", "per_second": 20, "per_day": 1000}]
+    limiter._config_loaded_at = time.monotonic()
+    limiter._acquire_script = AsyncMock(return_value=[1, 0, 20])
+    limiter._release_script = AsyncMock()
+
+    for _ in range(45):
+        assert await limiter.acquire() == "http://node"
+
+    # Аренда не больше per_second ноды: 20 + 20 + 20 токенов на 45 запросов
+    assert limiter._acquire_script.await_count == 3
+    assert limiter._acquire_script.await_args.kwargs["args"] == [20, 1000, 20, 1]
+    assert limiter.lease_stats["local"] == 42
+
+    limiter.redis = AsyncMock()
+    await limiter.cooldown("http://node", 1)
+    release = limiter._release_script.await_args.kwargs
+    assert release["keys"] == ["node:http://node:bucket", "node:http://node:86400"]
+    assert release["args"] == [20, 1000, 15]
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_returned_before_a_new_one():
+    limiter = NodeRateLimiter("redis://localhost:6379/0", lease_size=10, lease_ttl=0)
+    limiter._config = [{"url": "http://node", "per_second": 0, "per_day": 500}]
+    limiter._config_loaded_at = time.monotonic()
+    limiter._acquire_script = AsyncMock(return_value=[1, 0, 10])
+    limiter._release_script = AsyncMock()
+
+    await limiter.acquire(cost=3)
+    await limiter.acquire(cost=3)
+
+    assert limiter._acquire_script.await_count == 2
+    assert limiter._release_script.await_args.kwargs["args"] == [0, 500, 7]
+
+
+def test_lease_is_capped_by_the_daily_quota():
+    limiter = NodeRateLimiter("redis://localhost:6379/0", lease_size=50)
+
+    assert limiter._lease_amount({"url": "http://a", "per_second": 0, "per_day": 30}, 1) == 30
+    assert limiter._lease_amount({"url": "http://a", "per_second": 20, "per_day": 1000}, 1) == 20
+    assert limiter._lease_amount({"url": "http://a", "per_second": 0, "per_day": 0}, 1) == 50
+    assert limiter._lease_amount({"url": "http://a", "per_second": 0, "per_day": 30}, 40) == 40
+
+
+@pytest.mark.asyncio
+async def test_skipped_nodes_keep_their_leases():
+    limiter = NodeRateLimiter("redis://localhost:6379/0", lease_size=10, lease_ttl=60)
+    limiter._config = [{"url": "http://a", "per_second": 10, "per_day": 0},
+                       {"url": "http://b", "per_second": 10, "per_day": 0}]
+    limiter._config_loaded_at = time.monotonic()
+    limiter.observe("http://a", 0.01)
+    limiter.observe("http://b", 0.1)
+    limiter._acquire_script = AsyncMock(side_effect=[[1, 0, 10], [2, 0, 10]])
+    limiter._release_script = AsyncMock()
+
+    for _ in range(7):
+        assert await limiter.acquire() == "http://a"
+    # У a осталось 3 токена: запрос на 5 вызовов уходит на b, аренда a сохраняется
+    assert await limiter.acquire(cost=5) == "http://b"
+    assert await limiter.acquire() == "http://a"
+
+    assert limiter._release_script.await_count == 0
+    assert (limiter._leases["http://a"].tokens, limiter._leases["http://b"].tokens) == (2, 5)
+    assert limiter.lease_stats["local"] == 7
+
+
+@pytest_asyncio.fixture
+async def live_limiter():
+    probe = aioredis.from_url(LIMITER_REDIS_URL, socket_connect_timeout=0.2)
+    try:
+        await probe.ping()
+    except Exception:
+        pytest.skip(f"No Redis at {LIMITER_REDIS_URL}")
+    finally:
+        await probe.aclose()
+    prefix = f"http://test-{uuid.uuid4().hex}"
+    limiter = NodeRateLimiter(LIMITER_REDIS_URL, lease_size=50, lease_ttl=60)
+    yield limiter, prefix
+    keys = [key async for key in limiter.redis.scan_iter(match=f"node:{prefix}*")]
+    if keys:
+        await limiter.redis.delete(*keys)
+    await limiter.redis.aclose()
+
+
+def use_config(limiter, config):
+    limiter._config = config
+    limiter._config_loaded_at = time.monotonic()
+
+
+@pytest.mark.asyncio
+async def test_lua_leases_what_is_left_of_the_daily_quota(live_limiter):
+    limiter, prefix = live_limiter
+    node = {"url": f"{prefix}-c", "per_second": 0, "per_day": 30}
+    use_config(limiter, [node])
+    # Другой процесс уже израсходовал 25 из 30 вызовов
+    await limiter.redis.set(limiter._node_key(node["url"], 86400), 25, ex=86400)
+
+    for _ in range(5):
+        assert await limiter.acquire(timeout=0) == node["url"]
+    with pytest.raises(NoAvailableNodeError):
+        await limiter.acquire(timeout=0)
+
+    assert int(await limiter.redis.get(limiter._node_key(node["url"], 86400))) == 30
+    assert limiter.lease_stats["leases"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lua_keeps_leases_of_rejected_nodes(live_limiter):
+    limiter, prefix = live_limiter
+    a = {"url": f"{prefix}-a", "per_second": 10, "per_day": 0}
+    b = {"url": f"{prefix}-b", "per_second": 10, "per_day": 0}
+    use_config(limiter, [a, b])
+    limiter.observe(a["url"], 0.01)
+    limiter.observe(b["url"], 0.1)
+
+    for _ in range(7):
+        assert await limiter.acquire(timeout=0) == a["url"]
+    # Корзина a пуста (всё в аренде), скрипт отказывает ей и выдаёт b
+    assert await limiter.acquire(cost=5, timeout=0) == b["url"]
+    assert await limiter.acquire(timeout=0) == a["url"]
+
+    assert limiter.lease_stats == {"local": 7, "leases": 2, "released": 0, "round_trips": 2}
+    assert (limiter._leases[a["url"]].tokens, limiter._leases[b["url"]].tokens) == (2, 5)
+    await limiter._release([a["url"], b["url"]])
+    assert float(await limiter.redis.hget(f"node:{a['url']}:bucket", "tokens")) >= 2
@@ -0,0 +1,123 @@
+# tests/test_pipeline.py
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+
+
+@pytest.fixture
+def make_analyzer(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("RPC_BATCH_SIZE", "10")
+    monkeypatch.setenv("RPC_MAX_CONCURRENCY", "2")
+    monkeypatch.setenv("STORAGE_BATCH_SIZE", "25")
+    def factory(url):
+        analyzer = AnalyzerTransactions(url)
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        analyzer.redis = MagicMock()
+        analyzer.redis.pipeline.return_value = pipe
+        return analyzer
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_process_blocks_streams_bounded_batches(stub_rpc, make_analyzer):
+    analyzer = make_analyzer(stub_rpc.url)
+    batches = []
+    requests_at_first_batch = []
+
+    async def on_batch(batch):
+        if not batches:
+            requests_at_first_batch.append(stub_rpc.http_requests)
+        batches.append(batch)
+
+    try:
+        summary = await analyzer.process_blocks(range(1, 201), on_batch=on_batch)
+    finally:
+        await analyzer.rpc.close()
+
+    # 20 txs per block, every 5th is a swap
+    assert summary == {"blocks": 200, "failed_blocks": 0, "swaps": 800, "batches": 32}
+    assert all(len(batch) <= 25 for batch in batches)
+    assert sum(len(batch) for batch in batches) == 800
+    assert all(tx["decoded_input"]["method"] == "swapExactTokensForTokens" for batch in batches for tx in batch)
+    # Results are stored before the last block is fetched
+    assert requests_at_first_batch[0] < 20
+    assert analyzer.redis_stats["batches"] == 32
+
+
+@pytest.mark.asyncio
+async def test_memory_stays_bounded_over_a_large_range(stub_rpc, make_analyzer, monkeypatch):
+    monkeypatch.setenv("BLOCK_CACHE", "0")
+    stub_rpc.head = 2000
+    analyzer = make_analyzer(stub_rpc.url)
+    processed = set()
+    ahead = []
+
+    async def on_batch(batch):
+        processed.update(tx.block_number for tx in batch)
+        # Blocks requested from the node but not yet turned into stored swaps
+        ahead.append(stub_rpc.rpc_calls - len(processed))
+        await asyncio.sleep(0.001)  # Slow storage
+
+    try:
+        summary = await analyzer.process_blocks(range(1, 1501), on_batch=on_batch)
+    finally:
+        await analyzer.rpc.close()
+
+    assert summary["swaps"] == 1500 * 4
+    # Fetcher bound (2 requests x 10 blocks) plus the blocks of one storage batch (25 swaps, 4 per block)
+    assert max(ahead) <= 2 * 10 + 25 // 4 + 1
+
+
+@pytest.mark.asyncio
+async def test_process_blocks_skips_failed_blocks(stub_rpc, make_analyzer):
+    stub_rpc.missing_blocks = {5}
+    analyzer = make_analyzer(stub_rpc.url)
+    try:
+        summary = await analyzer.process_blocks(range(1, 11))
+        assert 5 in analyzer.failed_blocks
+        # A long-lived analyzer only keeps the failures of the last call
+        again = await analyzer.process_blocks(range(11, 21))
+    finally:
+        await analyzer.rpc.close()
+
+    assert summary["failed_blocks"] == 1
+    assert summary["swaps"] == 9 * 4
+    assert (again["failed_blocks"], analyzer.failed_blocks) == (0, {})
+
+
+@pytest.mark.asyncio
+async def test_raw_prefilter_matches_formatted_path(stub_rpc, make_analyzer):
+    analyzer = make_analyzer(stub_rpc.url)
+    raw_block = stub_rpc.make_block(42)
+    raw_block["transactions"].append(dict(raw_block["transactions"][0], to=None, hash="0x" + "ff" * 32))
+
+    block = analyzer._format_block(raw_block)
+    formatted = [tx async for tx in analyzer.filter_transactions(block["transactions"])]
+    raw = analyzer.select_raw_swaps(raw_block)
+
+    assert [tx["hash"] for tx in raw] == [tx["hash"] for tx in formatted if tx["to"]]
+    assert raw[0] == block["transactions"][0]
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_are_flushed_after_every_range(stub_rpc, make_analyzer, monkeypatch):
+    monkeypatch.setenv("BLOCK_CACHE_LOCAL_MB", "16")
+    analyzer = make_analyzer(stub_rpc.url)
+    pipe = analyzer.redis.pipeline.return_value
+
+    try:
+        await analyzer.process_blocks(range(1, 11))
+        await analyzer.process_blocks(range(1, 11))
+    finally:
+        await analyzer.rpc.close()
+
+    # The shared analyzer stays open: the totals are updated without close()
+    flushed = [call.args for call in pipe.hincrby.call_args_list]
+    assert ("block_cache:stats", "block:misses", 10) in flushed
+    assert ("block_cache:stats", "block:hits", 10) in flushed
+    assert analyzer.block_cache.stats["hits"] == 0
@@ -0,0 +1,119 @@
+# tests/test_receipts.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from eth_abi import encode
+from eth_utils import keccak
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.db_worker import to_tx_rows
+from analyzer_transactions.receipts import ReceiptFetcher, SwapEventDecoder
+from analyzer_transactions.rpc_client import RpcClient
+from analyzer_transactions.swap_record import SwapRecord
+
+POOL = "0x88e6a0c2ddd26feeb64f039a2c41296fcb3f5640"
+SENDER = "0x" + "11" * 20
+RECIPIENT = "0x" + "22" * 20
+
+
+def topic_address(address):
+    return "0x" + "00" * 12 + address[2:]
+
+
+def test_decodes_v2_and_v3_swap_events():
+    decoder = SwapEventDecoder()
+    v2_log = {
+        "address": POOL,
+        "topics": ["0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex(),
+                   topic_address(SENDER), topic_address(RECIPIENT)],
+        "data": "0x" + encode(["uint256"] * 4, [10**18, 0, 0, 2500 * 10**6]).hex(),
+        "logIndex": "0x7",
+    }
+    v3_log = {
+        "address": POOL,
+        "topics": ["0x" + keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)").hex(),
+                   topic_address(SENDER), topic_address(RECIPIENT)],
+        "data": "0x" + encode(["int256", "int256", "uint160", "uint128", "int24"],
+                              [-2500 * 10**6, 10**18, 2**96, 10**20, -200_000]).hex(),
+        "logIndex": "0x8",
+    }
+    transfer_log = {"address": POOL, "topics": ["0x" + keccak(text="Transfer(address,address,uint256)").hex()],
+                    "data": "0x"}
+
+    v2 = decoder.decode_log(v2_log)
+    v3 = decoder.decode_log(v3_log)
+
+    # PancakeSwap pairs emit the same event as Uniswap V2
+    assert (len(decoder), v2["protocol"], v3["protocol"]) == (2, "v2", "v3")
+    assert (v2["sender"], v2["to"], v2["amount0In"], v2["amount1Out"], v2["log_index"]) == (
+        SENDER, RECIPIENT, 10**18, 2500 * 10**6, 7)
+    assert (v3["recipient"], v3["amount0"], v3["amount1"], v3["tick"], v3["pool"]) == (
+        RECIPIENT, -2500 * 10**6, 10**18, -200_000, POOL)
+    assert decoder.decode_log(transfer_log) is None
+
+
+@pytest.mark.asyncio
+async def test_one_receipt_call_per_block(stub_rpc):
+    client = RpcClient(stub_rpc.url, batch_size=20)
+    fetcher = ReceiptFetcher(client)
+    blocks = [stub_rpc.make_block(number) for number in (900, 901)]
+    batch = [SwapRecord.from_tx(tx) for block in blocks for tx in block["transactions"] if tx["to"].startswith("0x7a25")]
+    try:
+        enriched = await fetcher.enrich(batch)
+    finally:
+        await client.close()
+
+    assert enriched == len(batch) == 8
+    assert (stub_rpc.rpc_calls, stub_rpc.http_requests, fetcher.block_receipts_supported) == (2, 1, True)
+    executed = batch[0].executed
+    assert (executed["status"], executed["gas_used"]) == (1, 120_000)
+    assert executed["swaps"][0]["protocol"] == "v2"
+    assert executed["swaps"][0]["sender"] == "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_transaction_receipts(stub_rpc):
+    stub_rpc.block_receipts = False
+    client = RpcClient(stub_rpc.url, batch_size=20)
+    fetcher = ReceiptFetcher(client)
+    block = stub_rpc.make_block(900)
+    batch = [SwapRecord.from_tx(tx) for tx in block["transactions"][:3]]
+    try:
+        await fetcher.enrich(batch)
+        calls_after_first = stub_rpc.rpc_calls
+        await fetcher.enrich(batch)
+    finally:
+        await client.close()
+
+    assert fetcher.block_receipts_supported is False
+    # 1 rejected eth_getBlockReceipts + 3 receipts, then receipts only
+    assert (calls_after_first, stub_rpc.rpc_calls) == (4, 7)
+    assert all(record.executed["status"] == 1 for record in batch)
+    assert [len(record.executed["swaps"]) for record in batch] == [1, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_process_blocks_stores_executed_amounts(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("BLOCK_CACHE", "0")
+    monkeypatch.setenv("RECEIPTS", "1")
+    analyzer = AnalyzerTransactions(stub_rpc.url)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    analyzer.redis = MagicMock()
+    analyzer.redis.pipeline.return_value = pipe
+    batches = []
+
+    async def on_batch(batch):
+        batches.append(batch)
+
+    try:
+        summary = await analyzer.process_blocks(range(1, 6), on_batch=on_batch)
+    finally:
+        await analyzer.rpc.close()
+
+    assert summary["swaps"] == 20
+    assert analyzer.receipts.stats["block_calls"] == 5
+    rows = to_tx_rows(batches[0])
+    decoded = rows[0]["decoded_input"]
+    assert decoded["method"] == "swapExactTokensForTokens"
+    assert decoded["executed"]["swaps"][0]["amount1Out"] == decoded["params"]["amountOutMin"] + 1
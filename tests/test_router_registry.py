@@ -0,0 +1,70 @@
+# tests/test_router_registry.py
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from analyzer_transactions.router_registry import RouterRegistry, REDIS_ROUTERS_KEY
+
+UNISWAP_V2 = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+OTHER = "0x" + "ab" * 20
+
+
+def test_from_config_seeds_known_routers(monkeypatch):
+    monkeypatch.setenv("ROUTER_ADDRESSES", OTHER)
+    monkeypatch.setenv("ROUTER_FILTER", "1")
+    registry = RouterRegistry.from_config()
+
+    assert bytes.fromhex(UNISWAP_V2[2:].lower()) in registry
+    assert all(isinstance(address, bytes) and len(address) == 20 for address in registry.addresses)
+    assert isinstance(registry.addresses, frozenset)
+    assert registry.allows(UNISWAP_V2)
+    assert registry.allows(UNISWAP_V2.lower())
+    assert registry.allows(OTHER)
+    assert not registry.allows("0x" + "cd" * 20)
+    assert not registry.allows(None)
+    assert not registry.allows("0xnot-hex")
+
+
+def test_filter_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("ROUTER_FILTER", raising=False)
+    registry = RouterRegistry.from_config()
+
+    assert len(registry) > 0 and not registry.active
+    assert registry.allows("0x" + "cd" * 20)
+    assert bytes.fromhex("1111111254EEB25477B68fb85Ed929f73A960582") not in registry
+
+
+def test_disabled_or_empty_registry_allows_everything():
+    assert RouterRegistry([UNISWAP_V2], enabled=False).allows("0x" + "cd" * 20)
+    assert RouterRegistry([]).allows("0x" + "cd" * 20)
+
+
+def test_invalid_addresses_are_skipped():
+    registry = RouterRegistry([UNISWAP_V2, "0x1234", "not-an-address"])
+    assert len(registry) == 1
+
+
+@pytest.mark.asyncio
+async def test_hot_reload_from_redis():
+    registry = RouterRegistry([UNISWAP_V2], reload_interval=0)
+    redis = MagicMock()
+    redis.get = AsyncMock(return_value=json.dumps([{"name": "new", "address": OTHER}]))
+
+    assert not registry.allows(OTHER)
+    await registry.maybe_refresh(redis)
+
+    redis.get.assert_awaited_once_with(REDIS_ROUTERS_KEY)
+    assert registry.allows(OTHER)
+    assert registry.allows(UNISWAP_V2)
+
+
+@pytest.mark.asyncio
+async def test_reload_is_throttled():
+    registry = RouterRegistry([UNISWAP_V2], reload_interval=3600)
+    redis = MagicMock()
+    redis.get = AsyncMock(return_value=None)
+
+    await registry.maybe_refresh(redis)
+    await registry.maybe_refresh(redis)
+
+    assert redis.get.await_count == 1
@@ -0,0 +1,192 @@
+# tests/test_rpc_batch.py
+import time
+import pytest
+from unittest.mock import patch
+from web3.types import HexBytes
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.rpc_client import RpcClient, RpcError, ScheduledRpcClient
+from stub_rpc_server import StubRpcServer
+
+
+@pytest.mark.asyncio
+async def test_blocks_packed_into_batches(stub_rpc):
+    client = RpcClient(stub_rpc.url, batch_size=10)
+    try:
+        blocks = await client.get_blocks(list(range(900, 925)))
+    finally:
+        await client.close()
+
+    assert sorted(blocks) == list(range(900, 925))
+    assert all(int(block["number"], 16) == number for number, block in blocks.items())
+    assert stub_rpc.http_requests == 3
+    assert client.batch_supported is True
+
+
+@pytest.mark.asyncio
+async def test_per_item_errors_mapped_to_block_numbers(stub_rpc):
+    stub_rpc.missing_blocks = {903}
+    client = RpcClient(stub_rpc.url, batch_size=10)
+    try:
+        blocks = await client.get_blocks([901, 902, 903, 904, stub_rpc.head + 1])
+    finally:
+        await client.close()
+
+    assert isinstance(blocks[903], RpcError)
+    assert blocks[903].code == -32000
+    assert isinstance(blocks[stub_rpc.head + 1], RpcError)
+    assert all(isinstance(blocks[number], dict) for number in (901, 902, 904))
+
+
+@pytest.mark.asyncio
+async def test_fallback_to_single_requests_when_batches_rejected(stub_rpc):
+    stub_rpc.reject_batches = True
+    client = RpcClient(stub_rpc.url, batch_size=10)
+    try:
+        blocks = await client.get_blocks(list(range(900, 920)))
+    finally:
+        await client.close()
+
+    assert all(isinstance(block, dict) for block in blocks.values())
+    assert client.batch_supported is False
+    assert client.stats["fallbacks"] == 1
+    # One rejected batch, then single calls only
+    assert stub_rpc.http_requests == 1 + 20
+
+
+@pytest.mark.asyncio
+async def test_analyzer_formats_batched_blocks(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("RPC_BATCH_SIZE", "8")
+    monkeypatch.setenv("BLOCK_CACHE", "0")  # no eth_blockNumber lookup for the cache
+    stub_rpc.missing_blocks = {905}
+    analyzer = AnalyzerTransactions(stub_rpc.url)
+    try:
+        data_blocks = await analyzer.get_slice_blocks(900, 910)
+    finally:
+        await analyzer.close()
+
+    assert [block["number"] for block in data_blocks] == [n for n in range(900, 911) if n != 905]
+    assert isinstance(data_blocks[0]["transactions"][0]["input"], HexBytes)
+    assert 905 in analyzer.failed_blocks
+    assert stub_rpc.http_requests == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_throughput(stub_rpc):
+    stub_rpc.latency = 0.005
+    block_numbers = list(range(800, 900))
+    measurements = {}
+    for batch_size in (1, 20):
+        stub_rpc.http_requests = 0
+        client = RpcClient(stub_rpc.url, batch_size=batch_size)
+        start = time.perf_counter()
+        try:
+            blocks = await client.get_blocks(block_numbers)
+        finally:
+            await client.close()
+        elapsed = time.perf_counter() - start
+        assert len(blocks) == len(block_numbers)
+        measurements[batch_size] = (stub_rpc.http_requests, elapsed)
+        print(f"batch_size={batch_size}: {stub_rpc.http_requests} HTTP requests, "
+              f"{elapsed:.3f}s, {len(block_numbers) / elapsed:.0f} blocks/s")
+
+    assert measurements[1][0] == len(block_numbers)
+    assert measurements[20][0] == len(block_numbers) // 20
+
+
+class RotatingLimiter:
+    """NodeRateLimiter stand-in: round-robin over the nodes not on cooldown."""
+
+    def __init__(self, urls, hedge_delay=None):
+        self.urls = urls
+        self.granted = []
+        self.cooled = []
+        self.observed = []
+        self.heads = {}
+        self._hedge_delay = hedge_delay
+        self._next = 0
+
+    def observe(self, node_url, latency, error=False):
+        self.observed.append((node_url, error))
+
+    def observe_head(self, node_url, head):
+        self.heads[node_url] = head
+
+    def hedge_delay(self, node_url):
+        return self._hedge_delay
+
+    async def acquire(self, cost=1, timeout=30.0, exclude=()):
+        candidates = [url for url in self.urls if url not in self.cooled and url not in exclude]
+        url = candidates[self._next % len(candidates)]
+        self._next += 1
+        self.granted.append((url, cost))
+        return url
+
+    async def cooldown(self, node_url, seconds):
+        self.cooled.append(node_url)
+
+
+@pytest.mark.asyncio
+async def test_scheduled_client_spreads_requests_and_skips_throttled_node(stub_rpc):
+    throttled = StubRpcServer(max_concurrency=0)  # Answers every request with HTTP 429
+    await throttled.start()
+    limiter = RotatingLimiter([throttled.url, stub_rpc.url])
+    client = ScheduledRpcClient(limiter, batch_size=10)
+    try:
+        blocks = await client.get_blocks(list(range(900, 940)))
+    finally:
+        await client.close()
+        await throttled.stop()
+
+    assert sorted(blocks) == list(range(900, 940))
+    assert limiter.cooled == [throttled.url]
+    # Каждый запрос списывает квоту по числу вызовов в нём
+    assert limiter.granted[0] == (throttled.url, 10)
+    assert [cost for url, cost in limiter.granted if url == stub_rpc.url] == [10, 10, 10, 10]
+    assert client.stats["retries"] == 1
+
+    assert (throttled.url, True) in limiter.observed
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_answered_by_second_node(stub_rpc):
+    slow = StubRpcServer(latency=0.5)
+    await slow.start()
+    limiter = RotatingLimiter([slow.url, stub_rpc.url], hedge_delay=0.05)
+    client = ScheduledRpcClient(limiter, hedge=True)
+    try:
+        started = time.monotonic()
+        head = await client.call("eth_blockNumber")
+        elapsed = time.monotonic() - started
+    finally:
+        await client.close()
+        await slow.stop()
+
+    assert int(head, 16) == stub_rpc.head
+    assert elapsed < 0.4
+    assert (client.stats["hedged"], client.stats["hedge_wins"]) == (1, 1)
+    assert limiter.heads == {stub_rpc.url: stub_rpc.head}
+
+
+@pytest.mark.asyncio
+async def test_scheduled_client_tracks_batch_support_per_node(stub_rpc):
+    no_batches = StubRpcServer(reject_batches=True)
+    await no_batches.start()
+    limiter = RotatingLimiter([no_batches.url, stub_rpc.url])
+    client = ScheduledRpcClient(limiter, batch_size=10)
+    try:
+        with patch("analyzer_transactions.rpc_client.logger") as logger:
+            blocks = await client.get_blocks(list(range(900, 940)))
+    finally:
+        await client.close()
+        await no_batches.stop()
+
+    assert all(isinstance(block, dict) for block in blocks.values())
+    assert client.batch_support == {no_batches.url: False, stub_rpc.url: True}
+    # Отказ одной ноды не выключает пакеты у другой; её порции идут одиночными вызовами без повторной квоты
+    assert stub_rpc.http_requests == 2
+    assert no_batches.http_requests == 1 + 20
+    assert [cost for url, cost in limiter.granted] == [10, 10, 10, 10]
+    assert client.stats["fallbacks"] == 1
+    assert no_batches.url in logger.warning.call_args.args[0]
@@ -0,0 +1,94 @@
+# tests/test_staging.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from analyzer_transactions.staging import STAGING_KEY_PREFIX, StagedRowsMissingError, SwapStaging, staging_key
+from analyzer_transactions.swap_record import SwapRecord
+from tasks import analyzer_tasks
+from tasks.runtime import AsyncRuntime
+from tests.test_tip_follower import MemoryRedis
+
+
+def records(block_number, count):
+    return [SwapRecord(hash=bytes([block_number % 256, i]) * 16, block_number=block_number,
+                       decoded_input={"method": "exactInput", "params": {"amountIn": 2**200 + i}})
+            for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_staged_batches_round_trip():
+    redis = MemoryRedis()
+    staging = SwapStaging(redis)
+    key = staging_key("task-1")
+    rows = [{"tx_hash": "0x" + "ab" * 32, "block_number": 900, "decoded_input": {"amountIn": 2**255}}]
+
+    assert await staging.append(key, rows) == 1
+    assert await staging.append(key, []) == 0
+    await staging.append(key, rows * 2)
+
+    assert key == STAGING_KEY_PREFIX + "task-1"
+    assert [batch async for batch in staging.batches(key)] == [rows, rows * 2]
+    await staging.delete(key)
+    assert [batch async for batch in staging.batches(key)] == []
+
+
+@pytest.fixture
+def memory_runtime():
+    redis = MemoryRedis()
+    runtime = AsyncRuntime()
+    runtime.redis = AsyncMock(return_value=redis)
+    with patch.object(analyzer_tasks, "runtime", runtime):
+        yield runtime, redis
+    runtime.stop()
+
+
+def test_analyze_blocks_hands_over_a_reference(memory_runtime):
+    runtime, redis = memory_runtime
+
+    async def fake_analyzer_main(depth_blocks, on_batch=None, shared=False):
+        await on_batch(records(900, 3))
+        await on_batch(records(901, 2))
+        return []
+
+    db_worker = MagicMock()
+    db_worker.save_transactions = AsyncMock(side_effect=lambda redis, rows: {
+        "provided": len(rows), "inserted": len(rows), "skipped": 0, "elapsed": 0.5, "rows_per_sec": 0.0})
+    with patch.object(analyzer_tasks, "analyzer_main", fake_analyzer_main), \
+            patch.object(analyzer_tasks, "_ensure_swap_table", AsyncMock()), \
+            patch.object(analyzer_tasks.save_transactions_to_db, "delay") as delay, \
+            patch.object(analyzer_tasks, "DatabaseWorker", return_value=db_worker):
+        delay.return_value.id = "save-id"
+        result = analyzer_tasks.analyze_blocks.apply(args=(3,), task_id="analyze-1").get()
+        reference = delay.call_args.args[0]
+        stats = analyzer_tasks.save_transactions_to_db.apply(args=(reference,)).get()
+
+    key = STAGING_KEY_PREFIX + "analyze-1"
+    assert result == {"status": "completed", "count": 5, "staging_key": key, "save_task_id": "save-id"}
+    assert reference == {"key": key, "count": 5}
+    saved = [call.args[1] for call in db_worker.save_transactions.await_args_list]
+    assert [len(rows) for rows in saved] == [3, 2]
+    assert saved[1][0]["block_number"] == 901
+    assert saved[0][2]["decoded_input"]["params"]["amountIn"] == 2**200 + 2
+    assert (stats["provided"], stats["inserted"], stats["batches"], stats["elapsed"]) == (5, 5, 2, 1.0)
+    assert key not in redis.lists
+
+
+def test_expired_staging_list_is_not_reported_as_saved(memory_runtime):
+    runtime, redis = memory_runtime
+    key = staging_key("analyze-2")
+    runtime.run(SwapStaging(redis).append(key, [{"tx_hash": "0x" + "ab" * 32, "block_number": 900,
+                                                 "decoded_input": None}]))
+    db_worker = MagicMock()
+    db_worker.save_transactions = AsyncMock(side_effect=lambda redis, rows: {
+        "provided": len(rows), "inserted": len(rows), "skipped": 0, "elapsed": 0.5})
+
+    with patch.object(analyzer_tasks, "DatabaseWorker", return_value=db_worker):
+        # Задача анализа записала 3 строки, но до сохранения дожила одна
+        with pytest.raises(StagedRowsMissingError):
+            analyzer_tasks.save_transactions_to_db.apply(args=({"key": key, "count": 3},)).get()
+        assert key in redis.lists
+
+        stats = analyzer_tasks.save_transactions_to_db.apply(args=({"key": key, "count": 1},)).get()
+
+    assert stats["provided"] == 1
+    assert key not in redis.lists
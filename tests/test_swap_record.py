@@ -0,0 +1,115 @@
+# tests/test_swap_record.py
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from hexbytes import HexBytes
+
+from abis import uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi, uniswap_universal_router_abi
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.db_worker import to_tx_rows
+from analyzer_transactions.decoder import SelectorIndex
+from analyzer_transactions.swap_record import SwapRecord, SwapBatch, json_safe
+from tests.test_db_worker import db_worker, executes_like_postgres, nested_calldatas
+
+TX_HASH = "0x" + "ab" * 32
+SENDER = "0x" + "11" * 20
+ROUTER = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+DECODED = {"method": "swapExactTokensForTokens", "params": {"amountIn": 10}}
+
+
+def web3_tx(**overrides):
+    tx = {
+        "hash": HexBytes(TX_HASH),
+        "blockNumber": 900,
+        "transactionIndex": 3,
+        "from": SENDER,
+        "to": ROUTER,
+        "input": HexBytes("0x38ed1739" + "00" * 64),
+        "gas": 200_000,
+        "r": HexBytes("0x" + "01" * 32),
+        "accessList": [],
+    }
+    tx.update(overrides)
+    return tx
+
+
+def test_from_tx_keeps_only_the_swap_fields():
+    record = SwapRecord.from_tx(web3_tx(), DECODED)
+    raw = SwapRecord.from_tx({"hash": TX_HASH, "blockNumber": "0x384", "transactionIndex": "0x3", "from": SENDER,
+                              "to": ROUTER, "input": "0x38ed1739" + "00" * 64}, DECODED)
+
+    assert record == raw
+    assert (record.hash, record.method_id) == (bytes.fromhex("ab" * 32), bytes.fromhex("38ed1739"))
+    # Callbacks written against the former dictionaries
+    assert (record["hash"], record["blockNumber"], record["decoded_input"]["method"]) == (
+        record.hash, 900, "swapExactTokensForTokens")
+    assert (record.get("gas"), "blockNumber" in record, "gas" in record) == (None, True, False)
+    with pytest.raises(KeyError):
+        record["gas"]
+    assert not hasattr(record, "__dict__")
+
+
+def test_to_dict_serializes_like_the_former_dictionary():
+    record = SwapRecord.from_tx(web3_tx(), DECODED)
+    record.executed = {"status": 1, "gas_used": 120_000, "swaps": []}
+
+    key, payload = AnalyzerTransactions._serialize_tx(record)
+
+    assert key == f"tx:{TX_HASH}"
+    assert record.to_dict() == {
+        "hash": TX_HASH, "blockNumber": 900, "transactionIndex": 3, "from": SENDER, "to": ROUTER,
+        "methodId": "0x38ed1739", "decoded_input": DECODED, "executed": record.executed,
+    }
+    assert '"r"' not in payload and '"executed"' in payload
+
+
+def test_batch_round_trip_and_rows():
+    records = [
+        SwapRecord.from_tx(web3_tx(), DECODED),
+        SwapRecord.from_tx(web3_tx(hash=HexBytes("0x" + "cd" * 32), blockNumber=901), None),
+        SwapRecord.from_tx(web3_tx(hash=HexBytes("0x" + "ef" * 32), blockNumber=None, transactionIndex=None), DECODED),
+    ]
+    records[0].executed = {"status": 1}
+
+    batch = SwapBatch.from_records(records)
+
+    assert len(batch) == 3 and list(batch) == records and batch[-1] == records[2]
+    assert batch.hashes_by_block() == {900: [TX_HASH], 901: ["0x" + "cd" * 32]}
+    rows = to_tx_rows(records)
+    assert rows == batch.rows()
+    assert rows[0] == {"tx_hash": TX_HASH, "block_number": 900, "decoded_input": {**DECODED, "executed": {"status": 1}}}
+    assert (rows[1]["decoded_input"], rows[2]["block_number"]) == (None, None)
+    with pytest.raises(ValueError):
+        batch.append(SwapRecord(hash=b"\x01" * 20))
+
+
+def test_json_safe_converts_nested_bytes_and_tuples():
+    assert json_safe({"a": (b"\x01", [HexBytes("0x02"), {"b": bytearray(b"\x03")}]), "n": 2**256}) == {
+        "a": ["0x01", ["0x02", {"b": "0x03"}]], "n": 2**256}
+
+
+@pytest.mark.asyncio
+async def test_multicall_and_execute_swaps_are_saved(db_worker):
+    index = SelectorIndex([uniswap_v2_router_abi, uniswap_v3_router_abi, uniswap_v3_router02_abi,
+                           uniswap_universal_router_abi], ["exactInput", "multicall", "execute"])
+    records = [SwapRecord.from_tx(web3_tx(hash=HexBytes(bytes([i]) * 32), input=HexBytes(calldata)),
+                                  index.decode(calldata))
+               for i, calldata in enumerate(nested_calldatas())]
+    execute_stmt, bound = executes_like_postgres()
+    db_worker.conn.execute = AsyncMock(side_effect=execute_stmt)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+
+    stats = await db_worker.save_transactions(redis, to_tx_rows(records))
+
+    assert stats["inserted"] == 2
+    multicall, execute = bound
+    assert multicall["params"]["data"][0].startswith("0x") and multicall["calls"][0]["params"]["params"][0] == \
+        "0x" + "11" * 20 + "0001f4" + "22" * 20
+    assert execute["commands"][0]["params"]["amountIn"] == 2**200
+    assert execute["params"]["commands"] == "0x00"
+    # Memoized inner results shared with the index are left as decoded
+    assert isinstance(records[0].decoded_input["calls"][0]["params"]["params"], tuple)
+    assert json.loads(AnalyzerTransactions._serialize_tx(records[1])[1])["decoded_input"]["params"]["commands"] == "0x00"
@@ -61,6 +61,30 @@ def test_get_task_status_processing(mock_async_result, mock_redis):
     }
 
 
+@patch("api.endpoints.tasks.redis_client")
+@patch("api.endpoints.tasks.AsyncResult")
+def test_get_task_status_backfill_progress(mock_async_result, mock_redis):
+    mock_async_result.return_value.ready.return_value = False
+    hashes = {
+        "backfill:job-id": {b"start_block": b"1000", b"end_block": b"1999", b"shards": b"1",
+                            b"status": b"running", b"created_at": b"100.0", b"updated_at": b"104.0"},
+        "backfill:job-id:shards": {b"1000-1999": b'{"status": "running", "attempts": 2}'},
+        "backfill:job-id:chunks": {b"1000-1099": b"3", b"1100-1199": b"5"},
+    }
+    mock_redis.hgetall.side_effect = lambda key: hashes[key]
+
+    client = TestClient(app)
+    with patch("analyzer_transactions.backfill.time.time", return_value=110.0):
+        response = client.get("/status/job-id")
+
+    assert response.status_code == 200
+    progress = response.json()["progress"]
+    assert response.json()["status"] == "processing"
+    assert (progress["blocks_done"], progress["blocks_total"], progress["percent"]) == (200, 1000, 20.0)
+    assert (progress["swaps"], progress["chunks_done"]) == (8, 2)
+    assert progress["shards_by_status"] == {"running": 1}
+    assert progress["blocks_per_second"] == 20.0
+
 @patch("api.endpoints.tasks.redis_client")
 def test_health_check_success(mock_redis):
     mock_redis.ping.return_value = True
@@ -0,0 +1,189 @@
+# tests/test_tip_follower.py
+import pytest
+from unittest.mock import AsyncMock
+
+from analyzer_transactions.analyzer import AnalyzerTransactions
+from analyzer_transactions.tip_follower import TipFollower
+
+
+class MemoryRedis:
+    """The Redis commands used by TipFollower, BackfillProgress and SwapStaging, kept in dictionaries."""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.lists = {}
+
+    async def get(self, key):
+        value = self.values.get(key)
+        return str(value).encode() if value is not None else None
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def expire(self, key, ttl):
+        return key in self.values or key in self.lists
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.hashes.pop(key, None)
+            self.lists.pop(key, None)
+
+    async def rpush(self, key, *items):
+        self.lists.setdefault(key, []).extend(items)
+        return len(self.lists[key])
+
+    async def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1 if end != -1 else None]
+
+    async def hget(self, key, field):
+        value = self.hashes.get(key, {}).get(str(field))
+        return str(value).encode() if value is not None else None
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({str(k): v for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(str(field), None)
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def make_follower(stub_rpc, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("RPC_BATCH_SIZE", "10")
+
+    def factory(**kwargs):
+        analyzer = AnalyzerTransactions(stub_rpc.url)
+        analyzer.save_batch_to_redis = AsyncMock(side_effect=lambda batch: len(batch))
+        return TipFollower(analyzer, MemoryRedis(), **kwargs)
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_follower_processes_only_new_blocks(stub_rpc, make_follower):
+    stored = []
+
+    async def on_batch(batch):
+        stored.extend(batch)
+
+    follower = make_follower(start_depth=3, on_batch=on_batch)
+    try:
+        first = await follower.step()
+        assert (first["from"], first["to"], first["blocks"]) == (998, 1000, 3)
+        assert await follower.get_cursor() == 1000
+
+        # Steady state: nothing new, only the head lookup reaches the node
+        requests = stub_rpc.http_requests
+        idle = await follower.step()
+        assert idle["blocks"] == 0
+        assert stub_rpc.http_requests == requests + 1
+
+        stub_rpc.head = 1002
+        second = await follower.step()
+        assert (second["from"], second["to"]) == (1001, 1002)
+    finally:
+        await follower.analyzer.rpc.close()
+
+    # 20 txs per block, every 5th is a swap; no block is processed twice
+    assert len(stored) == 5 * 4
+    assert len({tx["hash"] for tx in stored}) == len(stored)
+
+
+@pytest.mark.asyncio
+async def test_follower_stores_executed_amounts(stub_rpc, make_follower, monkeypatch):
+    monkeypatch.setenv("RECEIPTS", "1")
+    stored = []
+
+    async def on_batch(batch):
+        stored.extend(batch)
+
+    follower = make_follower(start_depth=2, on_batch=on_batch)
+    try:
+        await follower.step()
+    finally:
+        await follower.analyzer.rpc.close()
+
+    # Как в process_blocks: квитанции добавляются до записи в Redis
+    assert follower.analyzer.receipts.stats["block_calls"] == 2
+    assert len(stored) == 8 and all(record.executed["status"] == 1 for record in stored)
+    saved = follower.analyzer.save_batch_to_redis.await_args.args[0]
+    assert saved[0].executed is not None
+
+
+@pytest.mark.asyncio
+async def test_follower_catches_up_in_bounded_steps(stub_rpc, make_follower):
+    follower = make_follower(start_depth=1, max_blocks_per_step=10)
+    try:
+        await follower.step()
+        stub_rpc.head = 1025
+        ranges = [(s["from"], s["to"]) for s in [await follower.step() for _ in range(3)]]
+    finally:
+        await follower.analyzer.rpc.close()
+
+    assert ranges == [(1001, 1010), (1011, 1020), (1021, 1025)]
+
+
+@pytest.mark.asyncio
+async def test_follower_rewinds_on_reorg(stub_rpc, make_follower):
+    orphaned = []
+
+    async def on_reorg(block_number):
+        orphaned.append(block_number)
+
+    follower = make_follower(start_depth=5, on_reorg=on_reorg)
+    try:
+        await follower.step()
+        # Blocks 999 and 1000 are replaced, the chain grows to 1001
+        stub_rpc.reorg(999)
+        stub_rpc.head = 1001
+        summaries = [await follower.step() for _ in range(3)]
+    finally:
+        await follower.analyzer.rpc.close()
+
+    assert [s["reorgs"] for s in summaries] == [1, 1, 0]
+    assert orphaned == [1000, 999]
+    assert (summaries[2]["from"], summaries[2]["to"]) == (999, 1001)
+    assert await follower._stored_hash(999) == stub_rpc.block_hash(999)
+
+
+@pytest.mark.asyncio
+async def test_run_is_exclusive_and_stops(stub_rpc, make_follower):
+    follower = make_follower(poll_interval=0.01)
+    other = TipFollower(follower.analyzer, follower.redis)
+    try:
+        await follower.acquire_lock("someone-else", 30)
+        assert await other.run(duration=1) == {"status": "locked"}
+        await follower.release_lock("someone-else")
+
+        result = await follower.run(duration=0.1)
+    finally:
+        await follower.analyzer.rpc.close()
+
+    assert result["status"] == "completed"
+    assert result["blocks"] == 1
+    assert result["steps"] >= 2
+    assert await follower.redis.get(follower.lock_key) is None